@@ -1,47 +1,39 @@
 """
 API route handlers for MA EV ChargeMap.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Path, Query, Request, Response
 from typing import List, Optional
 
-from app.database import get_db
-from app.models.site import Site
 from app.api.schemas import (
-    CityInfo, SiteDetail, SitesResponse, PredictionRequest, PredictionResponse, HealthResponse
+    CityInfo, SiteDetail, SitesResponse, NearestSitesResponse, PortfolioResponse, PredictionRequest, PredictionResponse, HealthResponse,
+    LivenessResponse, ReadinessResponse
 )
 from app.services.scoring import ScoringService
 from app.services.ml_predictor import predictor
+from app.services.site_store import site_store
+from app.cities import CITIES, cities_by_distance
 from app.config import settings
+from app.metrics import SERIALIZATION_SECONDS
+from app.health import db_monitor, readiness
 
 router = APIRouter()
 
-
-# City data (could be moved to database in future)
-CITIES = {
-    "worcester": {
-        "slug": "worcester",
-        "name": "Worcester",
-        "state": "MA",
-        "bbox": [-71.8744, 42.2084, -71.7277, 42.3126],  # [west, south, east, north]
-        "center": [42.2626, -71.8023]  # [lat, lng]
-    }
-}
+# Upper bound of score_overall (scores are scaled to 0-100)
+MAX_SCORE = 100.0
 
 
 @router.get("/health", response_model=HealthResponse)
-def health_check(db: Session = Depends(get_db)):
+def health_check():
     """
     Health check endpoint.
     
-    Returns API status and database connectivity.
+    Returns API status and the result of the last background database
+    check (no query is run per request).
     """
-    try:
-        # Test database connection
-        db.execute("SELECT 1")
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
+    database = db_monitor.status()
+    db_status = database["status"]
+    if db_status == "error":
+        db_status = f"error: {database['error']}"
     
     return {
         "status": "healthy",
@@ -50,13 +42,38 @@ def health_check(db: Session = Depends(get_db)):
     }
 
 
+@router.get("/health/live", response_model=LivenessResponse)
+def liveness():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=ReadinessResponse)
+def readiness_probe(response: Response):
+    """
+    Readiness probe.
+    
+    Reports the cached database check, model and warm-up status without
+    touching the connection pool.
+    
+    Returns:
+        200 when ready to serve traffic, 503 otherwise
+    """
+    report = readiness()
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+
 @router.get("/cities", response_model=List[CityInfo])
 def get_cities():
     """
     Get list of supported cities.
     
-    Returns information about all cities with available data.
-    Currently supports Worcester, MA as pilot city.
+    Returns information about all cities in the city registry
+    (see app/cities.py).
     """
     return [CityInfo(**city) for city in CITIES.values()]
 
@@ -85,13 +102,13 @@ def get_city(city_slug: str):
 def get_sites(
     city: str = Query(..., description="City slug (e.g., 'worcester')"),
     min_score: Optional[float] = Query(None, ge=0, le=100, description="Minimum overall score filter"),
-    limit: Optional[int] = Query(1000, ge=1, le=10000, description="Maximum number of sites to return"),
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(1000, ge=1, le=10000, description="Maximum number of sites to return")
 ):
     """
     Get candidate EV charging sites for a city.
     
     Returns sites as GeoJSON FeatureCollection for easy map visualization.
+    Served from the in-memory site store (app/services/site_store.py).
     
     Args:
         city: City slug (e.g., 'worcester')
@@ -108,31 +125,107 @@ def get_sites(
     if city.lower() not in CITIES:
         raise HTTPException(status_code=404, detail=f"City '{city}' not found")
     
-    # Build query
-    query = db.query(Site).filter(Site.city == city.lower())
+    # Best sites first, optionally filtered by score
+    table = site_store.get(city.lower())
+    rows = table.top(limit, min_score)
+    
+    # Convert to GeoJSON features
+    with SERIALIZATION_SECONDS.labels("sites").time():
+        features = table.geojson_features(rows)
+    
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "count": len(features)
+    }
+
+
+@router.get("/sites/nearest", response_model=NearestSitesResponse)
+def get_nearest_sites(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the location"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the location"),
+    k: int = Query(10, ge=1, le=1000, description="Number of sites to return"),
+    city: Optional[str] = Query(None, description="City slug (default: all cities)"),
+    min_score: Optional[float] = Query(None, ge=0, le=100, description="Minimum overall score filter"),
+    max_distance_km: Optional[float] = Query(None, gt=0, description="Search radius in km"),
+    rank: str = Query("distance", pattern="^(distance|combined)$", description="'distance' or 'combined'"),
+    km_weight: float = Query(10.0, gt=0, description="Score points per km of distance (rank=combined)")
+):
+    """
+    Get the candidate sites nearest to a location.
     
-    # Apply score filter if provided
-    if min_score is not None:
-        query = query.filter(Site.score_overall >= min_score)
+    Answered from a KD-tree per city and dataset version
+    (app/services/site_index.py), so only the neighbourhood of the
+    location is searched. Without a city, cities are visited nearest
+    bbox first and the search stops at the first city whose bbox is too
+    far for any of its sites to make the top k, so distant cities are
+    neither searched nor loaded.
     
-    # Order by score (best first) and apply limit
-    query = query.order_by(Site.score_overall.desc()).limit(limit)
+    Args:
+        lat, lng: Location in degrees
+        k: Number of sites to return
+        city: Optional city slug; all cities are searched when omitted
+        min_score: Optional minimum overall score filter (0-100)
+        max_distance_km: Optional search radius
+        rank: 'distance' (nearest first) or 'combined' (highest
+            score_overall - km_weight * distance_km first)
+        km_weight: Score points given up per km of distance
     
-    # Execute query
-    sites = query.all()
+    Returns:
+        GeoJSON FeatureCollection; each feature has `distance_km` (and
+        `rank_score` for rank=combined)
     
-    # Convert to GeoJSON features
-    features = [site.to_geojson_feature() for site in sites]
+    Raises:
+        404: If city not found
+    """
+    if city is not None and city.lower() not in CITIES:
+        raise HTTPException(status_code=404, detail=f"City '{city}' not found")
+    if city is not None:
+        nearby = [(0.0, city.lower())]
+    else:
+        nearby = cities_by_distance(lat, lng)
+    
+    candidates = []
+    for bbox_km, slug in nearby:
+        if max_distance_km is not None and bbox_km > max_distance_km:
+            break
+        if len(candidates) >= k:
+            # Best rank any site of this (or a farther) city could have
+            bound = MAX_SCORE - km_weight * bbox_km if rank == "combined" else -bbox_km
+            if bound < candidates[k - 1][0]:
+                break
+        
+        table = site_store.get(slug)
+        index = table.spatial_index
+        if rank == "combined":
+            rows, km, ranks = index.best(lat, lng, k, km_weight, min_score, max_distance_km)
+        else:
+            rows, km = index.nearest(lat, lng, k, min_score, max_distance_km)
+            ranks = -km
+        with SERIALIZATION_SECONDS.labels("nearest").time():
+            features = table.geojson_features(rows)
+        for feature, distance, rank_score in zip(features, km.tolist(), ranks.tolist()):
+            feature["properties"]["distance_km"] = round(distance, 3)
+            if rank == "combined":
+                feature["properties"]["rank_score"] = round(rank_score, 2)
+            candidates.append((rank_score, feature))
+        
+        # Merge the per-city answers
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        del candidates[k:]
+    
+    features = [feature for _, feature in candidates]
     
     return {
         "type": "FeatureCollection",
         "features": features,
-        "count": len(features)
+        "count": len(features),
+        "rank": rank
     }
 
 
 @router.get("/sites/{site_id}", response_model=SiteDetail)
-def get_site(site_id: int, db: Session = Depends(get_db)):
+def get_site(site_id: int):
     """
     Get detailed information for a specific site.
     
@@ -145,12 +238,117 @@ def get_site(site_id: int, db: Session = Depends(get_db)):
     Raises:
         404: If site not found
     """
-    site = db.query(Site).filter(Site.id == site_id).first()
+    found = site_store.find(site_id)
     
-    if not site:
+    if found is None:
         raise HTTPException(status_code=404, detail=f"Site {site_id} not found")
     
-    return SiteDetail(**site.to_dict())
+    table, row = found
+    with SERIALIZATION_SECONDS.labels("site_detail").time():
+        return SiteDetail(**table.site_dict(row))
+
+
+@router.get("/optimize/{city_slug}", response_model=PortfolioResponse)
+def optimize_sites(
+    city_slug: str,
+    n: int = Query(10, ge=1, le=1000, description="Number of sites to choose"),
+    radius_km: float = Query(0.8, gt=0, le=10, description="Service radius of a site in km"),
+    objective: str = Query("demand", pattern="^(demand|equity)$", description="'demand' or 'equity'"),
+    min_score: Optional[float] = Query(None, ge=0, le=100, description="Minimum overall score of chosen sites")
+):
+    """
+    Choose a portfolio of n sites that together cover the most demand.
+    
+    Unlike the top-N list, a site next to an already chosen one only
+    counts for the demand it adds (app/services/site_optimizer.py).
+    
+    Args:
+        city_slug: City identifier
+        n: Number of sites to choose (fewer when everything is covered)
+        radius_km: Service radius of a site
+        objective: 'demand' (daily kWh) or 'equity' (equity-weighted
+            population)
+        min_score: Optional minimum overall score of the chosen sites
+    
+    Returns:
+        GeoJSON FeatureCollection in pick order; each feature has `pick`
+        and `marginal_gain`, plus the covered and total demand
+    
+    Raises:
+        404: If city not found
+    """
+    if city_slug.lower() not in CITIES:
+        raise HTTPException(status_code=404, detail=f"City '{city_slug}' not found")
+    
+    # Imported here so SciPy is not loaded with the app
+    from app.services.site_optimizer import optimize_portfolio
+    
+    table = site_store.get(city_slug.lower())
+    portfolio = optimize_portfolio(table, n, radius_km, objective, min_score)
+    
+    with SERIALIZATION_SECONDS.labels("optimize").time():
+        features = table.geojson_features(portfolio["rows"])
+    for pick, (feature, gain) in enumerate(zip(features, portfolio["gains"].tolist()), 1):
+        feature["properties"]["pick"] = pick
+        feature["properties"]["marginal_gain"] = round(gain, 3)
+    
+    total = portfolio["total"]
+    return {
+        "type": "FeatureCollection",
+        "city": city_slug,
+        "objective": objective,
+        "radius_km": radius_km,
+        "features": features,
+        "count": len(features),
+        "covered": round(portfolio["covered"], 3),
+        "total": round(total, 3),
+        "coverage": round(portfolio["covered"] / total, 4) if total else 0.0
+    }
+
+
+@router.get("/heatmap/{city_slug}/{layer}/{z}/{x}/{y}.{fmt}")
+def get_heatmap_tile(
+    request: Request,
+    city_slug: str,
+    layer: str = Path(..., pattern="^(score|demand)$", description="'score' or 'demand'"),
+    z: int = Path(..., ge=settings.heatmap_min_zoom, le=settings.heatmap_max_zoom, description="Zoom level"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row"),
+    fmt: str = Path(..., pattern="^(png|npy)$", description="'png' or 'npy'")
+):
+    """
+    Get a heat-map tile of opportunity density (slippy map tile scheme).
+    
+    Rasters are smoothed by an FFT kernel density estimate and cached per
+    dataset version and zoom (app/services/heatmap.py).
+    
+    Args:
+        city_slug: City identifier
+        layer: 'score' (score_overall) or 'demand' (daily_kwh_estimate)
+        z, x, y: Tile coordinates
+        fmt: 'png' (colour-mapped image) or 'npy' (float32 densities per km²)
+    
+    Returns:
+        The tile; tiles without sites are transparent (or zeros)
+    
+    Raises:
+        404: If city not found
+    """
+    if city_slug.lower() not in CITIES:
+        raise HTTPException(status_code=404, detail=f"City '{city_slug}' not found")
+    
+    # Imported here so SciPy is not loaded with the app
+    from app.services.heatmap import heatmap_tile
+    
+    table = site_store.get(city_slug.lower())
+    etag = f'"{table.city}-{table.version or 0}-{layer}-{z}-{x}-{y}-{fmt}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    content = heatmap_tile(table, layer, z, x, y, fmt)
+    media_type = "image/png" if fmt == "png" else "application/octet-stream"
+    return Response(content=content, media_type=media_type, headers=headers)
 
 
 @router.post("/predict", response_model=PredictionResponse)
@@ -201,7 +399,7 @@ def predict_site_scores(request: PredictionRequest):
 
 
 @router.get("/stats/{city_slug}")
-def get_city_stats(city_slug: str, db: Session = Depends(get_db)):
+def get_city_stats(city_slug: str):
     """
     Get summary statistics for a city.
     
@@ -218,42 +416,18 @@ def get_city_stats(city_slug: str, db: Session = Depends(get_db)):
     if city_slug.lower() not in CITIES:
         raise HTTPException(status_code=404, detail=f"City '{city_slug}' not found")
     
-    # Get all sites for city
-    sites = db.query(Site).filter(Site.city == city_slug.lower()).all()
+    # Aggregates are precomputed when the city's table is loaded
+    table = site_store.get(city_slug.lower())
     
-    if not sites:
+    if not len(table):
         return {
             "city": city_slug,
             "total_sites": 0,
             "message": "No sites found for this city"
         }
     
-    # Calculate statistics
-    scores = [s.score_overall for s in sites]
-    demands = [s.daily_kwh_estimate for s in sites]
-    
-    # Get top sites
-    top_sites = sorted(sites, key=lambda s: s.score_overall, reverse=True)[:10]
-    
     return {
         "city": city_slug,
-        "total_sites": len(sites),
-        "score_stats": {
-            "min": round(min(scores), 1),
-            "max": round(max(scores), 1),
-            "mean": round(sum(scores) / len(scores), 1),
-        },
-        "demand_stats": {
-            "total_daily_kwh": round(sum(demands), 0),
-            "mean_daily_kwh": round(sum(demands) / len(demands), 1),
-        },
-        "top_sites": [
-            {
-                "id": s.id,
-                "location_label": s.location_label,
-                "score_overall": round(s.score_overall, 1),
-                "daily_kwh_estimate": round(s.daily_kwh_estimate, 1),
-            }
-            for s in top_sites
-        ]
+        "total_sites": len(table),
+        **table.stats,
     }
@@ -2,7 +2,7 @@
 Pydantic schemas for API request/response validation.
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 
 class CityInfo(BaseModel):
@@ -23,6 +23,7 @@ class SiteFeatures(BaseModel):
     poi_index: float = Field(ge=0.0, le=1.0)
     parking_lot_flag: int = Field(ge=0, le=1)
     municipal_parcel_flag: int = Field(ge=0, le=1)
+    catchment_index: Optional[float] = Field(default=None, ge=0.0, le=1.0)
 
 
 class SiteScores(BaseModel):
@@ -49,6 +50,10 @@ class SiteDetail(SiteSummary):
     """Detailed information for a site."""
     parcel_id: Optional[str] = None
     features: SiteFeatures
+    catchment: Dict[str, float] = Field(
+        default_factory=dict,
+        description="People, renters and POIs within 500m / 1km / 2km (e.g. population_1km)"
+    )
 
 
 class SitesResponse(BaseModel):
@@ -58,6 +63,27 @@ class SitesResponse(BaseModel):
     count: int
 
 
+class NearestSitesResponse(BaseModel):
+    """Response for nearest sites endpoint (features carry distance_km)."""
+    type: str = "FeatureCollection"
+    features: List[Dict]
+    count: int
+    rank: str = Field(..., description="Ranking used: 'distance' or 'combined'")
+
+
+class PortfolioResponse(BaseModel):
+    """Response for portfolio optimizer endpoint (features in pick order)."""
+    type: str = "FeatureCollection"
+    city: str
+    objective: str = Field(..., description="'demand' or 'equity'")
+    radius_km: float = Field(..., description="Service radius of a site")
+    features: List[Dict]
+    count: int
+    covered: float = Field(..., description="Demand within the radius of a chosen site")
+    total: float = Field(..., description="Demand of the whole city")
+    coverage: float = Field(..., description="covered / total (0-1)")
+
+
 class PredictionRequest(BaseModel):
     """Request for ML prediction endpoint."""
     traffic_index: float = Field(ge=0.0, le=1.0, description="Traffic volume index")
@@ -67,13 +93,16 @@ class PredictionRequest(BaseModel):
     poi_index: float = Field(ge=0.0, le=1.0, description="POI density index")
     parking_lot_flag: int = Field(default=0, ge=0, le=1, description="Has parking lot")
     municipal_parcel_flag: int = Field(default=0, ge=0, le=1, description="Is municipal property")
+    catchment_index: Optional[float] = Field(
+        default=None, ge=0.0, le=1.0, description="Catchment access index (blended into demand when given)"
+    )
 
 
 class PredictionResponse(BaseModel):
     """Response for ML prediction endpoint."""
     scores: SiteScores
     daily_kwh_estimate: float
-    model_info: Dict[str, any]
+    model_info: Dict[str, Any]
 
 
 class HealthResponse(BaseModel):
@@ -81,3 +110,19 @@ class HealthResponse(BaseModel):
     status: str
     version: str
     database: str
+
+
+class LivenessResponse(BaseModel):
+    """Liveness probe response."""
+    status: str
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness probe response (cached state, see app/health.py)."""
+    ready: bool
+    database: Dict[str, Any]
+    replicas: List[Dict[str, Any]] = Field(default_factory=list, description="Read replica health")
+    model: Dict[str, Any]
+    caches: Dict[str, Any] = Field(default_factory=dict, description="In-memory caches (loaded versions)")
+    warm_up: Dict[str, Any]
+    datasets: Dict[str, int] = Field(default_factory=dict, description="Published dataset version per city")
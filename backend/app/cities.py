@@ -0,0 +1,123 @@
+"""
+City registry for MA EV ChargeMap.
+
+Cities are defined in `config/cities.json` (or the file pointed to by
+the CITY_REGISTRY_PATH setting) so that onboarding a new municipality
+is a data change rather than a code change. Both the API and the data
+pipeline read the same registry.
+"""
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+
+DEFAULT_REGISTRY_PATH = Path(__file__).parent.parent / "config" / "cities.json"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Fields every registry record must have
+REQUIRED_CITY_FIELDS = ('slug', 'name', 'state', 'county_fips', 'bbox', 'center')
+
+
+def validate_city(city: dict) -> None:
+    """
+    Check one registry record.
+    
+    Raises:
+        ValueError: If a field is missing, the slug is not lowercase,
+            county_fips is not a 3-digit code, the bbox is not a
+            [west, south, east, north] box or the center lies outside it
+    """
+    missing = [field for field in REQUIRED_CITY_FIELDS if field not in city]
+    if missing:
+        raise ValueError(f"City {city.get('slug', city)!r} is missing {', '.join(missing)}")
+    
+    slug = city['slug']
+    if not slug or slug != slug.lower() or ' ' in slug:
+        raise ValueError(f"City slug {slug!r} must be lowercase without spaces")
+    
+    county_fips = city['county_fips']
+    if not (isinstance(county_fips, str) and len(county_fips) == 3 and county_fips.isdigit()):
+        raise ValueError(f"City {slug!r} county_fips {county_fips!r} must be a 3-digit string")
+    
+    bbox = city['bbox']
+    if len(bbox) != 4:
+        raise ValueError(f"City {slug!r} bbox must be [west, south, east, north]")
+    west, south, east, north = bbox
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError(f"City {slug!r} bbox {bbox} is empty or out of range")
+    
+    if len(city['center']) != 2:
+        raise ValueError(f"City {slug!r} center must be [lat, lng]")
+    lat, lng = city['center']
+    if not (south <= lat <= north and west <= lng <= east):
+        raise ValueError(f"City {slug!r} center {city['center']} is outside its bbox")
+
+
+def load_city_registry(path: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Load the city registry from JSON.
+    
+    Args:
+        path: Registry file (defaults to settings.city_registry_path or
+            the bundled config/cities.json)
+    
+    Returns:
+        Dictionary of city slug → city record (slug, name, state, bbox,
+        center, county_fips and optional traffic corridors)
+    
+    Raises:
+        ValueError: If a record is invalid (see validate_city) or a slug
+            is listed twice
+    """
+    registry_path = Path(path or settings.city_registry_path or DEFAULT_REGISTRY_PATH)
+    with open(registry_path) as f:
+        data = json.load(f)
+    
+    cities = {}
+    for city in data['cities']:
+        validate_city(city)
+        if city['slug'] in cities:
+            raise ValueError(f"City {city['slug']!r} is listed twice in {registry_path}")
+        cities[city['slug']] = city
+    return cities
+
+
+# Loaded once at import; the registry only changes with a deploy
+CITIES = load_city_registry()
+
+
+def get_city(slug: str) -> Optional[dict]:
+    """Look up a city by slug (case-insensitive)."""
+    return CITIES.get(slug.lower())
+
+
+def list_city_slugs() -> List[str]:
+    """All registered city slugs in registry order."""
+    return list(CITIES.keys())
+
+
+def bbox_distance_km(city: dict, lat: float, lng: float) -> float:
+    """
+    Great-circle distance in km from a point to a city's bbox (0 inside).
+    
+    The pipeline only keeps sites inside their city's bbox, so this is a
+    lower bound on the distance to any of the city's sites.
+    """
+    west, south, east, north = city['bbox']
+    box_lat = math.radians(min(max(lat, south), north))
+    box_lng = math.radians(min(max(lng, west), east))
+    lat, lng = math.radians(lat), math.radians(lng)
+    a = (
+        math.sin((box_lat - lat) / 2) ** 2
+        + math.cos(lat) * math.cos(box_lat) * math.sin((box_lng - lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cities_by_distance(lat: float, lng: float) -> List[tuple]:
+    """(bbox distance in km, slug) of every city, nearest first."""
+    return sorted((bbox_distance_km(city, lat, lng), slug) for slug, city in CITIES.items())
@@ -1,20 +1,248 @@
 """
 Database connection and session management.
+
+Every query issued through an instrumented engine is timed by SQLAlchemy
+cursor events. While a request is being handled, QueryStatsMiddleware
+(app/metrics.py) installs a QueryStats object in a contextvar, so the
+count and total DB time accumulate per request even though sync
+endpoints run in a threadpool. Queries slower than
+`settings.slow_query_ms` are logged together with their query plan.
+
+The API serves sites from the in-memory site store
+(app/services/site_store.py), which loads a city from the database
+through read_session: spread over the read replicas
+(DATABASE_REPLICA_URLS) when configured. get_db and the data pipeline
+always use the primary.
 """
-from sqlalchemy import create_engine
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 from app.config import settings
+from app.health import DatabaseMonitor
+
+logger = logging.getLogger("app.sql")
+
+
+class QueryStats:
+    """Number of queries and total time spent in the database."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# QueryStats of the request being handled (None outside requests)
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+@contextmanager
+def track_queries():
+    """
+    Collect QueryStats for the queries issued inside the block.
+
+    Usage:
+        with track_queries() as stats:
+            ...
+        print(stats.count, stats.duration)
+    """
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+def explain_query(connection, statement, parameters):
+    """
+    Query plan of a statement, as text.
+
+    Runs on a raw DBAPI cursor so the EXPLAIN itself is not counted or
+    timed by the engine events.
+    """
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+
+    if settings.slow_query_ms is None or duration * 1000 < settings.slow_query_ms:
+        return
+
+    plan = None
+    if settings.slow_query_explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+        try:
+            plan = explain_query(conn, statement, parameters)
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+
+    logger.warning(
+        "Slow query (%.1f ms): %s\nParameters: %r%s",
+        duration * 1000,
+        statement,
+        parameters,
+        f"\nPlan:\n{plan}" if plan else "",
+    )
+
+
+def instrument_engine(engine):
+    """Attach the query counting/timing and slow-query events to an engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+def pool_sizes(workers=1):
+    """
+    Per-process (pool_size, max_overflow).
+
+    The server-wide db_max_connections budget is split evenly between
+    workers; a third of each share is kept open, the rest is overflow.
+    Explicit db_pool_size / db_max_overflow settings take precedence.
+    """
+    share = max(1, settings.db_max_connections // max(1, workers))
+    pool_size = settings.db_pool_size or max(1, share // 3)
+    max_overflow = settings.db_max_overflow
+    if max_overflow is None:
+        max_overflow = max(0, share - pool_size)
+    return pool_size, max_overflow
+
+
+def create_app_engine(workers=1, url=None):
+    """
+    Instrumented engine for the API, sized for one of `workers` processes.
+    
+    Args:
+        workers: Number of server processes sharing the connection budget
+        url: Database URL (default: the primary, settings.database_url)
+    """
+    pool_size, max_overflow = pool_sizes(workers)
+    return instrument_engine(create_engine(
+        url or settings.database_url,
+        echo=settings.debug,
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow
+    ))
+
+
+# Create SQLAlchemy engine (app/server.py sets web_workers before the
+# import; `python -m app.main` is a single process)
+engine = create_app_engine(settings.web_workers or 1)
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+
+class ReadReplicas:
+    """
+    Round-robin load balancer over read replica engines.
+    
+    A replica is skipped while its background DatabaseMonitor reports it
+    down, or for `retry_after` seconds after a connection attempt to it
+    failed (unless a later background check succeeded). When no replica
+    can be reached, callers fall back to the primary.
+    """
+    
+    def __init__(self, engines, retry_after=30.0):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self.monitors = [
+            DatabaseMonitor(engine=replica, name=f"replica-{index}")
+            for index, replica in enumerate(self.engines)
+        ]
+        self._failed_at = {}
+        self._counter = itertools.count()
+    
+    def __len__(self):
+        return len(self.engines)
+    
+    def available(self, index):
+        """Whether replica `index` should be tried."""
+        monitor = self.monitors[index]
+        if monitor.ok is False:
+            return False
+        failed_at = self._failed_at.get(index)
+        if failed_at is None:
+            return True
+        recovered = monitor.ok and monitor.checked_at is not None and monitor.checked_at > failed_at
+        return recovered or time.time() - failed_at > self.retry_after
+    
+    def candidates(self):
+        """Available replica indexes, rotated by one on every call."""
+        if not self.engines:
+            return []
+        start = next(self._counter) % len(self.engines)
+        order = [(start + offset) % len(self.engines) for offset in range(len(self.engines))]
+        return [index for index in order if self.available(index)]
+    
+    def connect(self):
+        """
+        Connection to the next healthy replica.
+        
+        Returns:
+            A Connection, or None when no replica is configured or
+            reachable (use the primary)
+        """
+        for index in self.candidates():
+            try:
+                return self.engines[index].connect()
+            except Exception as e:
+                self._failed_at[index] = time.time()
+                logger.warning("Read replica %d unavailable, failing over: %s", index, e)
+        return None
+    
+    def start(self):
+        """Start the background health checks of the replicas."""
+        for monitor in self.monitors:
+            monitor.start()
+    
+    def stop(self):
+        for monitor in self.monitors:
+            monitor.stop()
+    
+    def status(self):
+        """Health of each replica (as reported by the readiness probe)."""
+        return [
+            {**monitor.status(), "name": monitor.name, "available": self.available(index)}
+            for index, monitor in enumerate(self.monitors)
+        ]
+
+
+# Read replicas (empty unless DATABASE_REPLICA_URLS is set); each gets
+# a pool sized like the primary's
+read_replicas = ReadReplicas(
+    create_app_engine(settings.web_workers or 1, url) for url in settings.replica_urls
 )
 
+
+def all_engines():
+    """The primary engine followed by the replica engines."""
+    return [engine, *read_replicas.engines]
+
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -34,9 +262,67 @@ def get_db():
         db.close()
 
 
+@contextmanager
+def read_session():
+    """
+    Session for reads: on a read replica when any is configured and
+    reachable (round-robin with failover), on the primary otherwise.
+    Never write through it.
+    """
+    connection = read_replicas.connect()
+    db = SessionLocal(bind=connection) if connection is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        if connection is not None:
+            connection.close()
+
+
+def missing_columns(bind):
+    """
+    Model columns absent from tables that already exist.
+
+    Returns:
+        List of (table, column) pairs
+    """
+    inspector = inspect(bind)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend((table, column) for column in table.columns if column.name not in existing)
+    return missing
+
+
+def add_missing_columns(bind):
+    """
+    Add model columns that existing tables lack (ALTER TABLE ADD COLUMN).
+
+    create_all only creates missing tables, so columns added to a model
+    later (e.g. the catchment features) are added here. New columns need
+    a server default or must be nullable.
+
+    Returns:
+        Names of the added columns ("table.column")
+    """
+    added = []
+    with bind.begin() as conn:
+        for table, column in missing_columns(conn):
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            added.append(f"{table.name}.{column.name}")
+    for name in added:
+        logger.info("Added missing column %s", name)
+    return added
+
+
 def init_db():
     """
     Initialize database tables.
-    Creates all tables defined by SQLAlchemy models.
+    Creates all tables defined by SQLAlchemy models and adds columns
+    missing from existing tables.
     """
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
@@ -0,0 +1,19 @@
+"""
+Planar approximations of lat/lng coordinates shared by the API and the
+data pipeline.
+
+Cities span a few tens of kilometres, so a local equirectangular
+projection around a city-level origin is accurate enough for grids,
+catchments and coverage radii.
+"""
+import numpy as np
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG = 111.320
+
+
+def project_km(lat, lng, origin_lat, origin_lng):
+    """Local equirectangular projection (km east, km north of the origin)."""
+    x = (np.asarray(lng) - origin_lng) * KM_PER_DEGREE_LNG * np.cos(np.radians(origin_lat))
+    y = (np.asarray(lat) - origin_lat) * KM_PER_DEGREE_LAT
+    return np.column_stack([x, y])
@@ -0,0 +1,162 @@
+"""
+Liveness and readiness state for the health endpoints.
+
+Probes arrive every few seconds on every worker, so they must not take a
+pooled connection or wait on the database. Instead a DatabaseMonitor
+thread per process checks connectivity every `health_check_interval`
+seconds (and reads the published dataset versions while it is
+connected); the endpoints only report the last result together with the
+model, cache and warm-up status.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select, text
+
+from app.config import settings
+
+logger = logging.getLogger("app.health")
+
+
+class DatabaseMonitor:
+    """Periodic background connectivity check of an engine."""
+
+    def __init__(self, engine=None, interval=None, name="primary"):
+        """
+        Args:
+            engine: Engine to check (default: app.database.engine,
+                resolved at check time)
+            interval: Seconds between checks (default:
+                settings.health_check_interval)
+            name: Label used in logs
+        """
+        self._engine = engine
+        self.interval = interval or settings.health_check_interval
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+        self.ok = None
+        self.error = None
+        self.latency_ms = None
+        self.checked_at = None
+        self.versions = {}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.database import engine
+            return engine
+        return self._engine
+
+    def check(self):
+        """Run one check now; returns whether the database answered."""
+        from app.models.dataset_version import DatasetVersion
+
+        start = time.perf_counter()
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                latency_ms = (time.perf_counter() - start) * 1000
+                try:
+                    rows = conn.execute(select(DatasetVersion.city, DatasetVersion.version))
+                    self.versions = {city: version for city, version in rows}
+                except Exception:
+                    # Connected, but nothing published yet
+                    conn.rollback()
+                    self.versions = {}
+        except Exception as e:
+            if self.ok is not False:
+                logger.warning("Database check (%s) failed: %s", self.name, e)
+            self.ok, self.error, self.latency_ms = False, str(e), None
+        else:
+            if self.ok is False:
+                logger.info("Database check (%s) recovered", self.name)
+            self.ok, self.error, self.latency_ms = True, None, round(latency_ms, 2)
+        self.checked_at = time.time()
+        return self.ok
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start checking in a daemon thread (once per process)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"db-monitor-{self.name}", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stale(self):
+        """No check within three intervals (or none yet)."""
+        return self.checked_at is None or time.time() - self.checked_at > 3 * self.interval
+
+    @property
+    def healthy(self):
+        return bool(self.ok) and not self.stale
+
+    def status(self):
+        """
+        Returns:
+            Dictionary with status ("connected", "error" or "pending"),
+            latency_ms, checked_at (ISO timestamp), age_s and error
+        """
+        if self.checked_at is None:
+            return {"status": "pending", "latency_ms": None, "checked_at": None, "age_s": None, "error": None}
+        return {
+            "status": "connected" if self.ok else "error",
+            "latency_ms": self.latency_ms,
+            "checked_at": datetime.fromtimestamp(self.checked_at, timezone.utc).isoformat(),
+            "age_s": round(time.time() - self.checked_at, 1),
+            "error": self.error,
+        }
+
+
+def model_status():
+    """Model status without triggering the (lazy) model load."""
+    from app.services.ml_predictor import predictor
+
+    if not predictor.is_loaded:
+        return {"loaded": False, "model_type": None}
+    return {"loaded": True, "model_type": predictor.get_model_info()["model_type"]}
+
+
+def readiness():
+    """
+    Readiness report built from cached state only.
+
+    Ready when the last database check succeeded and is recent, and the
+    warm-up finished without a failed schema step. Read replicas are
+    reported but do not affect readiness (reads fail over to the primary).
+
+    Returns:
+        Dictionary with ready, database, replicas, model, caches,
+        warm_up and datasets (published dataset version per city)
+    """
+    from app.database import read_replicas
+    from app.services.site_store import site_store
+    from app.warmup import warm_up
+
+    warm_up_status = warm_up.status()
+    schema_ok = warm_up_status["steps"]["schema"]["status"] == "ok"
+
+    return {
+        "ready": db_monitor.healthy and warm_up_status["done"] and schema_ok,
+        "database": db_monitor.status(),
+        "replicas": read_replicas.status(),
+        "model": model_status(),
+        "caches": {"sites": site_store.status()},
+        "warm_up": warm_up_status,
+        "datasets": dict(db_monitor.versions),
+    }
+
+
+# Monitor of the primary database (started by the app's startup event)
+db_monitor = DatabaseMonitor()
@@ -10,8 +10,11 @@ This is a personal portfolio project demonstrating:
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import init_db
 from app.api.routes import router
+from app.metrics import PrometheusMiddleware, QueryStatsMiddleware, metrics_response
+from app.warmup import ddl_on_startup, warm_up
+from app.health import db_monitor
+from app.database import read_replicas
 
 # Create FastAPI application
 app = FastAPI(
@@ -31,27 +34,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request query count and DB time headers
+if settings.db_timing_header:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Request metrics (exposed at /metrics)
+if settings.metrics_enabled:
+    app.add_middleware(PrometheusMiddleware)
+
 # Include API routes
 app.include_router(router, prefix="/api")
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus metrics in text exposition format.
+    """
+    return metrics_response()
+
+
 @app.on_event("startup")
 async def startup_event():
     """
     Initialize application on startup.
     
-    Creates database tables if they don't exist.
+    Creates database tables if they don't exist (development) or checks
+    that they do, and loads the ML model. With FAST_START these run in
+    the background and the server accepts connections immediately.
     """
     print("🚀 Starting MA EV ChargeMap API...")
     print(f"📊 Version: {settings.version}")
     print(f"🔧 Debug mode: {settings.debug}")
     
-    # Initialize database
-    try:
-        init_db()
-        print("✓ Database initialized")
-    except Exception as e:
-        print(f"⚠ Database initialization warning: {e}")
+    # Background database checks behind the readiness probe and the
+    # replica failover (per process)
+    db_monitor.start()
+    read_replicas.start()
+    
+    if warm_up.done:
+        # Already warmed up before forking (app/server.py)
+        return
+    
+    if settings.fast_start:
+        warm_up.start()
+        print("⏳ Warm-up running in the background")
+        return
+    
+    status = warm_up.run()
+    schema = status["steps"]["schema"]
+    if schema["status"] == "ok":
+        print("✓ Database initialized" if ddl_on_startup() else "✓ Database schema checked")
+    else:
+        print(f"⚠ Database initialization warning: {schema['error']}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stop the background database checks.
+    """
+    db_monitor.stop()
+    read_replicas.stop()
 
 
 @app.get("/")
@@ -69,6 +113,8 @@ def root():
             "sites": "/api/sites?city=worcester",
             "predict": "/api/predict",
             "health": "/api/health",
+            "liveness": "/api/health/live",
+            "readiness": "/api/health/ready",
         },
         "portfolio_note": (
             "This is a personal portfolio project by a solo developer, "
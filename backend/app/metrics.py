@@ -0,0 +1,201 @@
+"""
+Prometheus metrics for the MA EV ChargeMap API.
+
+`PrometheusMiddleware` is a plain ASGI middleware (no per-request
+Request/Response objects) that records, per route template:
+- request latency histogram
+- request and response body sizes
+- requests in flight
+- request counts by status code
+
+`QueryStatsMiddleware` counts and times the SQL queries of each request
+(see app/database.py) and reports them in `Server-Timing` and
+`X-DB-Query-Count` response headers.
+
+Services record their own timings with the histograms defined here
+(model inference in MLPredictor, GeoJSON serialization in get_sites).
+Everything is exposed in Prometheus text format at `/metrics`.
+
+Under the multi-worker server (app/server.py) PROMETHEUS_MULTIPROC_DIR
+is set before this module is imported, so every worker writes its
+samples to files there and `/metrics` aggregates all workers, whichever
+one serves the scrape.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+
+from app.database import track_queries
+
+
+# Label used for requests that did not match any route (404s, probes of
+# random paths), so unknown URLs cannot blow up label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+# Sizes from 100 B to ~10 MB
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Sub-millisecond work such as a single model prediction
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+)
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes",
+    "HTTP request body size",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+    # Summed over live workers only (see app.server.worker_exit)
+    multiprocess_mode="livesum",
+)
+
+MODEL_INFERENCE_SECONDS = Histogram(
+    "model_inference_seconds",
+    "Daily kWh prediction time per call",
+    ["model_type"],
+    buckets=FAST_BUCKETS,
+)
+SERIALIZATION_SECONDS = Histogram(
+    "serialization_seconds",
+    "Time spent converting sites to response payloads",
+    ["endpoint"],
+    buckets=FAST_BUCKETS,
+)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording request metrics.
+
+    The route label is the matched route's path template (e.g.
+    `/api/sites/{site_id}`), looked up from the endpoint the router
+    stored in the scope.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route_label(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+
+            route = self._route_label(scope)
+            request_size = 0
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    request_size = int(value)
+                    break
+
+            REQUEST_COUNT.labels(method, route, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(duration)
+            REQUEST_SIZE.labels(method, route).observe(request_size)
+            RESPONSE_SIZE.labels(method, route).observe(response_size)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware reporting each request's query count and DB time.
+
+    Adds `Server-Timing: db;dur=<ms>;desc="<n> queries"` (shown by
+    browser dev tools) and `X-DB-Query-Count` to the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+                    )
+                    headers.append("X-DB-Query-Count", str(stats.count))
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def metrics_registry():
+    """
+    Registry to expose: the process's own, or in multiprocess mode one
+    that collects the files of every worker.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return None
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_response():
+    """Current metrics in Prometheus text format."""
+    registry = metrics_registry()
+    body = generate_latest(registry) if registry is not None else generate_latest()
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
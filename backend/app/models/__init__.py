@@ -2,5 +2,6 @@
 Database models for MA EV ChargeMap.
 """
 from app.models.site import Site
+from app.models.dataset_version import DatasetVersion
 
-__all__ = ["Site"]
+__all__ = ["Site", "DatasetVersion"]
@@ -0,0 +1,23 @@
+"""
+Database model for published dataset versions.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+from app.database import Base
+
+
+class DatasetVersion(Base):
+    """
+    Version counter for the sites published for one city.
+    
+    The pipeline bumps the version in the same transaction that makes a
+    rebuilt set of sites visible, so readers can use it as a cache key
+    and detect when a city's data has been republished.
+    """
+    __tablename__ = "dataset_versions"
+    
+    city = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    site_count = Column(Integer, nullable=False, default=0)
+    published_at = Column(DateTime, nullable=False, default=datetime.utcnow)
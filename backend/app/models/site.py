@@ -4,6 +4,15 @@ Database model for candidate EV charging sites.
 from sqlalchemy import Column, Integer, Float, String, Index
 from app.database import Base
 
+# Catchment squares: label → half-width in km (see data/build_catchments.py)
+CATCHMENT_RADII = {'500m': 0.5, '1km': 1.0, '2km': 2.0}
+CATCHMENT_LAYERS = ('population', 'renters', 'pois')
+
+# Catchment total columns, e.g. catchment_population_1km
+CATCHMENT_TOTALS = [
+    f'catchment_{layer}_{radius}' for radius in CATCHMENT_RADII for layer in CATCHMENT_LAYERS
+]
+
 
 class Site(Base):
     """
@@ -34,6 +43,20 @@ class Site(Base):
     parking_lot_flag = Column(Integer, default=0)
     municipal_parcel_flag = Column(Integer, default=0)
     
+    # Catchment totals: people, renters and POIs inside the square of
+    # each CATCHMENT_RADII half-width around the site
+    catchment_population_500m = Column(Float, default=0.0, server_default='0')
+    catchment_renters_500m = Column(Float, default=0.0, server_default='0')
+    catchment_pois_500m = Column(Float, default=0.0, server_default='0')
+    catchment_population_1km = Column(Float, default=0.0, server_default='0')
+    catchment_renters_1km = Column(Float, default=0.0, server_default='0')
+    catchment_pois_1km = Column(Float, default=0.0, server_default='0')
+    catchment_population_2km = Column(Float, default=0.0, server_default='0')
+    catchment_renters_2km = Column(Float, default=0.0, server_default='0')
+    catchment_pois_2km = Column(Float, default=0.0, server_default='0')
+    # 0-1, distance-weighted access; NULL until build_catchments.py has run
+    catchment_index = Column(Float, nullable=True)
+    
     # Computed scores (0-100)
     score_demand = Column(Float, nullable=False)
     score_equity = Column(Float, nullable=False)
@@ -67,6 +90,13 @@ class Site(Base):
                 "poi_index": round(self.poi_index, 3),
                 "parking_lot_flag": self.parking_lot_flag,
                 "municipal_parcel_flag": self.municipal_parcel_flag,
+                "catchment_index": (
+                    round(self.catchment_index, 3) if self.catchment_index is not None else None
+                ),
+            },
+            "catchment": {
+                name[len('catchment_'):]: round(getattr(self, name) or 0.0, 1)
+                for name in CATCHMENT_TOTALS
             },
             "scores": {
                 "demand": round(self.score_demand, 1),
@@ -0,0 +1,219 @@
+"""
+Production server for the MA EV ChargeMap API.
+
+Runs gunicorn with uvicorn workers:
+- N worker processes (--workers, WEB_WORKERS or the CPU count), each
+  with a database pool sized from the server-wide connection budget
+  (DB_MAX_CONNECTIONS, see app/database.py)
+- the app, ML model and read-only caches are loaded once in the master
+  before forking, so workers share those pages copy-on-write
+- SIGTERM drains gracefully: workers stop accepting connections and
+  finish in-flight requests for up to SHUTDOWN_TIMEOUT seconds
+- memory is logged for the master before/after preloading and for each
+  worker after boot and at exit (RSS, PSS and private MB)
+- Prometheus metrics run in multiprocess mode: workers write samples to
+  PROMETHEUS_MULTIPROC_DIR and `/metrics` aggregates them, so a scrape
+  sees the whole server rather than the one worker that answered
+
+`python -m app.main` remains the single-process development server.
+
+Usage (from backend/):
+    python -m app.server
+    python -m app.server --workers 4 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from app.config import settings
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def memory_usage(pid="self"):
+    """
+    Memory of a process in MB.
+
+    Returns:
+        Dictionary with rss, pss (RSS with shared pages split between
+        the processes sharing them) and private (pages only this
+        process uses). pss/private are only available on Linux.
+    """
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                    usage[parts[0][:-1]] = int(parts[1]) / 1024
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": round(peak / 1024, 1)}
+
+    return {
+        "rss": round(usage.get("Rss", 0.0), 1),
+        "pss": round(usage.get("Pss", 0.0), 1),
+        "private": round(usage.get("Private_Clean", 0.0) + usage.get("Private_Dirty", 0.0), 1),
+    }
+
+
+def format_memory(usage):
+    return ", ".join(f"{name} {value:.1f} MB" for name, value in usage.items())
+
+
+def setup_multiprocess_metrics():
+    """
+    Point prometheus_client at a shared directory for per-worker files.
+
+    Must run before anything imports prometheus_client, which picks its
+    value storage on import; the app is only imported later, by
+    preload(). Files left by a previous run are removed.
+
+    Returns:
+        The metrics directory
+    """
+    if "prometheus_client" in sys.modules:
+        raise RuntimeError("prometheus_client was imported before multiprocess metrics were set up")
+
+    directory = (
+        os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        or settings.metrics_multiproc_dir
+        or tempfile.mkdtemp(prefix="ev-chargemap-metrics-")
+    )
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.db"):
+        path.unlink()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(directory)
+    return directory
+
+
+def preload():
+    """
+    Import the app and warm read-only state in the master process.
+
+    Returns:
+        The ASGI app
+    """
+    from app.main import app
+    from app.database import all_engines
+    from app.warmup import warm_up
+
+    # Schema check and model load happen once here instead of per worker
+    status = warm_up.run()
+    for name, step in status["steps"].items():
+        logger.info("Warm-up %s: %s (%.2fs)", name, step.get("result", step.get("error")), step["duration_s"])
+
+    # No connection may be shared with the forked workers
+    for engine in all_engines():
+        engine.dispose()
+    # Keep the preloaded objects out of the collector so it does not
+    # touch (and copy) their pages in every worker
+    gc.freeze()
+    return app
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """Uvicorn worker that lets in-flight requests finish on shutdown."""
+
+    CONFIG_KWARGS = {
+        "loop": "auto",
+        "http": "auto",
+        "timeout_graceful_shutdown": settings.shutdown_timeout,
+    }
+
+
+def post_fork(server, worker):
+    """Drop pool state inherited from the master (sockets are not shareable)."""
+    from app.database import all_engines
+    for engine in all_engines():
+        engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    logger.info("Worker %s booted: %s", worker.pid, format_memory(memory_usage()))
+
+
+def mark_metrics_dead(worker):
+    """Drop a worker's live gauges (requests in progress) from /metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    logger.info("Worker %s exiting: %s", worker.pid, format_memory(memory_usage()))
+    mark_metrics_dead(worker)
+
+
+def child_exit(server, worker):
+    # Runs in the master, so also covers workers killed on timeout
+    mark_metrics_dead(worker)
+
+
+class ProductionServer(BaseApplication):
+    """gunicorn application serving the preloaded FastAPI app."""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        before = memory_usage()
+        app = preload()
+        logger.info("Master before preload: %s", format_memory(before))
+        logger.info("Master after preload:  %s", format_memory(memory_usage()))
+        return app
+
+
+def server_options(workers, host, port):
+    """gunicorn settings for the production server."""
+    return {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "app.server.DrainingUvicornWorker",
+        "preload_app": True,
+        # gunicorn kills workers that are still busy after this
+        "graceful_timeout": settings.shutdown_timeout + 5,
+        "keepalive": 5,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+        "child_exit": child_exit,
+        "accesslog": "-" if settings.debug else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MA EV ChargeMap API with multiple workers")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Worker processes (default: WEB_WORKERS or CPU count)")
+    parser.add_argument('--host', default=settings.api_host)
+    parser.add_argument('--port', type=int, default=settings.api_port)
+    args = parser.parse_args(argv)
+
+    workers = args.workers or settings.web_workers or os.cpu_count() or 1
+    # Read by app.database when the app is imported (pool sizing)
+    settings.web_workers = workers
+    metrics_dir = setup_multiprocess_metrics()
+    logger.info("Prometheus multiprocess metrics in %s", metrics_dir)
+    if settings.debug:
+        logger.warning("DEBUG is enabled: SQL statements are echoed; set DEBUG=false in production")
+
+    ProductionServer(server_options(workers, args.host, args.port)).run()
+
+
+if __name__ == "__main__":
+    main()
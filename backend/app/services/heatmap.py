@@ -0,0 +1,263 @@
+"""
+Heat-map raster tiles of opportunity density.
+
+For a city, layer and zoom level, the site values are summed onto a
+Web Mercator pixel grid covering the city's tiles and smoothed with a
+Gaussian kernel density estimate (FFT convolution, bandwidth
+settings.heatmap_bandwidth_m). Values are densities per km².
+
+Rasters are built on first use and cached per SiteTable (i.e. dataset
+version), layer and zoom, with room for every layer at every served
+zoom; concurrent requests for a raster that is being built wait for
+that build instead of starting their own. Encoded tiles are cached
+with them. Tiles are
+served as 256×256 PNG (colour-mapped, scaled to the raster maximum) or
+as float32 .npy arrays of the densities.
+"""
+import io
+import math
+import struct
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+from app.config import settings
+from app.services.site_table import SiteTable
+
+TILE_SIZE = 256
+
+# Layer name → site column
+LAYERS = {
+    'score': 'score_overall',
+    'demand': 'daily_kwh_estimate',
+}
+
+# Web Mercator ground resolution at the equator, zoom 0 (m/pixel)
+EQUATOR_M_PER_PIXEL = 156543.03392
+
+# Kernel radius in bandwidths
+KERNEL_RADIUS = 3
+
+# Encoded tiles kept per table (rasters: see max_rasters_per_table)
+MAX_TILES_PER_TABLE = 1024
+
+# Colour map stops: position → RGBA (transparent blue → red)
+COLOR_STOPS = [
+    (0.0, (0, 0, 255, 0)),
+    (0.25, (0, 160, 255, 110)),
+    (0.5, (0, 220, 100, 160)),
+    (0.75, (255, 220, 0, 200)),
+    (1.0, (230, 0, 0, 230)),
+]
+
+
+def world_pixels(lat, lng, zoom):
+    """Global Web Mercator pixel coordinates (x, y) at a zoom level."""
+    scale = TILE_SIZE * 2 ** zoom
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511))
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0 * scale
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * scale
+    return x, y
+
+
+def meters_per_pixel(lat, zoom):
+    return EQUATOR_M_PER_PIXEL * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def gaussian_kernel(sigma_px):
+    """Normalized 2-D Gaussian kernel (KERNEL_RADIUS sigmas wide)."""
+    radius = max(1, int(math.ceil(KERNEL_RADIUS * sigma_px)))
+    offsets = np.arange(-radius, radius + 1, dtype=np.float64)
+    profile = np.exp(-0.5 * (offsets / max(sigma_px, 1e-9)) ** 2)
+    kernel = np.outer(profile, profile)
+    return kernel / kernel.sum()
+
+
+def _color_map():
+    positions = [stop for stop, _ in COLOR_STOPS]
+    levels = np.linspace(0, 1, 256)
+    channels = [np.interp(levels, positions, [color[i] for _, color in COLOR_STOPS]) for i in range(4)]
+    return np.stack(channels, axis=1).round().astype(np.uint8)
+
+
+COLOR_MAP = _color_map()
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Encode an (h, w, 4) uint8 array as an RGBA PNG."""
+    height, width = rgba.shape[:2]
+    # Filter type 0 (none) before every scanline
+    scanlines = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)),
+        chunk(b'IEND', b''),
+    ])
+
+
+def encode_npy(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+EMPTY_TILE = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.float32)
+EMPTY_PNG = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+class HeatmapRaster:
+    """
+    Smoothed density of one layer over a block of tiles at one zoom.
+
+    Attributes:
+        zoom: Zoom level
+        tile_x, tile_y: Tile coordinates of the top-left tile
+        density: float32 array (rows = y) of values per km², a whole
+            number of tiles in each direction
+        max_density: Largest density (PNG colour scale)
+    """
+
+    def __init__(self, zoom, tile_x, tile_y, density):
+        self.zoom = zoom
+        self.tile_x = tile_x
+        self.tile_y = tile_y
+        self.density = density
+        self.max_density = float(density.max()) if density.size else 0.0
+
+    @classmethod
+    def build(cls, table: SiteTable, layer: str, zoom: int, bandwidth_m: Optional[float] = None):
+        """
+        Rasterize and smooth a table's layer at a zoom level.
+
+        Returns:
+            HeatmapRaster, or None for a city without sites
+        """
+        if not len(table):
+            return None
+        bandwidth_m = bandwidth_m or settings.heatmap_bandwidth_m
+        lat, lng = table.columns['lat'], table.columns['lng']
+        centre_lat = float(lat.mean())
+        m_per_px = meters_per_pixel(centre_lat, zoom)
+        kernel = gaussian_kernel(bandwidth_m / m_per_px)
+        pad = kernel.shape[0] // 2
+
+        # Whole tiles around the sites, with room for the kernel
+        x, y = world_pixels(lat, lng, zoom)
+        tile_x = int((x.min() - pad) // TILE_SIZE)
+        tile_y = int((y.min() - pad) // TILE_SIZE)
+        width = (int((x.max() + pad) // TILE_SIZE) - tile_x + 1) * TILE_SIZE
+        height = (int((y.max() + pad) // TILE_SIZE) - tile_y + 1) * TILE_SIZE
+
+        columns = np.clip((x - tile_x * TILE_SIZE).astype(np.int64), 0, width - 1)
+        rows = np.clip((y - tile_y * TILE_SIZE).astype(np.int64), 0, height - 1)
+        counts = np.bincount(rows * width + columns, weights=table.columns[LAYERS[layer]],
+                             minlength=width * height).reshape(height, width)
+
+        density = fftconvolve(counts, kernel, mode='same')
+        # FFT round-off leaves tiny negative values far from any site
+        np.maximum(density, 0.0, out=density)
+        density /= (m_per_px / 1000) ** 2
+        return cls(zoom, tile_x, tile_y, density.astype(np.float32))
+
+    def tile(self, x: int, y: int) -> Optional[np.ndarray]:
+        """Densities of a tile (rows = y), or None outside the raster."""
+        column, row = x - self.tile_x, y - self.tile_y
+        tiles_y, tiles_x = (size // TILE_SIZE for size in self.density.shape)
+        if not (0 <= column < tiles_x and 0 <= row < tiles_y):
+            return None
+        return self.density[row * TILE_SIZE:(row + 1) * TILE_SIZE, column * TILE_SIZE:(column + 1) * TILE_SIZE]
+
+    def png(self, x: int, y: int) -> bytes:
+        values = self.tile(x, y)
+        if values is None or self.max_density <= 0:
+            return EMPTY_PNG
+        levels = np.clip(values / self.max_density * 255, 0, 255).astype(np.uint8)
+        return encode_png(COLOR_MAP[levels])
+
+    def npy(self, x: int, y: int) -> bytes:
+        values = self.tile(x, y)
+        return encode_npy(EMPTY_TILE if values is None else np.ascontiguousarray(values))
+
+
+_caches = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_MISSING = object()
+
+
+def max_rasters_per_table():
+    """Rasters kept per table: every layer at every served zoom level."""
+    return len(LAYERS) * (settings.heatmap_max_zoom - settings.heatmap_min_zoom + 1)
+
+
+def _table_cache(table):
+    with _lock:
+        return _caches.setdefault(
+            table, {"rasters": OrderedDict(), "tiles": OrderedDict(), "building": {}}
+        )
+
+
+def _remember(entries, key, value, limit):
+    with _lock:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+    return value
+
+
+def heatmap_raster(table: SiteTable, layer: str, zoom: int) -> Optional[HeatmapRaster]:
+    """Raster of a table's layer at a zoom level (built once, then cached)."""
+    cache = _table_cache(table)
+    key = (layer, zoom)
+    raster = cache["rasters"].get(key, _MISSING)
+    if raster is not _MISSING:
+        return raster
+
+    # One build per key: later requests wait for it, other keys do not
+    with _lock:
+        build_lock = cache["building"].setdefault(key, threading.Lock())
+    try:
+        with build_lock:
+            raster = cache["rasters"].get(key, _MISSING)
+            if raster is _MISSING:
+                raster = _remember(
+                    cache["rasters"], key, HeatmapRaster.build(table, layer, zoom), max_rasters_per_table()
+                )
+    finally:
+        with _lock:
+            cache["building"].pop(key, None)
+    return raster
+
+
+def heatmap_tile(table: SiteTable, layer: str, zoom: int, x: int, y: int, fmt: str = 'png') -> bytes:
+    """
+    Encoded heat-map tile.
+
+    Args:
+        table: City's sites
+        layer: Key of LAYERS
+        zoom, x, y: Tile coordinates
+        fmt: 'png' (colour-mapped) or 'npy' (float32 densities per km²)
+    """
+    cache = _table_cache(table)
+    key = (layer, zoom, x, y, fmt)
+    tile = cache["tiles"].get(key)
+    if tile is not None:
+        return tile
+
+    raster = heatmap_raster(table, layer, zoom)
+    if raster is None:
+        tile = EMPTY_PNG if fmt == 'png' else encode_npy(EMPTY_TILE)
+    else:
+        tile = raster.png(x, y) if fmt == 'png' else raster.npy(x, y)
+    return _remember(cache["tiles"], key, tile, MAX_TILES_PER_TABLE)
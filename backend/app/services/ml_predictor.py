@@ -3,11 +3,17 @@ ML prediction service for EV charging demand estimation.
 
 This service loads a trained scikit-learn model and provides
 predictions for new candidate locations.
+
+The model is unpickled on first use (or by the startup warm-up, see
+app/warmup.py) rather than at import, so importing the app stays fast.
 """
 import pickle
 import os
+import threading
+import time
 from typing import Dict, Optional
-import numpy as np
+
+from app.metrics import MODEL_INFERENCE_SECONDS
 
 
 class MLPredictor:
@@ -20,13 +26,15 @@ class MLPredictor:
     
     def __init__(self, model_path: str = "models/site_score_model.pkl"):
         """
-        Initialize predictor and load model if available.
+        Initialize predictor. The model is loaded lazily (see load).
         
         Args:
             model_path: Path to pickled scikit-learn model
         """
         self.model_path = model_path
-        self.model = None
+        self._model = None
+        self._loaded = False
+        self._lock = threading.Lock()
         self.feature_names = [
             'traffic_index',
             'pop_density_index',
@@ -36,18 +44,43 @@ class MLPredictor:
             'parking_lot_flag',
             'municipal_parcel_flag'
         ]
+    
+    @property
+    def model(self):
+        """The trained model, or None when unavailable (loads on first access)."""
+        if not self._loaded:
+            self.load()
+        return self._model
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether loading has been attempted (the model may still be None)."""
+        return self._loaded
+    
+    def load(self):
+        """
+        Load the model if available. Thread-safe; only the first call
+        reads the file.
         
-        # Try to load model
-        if os.path.exists(model_path):
-            try:
-                with open(model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                print(f"✓ Loaded ML model from {model_path}")
-            except Exception as e:
-                print(f"⚠ Failed to load model: {e}")
-                self.model = None
-        else:
-            print(f"ℹ No model found at {model_path}, will use heuristic fallback")
+        Returns:
+            The loaded model, or None (heuristic fallback)
+        """
+        with self._lock:
+            if self._loaded:
+                return self._model
+            
+            if os.path.exists(self.model_path):
+                try:
+                    with open(self.model_path, 'rb') as f:
+                        self._model = pickle.load(f)
+                    print(f"✓ Loaded ML model from {self.model_path}")
+                except Exception as e:
+                    print(f"⚠ Failed to load model: {e}")
+                    self._model = None
+            else:
+                print(f"ℹ No model found at {self.model_path}, will use heuristic fallback")
+            self._loaded = True
+        return self._model
     
     def predict_daily_kwh(self, features: Dict[str, float]) -> float:
         """
@@ -59,10 +92,14 @@ class MLPredictor:
         Returns:
             Predicted daily kWh demand
         """
-        if self.model is None:
+        model = self.model
+        if model is None:
             # Fallback to heuristic
             return self._heuristic_estimate(features)
         
+        import numpy as np
+        
+        start = time.perf_counter()
         try:
             # Prepare feature vector in correct order
             feature_vector = np.array([
@@ -70,7 +107,10 @@ class MLPredictor:
             ])
             
             # Predict
-            prediction = self.model.predict(feature_vector)[0]
+            prediction = model.predict(feature_vector)[0]
+            MODEL_INFERENCE_SECONDS.labels(type(model).__name__).observe(
+                time.perf_counter() - start
+            )
             
             # Ensure reasonable bounds
             return max(0.0, min(prediction, 1000.0))
@@ -89,6 +129,7 @@ class MLPredictor:
         Returns:
             Estimated daily kWh demand
         """
+        start = time.perf_counter()
         traffic_index = features.get('traffic_index', 0.0)
         pop_density_index = features.get('pop_density_index', 0.0)
         
@@ -96,6 +137,7 @@ class MLPredictor:
         sessions = 4.0 + 8.0 * traffic_index + 6.0 * pop_density_index
         kwh_per_session = 25.0
         
+        MODEL_INFERENCE_SECONDS.labels("heuristic_fallback").observe(time.perf_counter() - start)
         return sessions * kwh_per_session
     
     def get_model_info(self) -> Dict[str, any]:
@@ -105,7 +147,8 @@ class MLPredictor:
         Returns:
             Dictionary with model metadata
         """
-        if self.model is None:
+        model = self.model
+        if model is None:
             return {
                 "model_loaded": False,
                 "model_type": "heuristic_fallback",
@@ -114,11 +157,11 @@ class MLPredictor:
         
         return {
             "model_loaded": True,
-            "model_type": type(self.model).__name__,
+            "model_type": type(model).__name__,
             "feature_names": self.feature_names,
             "model_path": self.model_path
         }
 
 
-# Global predictor instance
+# Global predictor instance (model not loaded until first use)
 predictor = MLPredictor()
@@ -3,13 +3,19 @@ Scoring service for computing EV charging site opportunity scores.
 
 This module implements the heuristic scoring logic that evaluates
 potential EV charging locations across multiple dimensions:
-- Demand: Based on traffic, population density, and points of interest
+- Demand: Based on traffic, population density, and points of interest,
+  blended with the catchment index (population and POIs around the site)
+  when the pipeline has computed it
 - Equity: Focuses on lower-income areas and renters
 - Traffic: Direct traffic volume indicator
 - Grid: Infrastructure readiness (simplified for v1)
 - Overall: Weighted combination of all factors
 """
-from typing import Dict
+import math
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class ScoringService:
@@ -25,10 +31,18 @@ class ScoringService:
     DEMAND_POP_WEIGHT = 0.3
     DEMAND_POI_WEIGHT = 0.3
     
+    # Share of the demand score taken from the catchment index
+    DEMAND_CATCHMENT_WEIGHT = 0.25
+    
     # Weights for equity score calculation
     EQUITY_INCOME_WEIGHT = 0.5
     EQUITY_RENTERS_WEIGHT = 0.5
     
+    # Grid readiness points (simplified for v1)
+    GRID_BASE_SCORE = 50.0
+    GRID_PARKING_BONUS = 25.0
+    GRID_MUNICIPAL_BONUS = 15.0
+    
     # Weights for overall score calculation
     OVERALL_DEMAND_WEIGHT = 0.45
     OVERALL_EQUITY_WEIGHT = 0.35
@@ -67,6 +81,27 @@ class ScoringService:
         )
         return score * 100.0
     
+    @classmethod
+    def blend_catchment_demand(cls, score_demand: float, catchment_index: float) -> float:
+        """
+        Blend a point demand score with the site's catchment index.
+        
+        The point features only describe the site itself; the catchment
+        index (data/build_catchments.py) measures the population and POIs
+        within walking and short driving distance.
+        
+        Args:
+            score_demand: Demand score from compute_demand_score (0-100)
+            catchment_index: Catchment access index (0-1)
+        
+        Returns:
+            Demand score (0-100)
+        """
+        return (
+            (1.0 - cls.DEMAND_CATCHMENT_WEIGHT) * score_demand +
+            cls.DEMAND_CATCHMENT_WEIGHT * catchment_index * 100.0
+        )
+    
     @classmethod
     def compute_equity_score(
         cls,
@@ -130,11 +165,11 @@ class ScoringService:
         Returns:
             Grid score (0-100)
         """
-        base_score = 50.0  # Baseline assumption
+        base_score = cls.GRID_BASE_SCORE  # Baseline assumption
         if parking_lot_flag:
-            base_score += 25.0
+            base_score += cls.GRID_PARKING_BONUS
         if municipal_parcel_flag:
-            base_score += 15.0
+            base_score += cls.GRID_MUNICIPAL_BONUS
         return min(base_score, 100.0)
     
     @classmethod
@@ -203,6 +238,8 @@ class ScoringService:
                 - poi_index
                 - parking_lot_flag (optional)
                 - municipal_parcel_flag (optional)
+                - catchment_index (optional; demand is blended with it
+                  unless it is missing, None or NaN, i.e. not computed)
         
         Returns:
             Dictionary with all scores and estimates
@@ -215,11 +252,14 @@ class ScoringService:
         poi_index = features.get('poi_index', 0.0)
         parking_lot_flag = features.get('parking_lot_flag', 0)
         municipal_parcel_flag = features.get('municipal_parcel_flag', 0)
+        catchment_index = features.get('catchment_index')
         
         # Compute individual scores
         score_demand = cls.compute_demand_score(
             traffic_index, pop_density_index, poi_index
         )
+        if catchment_index is not None and not math.isnan(catchment_index):
+            score_demand = cls.blend_catchment_demand(score_demand, catchment_index)
         score_equity = cls.compute_equity_score(income_index, renters_share)
         score_traffic = cls.compute_traffic_score(traffic_index)
         score_grid = cls.compute_grid_score(
@@ -242,3 +282,73 @@ class ScoringService:
             'score_overall': score_overall,
             'daily_kwh_estimate': daily_kwh_estimate,
         }
+    
+    @classmethod
+    def compute_all_scores_batch(
+        cls,
+        features: Dict[str, "np.ndarray"]
+    ) -> Dict[str, "np.ndarray"]:
+        """
+        Vectorized version of compute_all_scores for many sites at once.
+        
+        Used by the data pipeline, which holds sites as columnar arrays.
+        
+        Args:
+            features: Dictionary mapping feature names to equal-length arrays
+                (same keys as compute_all_scores)
+        
+        Returns:
+            Dictionary mapping score names to arrays
+        """
+        # Imported here so the API does not pay for numpy at startup
+        import numpy as np
+        
+        n = len(next(iter(features.values()))) if features else 0
+        
+        def column(name):
+            values = features.get(name)
+            if values is None:
+                return np.zeros(n)
+            return np.asarray(values, dtype=float)
+        
+        traffic_index = column('traffic_index')
+        pop_density_index = column('pop_density_index')
+        parking_lot_flag = column('parking_lot_flag')
+        municipal_parcel_flag = column('municipal_parcel_flag')
+        
+        score_demand = cls.compute_demand_score(
+            traffic_index, pop_density_index, column('poi_index')
+        )
+        if features.get('catchment_index') is not None:
+            # Sites without a computed catchment (NULL → NaN) keep the point score
+            catchment_index = column('catchment_index')
+            score_demand = np.where(
+                np.isnan(catchment_index),
+                score_demand,
+                cls.blend_catchment_demand(score_demand, catchment_index)
+            )
+        score_equity = cls.compute_equity_score(
+            column('income_index'), column('renters_share')
+        )
+        score_traffic = cls.compute_traffic_score(traffic_index)
+        score_grid = np.minimum(
+            cls.GRID_BASE_SCORE +
+            cls.GRID_PARKING_BONUS * (parking_lot_flag != 0) +
+            cls.GRID_MUNICIPAL_BONUS * (municipal_parcel_flag != 0),
+            100.0
+        )
+        score_overall = cls.compute_overall_score(
+            score_demand, score_equity, score_grid
+        )
+        daily_kwh_estimate = cls.estimate_daily_kwh(
+            traffic_index, pop_density_index
+        )
+        
+        return {
+            'score_demand': score_demand,
+            'score_equity': score_equity,
+            'score_traffic': score_traffic,
+            'score_grid': score_grid,
+            'score_overall': score_overall,
+            'daily_kwh_estimate': daily_kwh_estimate,
+        }
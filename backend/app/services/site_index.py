@@ -0,0 +1,145 @@
+"""
+Nearest-neighbour index over one city's sites.
+
+Sites are placed on the unit sphere (x, y, z) and indexed with a SciPy
+KD-tree. The straight-line (chord) distance between two points on the
+sphere grows with their great-circle distance, so the KD-tree's nearest
+neighbours are the nearest sites on the ground. Distances are converted
+back to great-circle kilometres.
+
+An index is built lazily per SiteTable, i.e. once per dataset version
+(see SiteTable.spatial_index).
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def unit_vectors(lat, lng) -> np.ndarray:
+    """(n, 3) points on the unit sphere for arrays of degrees."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """Great-circle kilometres of chord lengths on the unit sphere."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+def km_to_chord(km):
+    """Chord length on the unit sphere of a great-circle distance in km."""
+    return 2 * np.sin(np.minimum(km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+class SiteIndex:
+    """
+    KD-tree over site coordinates with score-aware queries.
+
+    Queries fetch a growing number of nearest neighbours (k, 4k, 16k, ...)
+    until the answer is settled, so they only visit the neighbourhood of
+    the query point instead of every site in the city.
+    """
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, scores: np.ndarray):
+        """
+        Args:
+            lat, lng: Site coordinates in degrees (table row order)
+            scores: Overall score per row
+        """
+        self.tree = cKDTree(unit_vectors(lat, lng))
+        self.scores = scores
+        self.max_score = float(scores.max()) if len(scores) else 0.0
+
+    def __len__(self):
+        return self.tree.n
+
+    def _neighbours(self, point, count, max_km):
+        """Rows and km of the `count` nearest sites (within max_km), nearest first."""
+        bound = np.inf if max_km is None else km_to_chord(max_km) * (1 + 1e-12)
+        chords, rows = self.tree.query(point, k=count, distance_upper_bound=bound)
+        chords, rows = np.atleast_1d(chords), np.atleast_1d(rows)
+        found = rows < self.tree.n
+        # Fewer than `count` results means every site in range was returned
+        exhausted = count >= self.tree.n or not found.all()
+        return rows[found], chord_to_km(chords[found]), exhausted
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        min_score: Optional[float] = None,
+        max_km: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k nearest sites, nearest first.
+
+        Args:
+            lat, lng: Query point in degrees
+            k: Number of sites
+            min_score: Optional minimum overall score (inclusive)
+            max_km: Optional search radius
+
+        Returns:
+            (rows, distances in km)
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        point = unit_vectors([lat], [lng])[0]
+        count = k
+        while True:
+            rows, km, exhausted = self._neighbours(point, min(count, len(self)), max_km)
+            if min_score is not None:
+                keep = self.scores[rows] >= min_score
+                rows, km = rows[keep], km[keep]
+            if len(rows) >= k or exhausted:
+                return rows[:k], km[:k]
+            count *= 4
+
+    def best(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        km_weight: float,
+        min_score: Optional[float] = None,
+        max_km: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The k sites with the highest score - km_weight * distance.
+
+        A site farther than every fetched neighbour ranks at most
+        max_score - km_weight * (farthest distance), so the search stops
+        once the k-th best fetched site ranks at least that high.
+
+        Args:
+            lat, lng: Query point in degrees
+            k: Number of sites
+            km_weight: Score points given up per km of distance (> 0)
+            min_score: Optional minimum overall score (inclusive)
+            max_km: Optional search radius
+
+        Returns:
+            (rows, distances in km, combined ranks), best first
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        point = unit_vectors([lat], [lng])[0]
+        count = k
+        while True:
+            rows, km, exhausted = self._neighbours(point, min(count, len(self)), max_km)
+            farthest = km[-1] if len(km) else 0.0
+            if min_score is not None:
+                keep = self.scores[rows] >= min_score
+                rows, km = rows[keep], km[keep]
+            ranks = self.scores[rows] - km_weight * km
+            order = np.argsort(-ranks, kind='stable')[:k]
+            settled = len(order) == k and ranks[order[-1]] >= self.max_score - km_weight * farthest
+            if settled or exhausted:
+                return rows[order], km[order], ranks[order]
+            count *= 4
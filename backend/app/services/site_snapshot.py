@@ -0,0 +1,128 @@
+"""
+Immutable, memory-mapped snapshots of a city's published sites.
+
+After a publish the pipeline writes each city's sites as one
+uncompressed Arrow IPC file per dataset version:
+
+    <snapshot dir>/<city>/v<version>.arrow
+    <snapshot dir>/<city>/CURRENT          (name of the current file)
+
+API processes open the current file with mmap. The numeric columns
+become read-only NumPy views of the mapping and the string columns stay
+Arrow arrays, so every worker shares one physical copy through the page
+cache instead of holding its own. A new version is written to a
+temporary name and renamed into place, then CURRENT is replaced the same
+way. Readers that still map an older version keep a valid mapping until
+they swap their table.
+"""
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from app.config import settings
+from app.services.site_table import COLUMNS, SiteTable
+
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parents[3] / "data" / "processed" / "snapshots"
+
+CURRENT = "CURRENT"
+
+
+def snapshot_dir(directory=None) -> Path:
+    """Snapshot root (argument, SITE_SNAPSHOT_DIR or data/processed/snapshots)."""
+    return Path(directory or settings.site_snapshot_dir or DEFAULT_SNAPSHOT_DIR)
+
+
+def snapshot_path(city, version, directory=None) -> Path:
+    return snapshot_dir(directory) / city / f"v{version or 0}.arrow"
+
+
+def to_arrow(table: SiteTable) -> pa.Table:
+    """Arrow table of a SiteTable's columns (strings as nullable utf8)."""
+    arrays = {}
+    for name, dtype in COLUMNS.items():
+        column = table.columns[name]
+        if dtype is object:
+            values = column.tolist() if isinstance(column, np.ndarray) else column.to_pylist()
+            arrays[name] = pa.array(values, type=pa.string())
+        else:
+            arrays[name] = pa.array(np.ascontiguousarray(column))
+    return pa.table(arrays)
+
+
+def _replace_atomically(path: Path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def write_snapshot(table: SiteTable, directory=None, keep=2) -> Path:
+    """
+    Write a city's table as its current snapshot.
+
+    Args:
+        table: SiteTable read from the published sites
+        directory: Snapshot root (see snapshot_dir)
+        keep: Number of versions kept per city (older files are removed)
+
+    Returns:
+        Path of the snapshot file
+    """
+    path = snapshot_path(table.city, table.version, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrow_table = to_arrow(table)
+
+    def write_file(tmp):
+        # One record batch, so every column maps as a single buffer
+        with pa.OSFile(str(tmp), 'wb') as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table, max_chunksize=max(1, len(table)))
+
+    _replace_atomically(path, write_file)
+    _replace_atomically(path.parent / CURRENT, lambda tmp: tmp.write_text(path.name))
+
+    versions = sorted(path.parent.glob("v*.arrow"), key=lambda p: int(p.stem[1:]), reverse=True)
+    for old in versions[keep:]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def current_snapshot(city, directory=None) -> Optional[Tuple[int, Path]]:
+    """
+    Returns:
+        (version, path) of a city's current snapshot, or None
+    """
+    pointer = snapshot_dir(directory) / city / CURRENT
+    try:
+        name = pointer.read_text().strip()
+    except OSError:
+        return None
+    path = pointer.parent / name
+    if not path.exists():
+        return None
+    return int(Path(name).stem[1:]), path
+
+
+def open_snapshot(path, city, version) -> SiteTable:
+    """
+    Memory-map a snapshot file as a SiteTable (no copy of the columns).
+    """
+    # The arrays keep the mapping alive; it is unmapped with the table
+    source = pa.memory_map(str(path), 'r')
+    arrow_table = pa.ipc.open_file(source).read_all()
+
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        column = arrow_table.column(name)
+        array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        if dtype is object:
+            columns[name] = array
+        else:
+            columns[name] = array.to_numpy(zero_copy_only=len(array) > 0)
+    return SiteTable(city, version, columns)
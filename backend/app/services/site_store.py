@@ -0,0 +1,200 @@
+"""
+In-process store of the published sites, one SiteTable per city.
+
+The read endpoints (/api/sites, /api/sites/{id}, /api/stats) are served
+from memory. A city is (re)loaded from its memory-mapped snapshot
+(app/services/site_snapshot.py) when the current snapshot is the
+published version, so all worker processes share one copy; otherwise
+from the database. Loads happen:
+- at startup, by the warm-up (app/warmup.py), for every registered city
+- on first use of a city that is not loaded yet
+- in the background, when the dataset version published for a city
+  (read by the health monitor, app/health.py) differs from the loaded one
+- in the background, when a table read from the database gets its
+  snapshot (the pipeline writes snapshots right after publishing)
+
+A reload builds a new SiteTable and swaps it in with a single
+assignment, so readers never wait on it and never see a partial table.
+NumPy is imported with the first table, not with the app.
+"""
+import logging
+import threading
+import time
+
+from app.cities import CITIES
+from app.config import settings
+
+logger = logging.getLogger("app.site_store")
+
+
+class SiteStore:
+    """Per-city SiteTables, loaded on demand and refreshed on new versions."""
+
+    def __init__(self, session_factory=None, snapshot_dir=None):
+        """
+        Args:
+            session_factory: Callable returning a session context manager
+                used for loads (default: app.database.read_session)
+            snapshot_dir: Snapshot root (default: see site_snapshot.snapshot_dir)
+        """
+        self.session_factory = session_factory
+        self.snapshot_dir = snapshot_dir
+        self._tables = {}
+        self._load_lock = threading.Lock()
+        self._refreshing = set()
+        self._last_load = {}
+        self._last_snapshot_check = {}
+
+    def reset(self, session_factory=None, snapshot_dir=None):
+        """Drop every table (and set the session factory and snapshot root)."""
+        with self._load_lock:
+            self.session_factory = session_factory
+            self.snapshot_dir = snapshot_dir
+            self._tables = {}
+            self._refreshing = set()
+            self._last_load = {}
+            self._last_snapshot_check = {}
+
+    def published_version(self, city):
+        """Latest version the health monitor saw for a city (or None)."""
+        from app.health import db_monitor
+        return db_monitor.versions.get(city)
+
+    def get(self, city):
+        """
+        Table of a city, loading it on first use.
+
+        A stale table is still returned while a background reload runs.
+        """
+        table = self._tables.get(city)
+        if table is None:
+            return self.load(city)
+
+        published = self.published_version(city)
+        if published is not None and published != table.version:
+            self._refresh_in_background(city)
+        elif not table.mapped and self._snapshot_ready(city, table):
+            # Read from the database before the pipeline wrote the snapshot
+            self._refresh_in_background(city)
+        return table
+
+    def _snapshot_ready(self, city, table):
+        """Whether a snapshot of the loaded version exists (checked once per interval)."""
+        from app.services.site_snapshot import current_snapshot
+
+        now = time.monotonic()
+        if now - self._last_snapshot_check.get(city, 0.0) < settings.health_check_interval:
+            return False
+        self._last_snapshot_check[city] = now
+        current = current_snapshot(city, self.snapshot_dir)
+        return current is not None and current[0] == (table.version or 0)
+
+    def load(self, city, force=False):
+        """Map the city's snapshot or read it from the database, and swap in its table."""
+        from app.services.site_table import SiteTable
+
+        with self._load_lock:
+            table = self._tables.get(city)
+            if table is not None and not force:
+                return table
+
+            self._last_load[city] = time.monotonic()
+            table = self._open_snapshot(city)
+            if table is None:
+                with self._session() as session:
+                    table = SiteTable.load(session, city)
+            self._tables = {**self._tables, city: table}
+            return table
+
+    def _session(self):
+        if self.session_factory is not None:
+            return self.session_factory()
+        from app.database import read_session
+        return read_session()
+
+    def _open_snapshot(self, city):
+        """The city's current snapshot, unless it is older than the published version."""
+        from app.services.site_snapshot import current_snapshot, open_snapshot
+
+        current = current_snapshot(city, self.snapshot_dir)
+        if current is None:
+            return None
+        version, path = current
+        published = self.published_version(city)
+        if published is not None and version != published:
+            return None
+        try:
+            return open_snapshot(path, city, version)
+        except Exception as e:
+            logger.warning("Site store: cannot map snapshot %s, reading the database: %s", path, e)
+            return None
+
+    def load_all(self):
+        """Load every registered city that is not loaded yet; returns the tables."""
+        return [self.get(city) for city in CITIES]
+
+    def _refresh_in_background(self, city):
+        # At most one reload per city at a time, and not more often than
+        # the health check interval (a lagging replica may still serve
+        # the previous version)
+        last = self._last_load.get(city, 0.0)
+        if city in self._refreshing or time.monotonic() - last < settings.health_check_interval:
+            return
+        self._refreshing.add(city)
+        threading.Thread(target=self._refresh, args=(city,), name=f"site-store-{city}", daemon=True).start()
+
+    def _refresh(self, city):
+        try:
+            table = self.load(city, force=True)
+            logger.info("Site store: %s reloaded at version %s (%d sites)", city, table.version, len(table))
+        except Exception as e:
+            logger.warning("Site store: reloading %s failed, serving the loaded version: %s", city, e)
+        finally:
+            self._refreshing.discard(city)
+
+    def find(self, site_id):
+        """
+        Locate a site id in any city.
+
+        The loaded tables are searched first (a binary search each). An id
+        in none of them is looked up by primary key in the database to
+        learn its city, and only that city is loaded.
+
+        Returns:
+            (SiteTable, row) or None
+        """
+        for table in list(self._tables.values()):
+            row = table.row(site_id)
+            if row is not None:
+                return table, row
+
+        city = self._city_of(site_id)
+        if city not in CITIES:
+            return None
+        table = self.get(city)
+        row = table.row(site_id)
+        return (table, row) if row is not None else None
+
+    def _city_of(self, site_id):
+        """City of a site id according to the database (None if unknown)."""
+        from sqlalchemy import select
+        from app.models import Site
+
+        with self._session() as session:
+            return session.execute(select(Site.city).where(Site.id == site_id)).scalar()
+
+    def status(self):
+        """Loaded tables: version, sites, array size and source per city."""
+        return {
+            city: {
+                "version": table.version,
+                "sites": len(table),
+                "bytes": table.nbytes,
+                "source": "snapshot" if table.mapped else "database",
+            }
+            for city, table in self._tables.items()
+        }
+
+
+# Store used by the API routes
+site_store = SiteStore()
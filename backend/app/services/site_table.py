@@ -0,0 +1,258 @@
+"""
+Columnar in-memory table of one city's published sites.
+
+Holds every `Site` column as a NumPy array, ordered by id so the id
+column doubles as the id → row index (binary search), plus the row
+order by descending overall score. Top-N, score filtering, id lookup and
+the city aggregates are answered from the arrays; the output matches
+Site.to_geojson_feature / Site.to_dict. Nearest-site queries use a
+KD-tree built on first use (app/services/site_index.py).
+
+String columns are NumPy object arrays when read from the database, or
+Arrow arrays when mapped from a snapshot (app/services/site_snapshot.py).
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.dataset_version import DatasetVersion
+from app.models.site import CATCHMENT_TOTALS, Site
+
+# Column name → dtype (object columns hold strings or None)
+COLUMNS = {
+    'id': np.int64,
+    'city': object,
+    'lat': np.float64,
+    'lng': np.float64,
+    'location_label': object,
+    'parcel_id': object,
+    'traffic_index': np.float64,
+    'pop_density_index': np.float64,
+    'renters_share': np.float64,
+    'income_index': np.float64,
+    'poi_index': np.float64,
+    'parking_lot_flag': np.int64,
+    'municipal_parcel_flag': np.int64,
+    **{name: np.float64 for name in CATCHMENT_TOTALS},
+    'catchment_index': np.float64,
+    'score_demand': np.float64,
+    'score_equity': np.float64,
+    'score_traffic': np.float64,
+    'score_grid': np.float64,
+    'score_overall': np.float64,
+    'daily_kwh_estimate': np.float64,
+}
+
+FEATURE_COLUMNS = [
+    'traffic_index', 'pop_density_index', 'renters_share', 'income_index', 'poi_index',
+]
+FLAG_COLUMNS = ['parking_lot_flag', 'municipal_parcel_flag']
+SCORE_NAMES = ['demand', 'equity', 'traffic', 'grid', 'overall']
+
+
+def _rounded(values, digits):
+    """Python floats rounded like the ORM serializers (round())."""
+    return [round(value, digits) for value in values.tolist()]
+
+
+def _rounded_or_none(value, digits):
+    """round() a nullable value (NULL columns are NaN or None here)."""
+    if value is None or value != value:
+        return None
+    return round(value, digits)
+
+
+def _take(column, rows):
+    """Values at `rows` as Python objects (NumPy or Arrow column)."""
+    if isinstance(column, np.ndarray):
+        return column[rows].tolist()
+    return column.take(rows).to_pylist()
+
+
+def _item(column, row):
+    """Value at `row` as a Python object (NumPy or Arrow column)."""
+    if isinstance(column, np.ndarray):
+        return column[row].item() if column.dtype != object else column[row]
+    return column[row].as_py()
+
+
+class SiteTable:
+    """
+    Immutable columnar table of one city's sites.
+
+    Attributes:
+        city: City slug
+        version: Dataset version the rows were read at (None if the city
+            was never published through the pipeline)
+        columns: Mapping of column name → array, sorted by id
+    """
+
+    def __init__(self, city: str, version: Optional[int], columns: Dict[str, np.ndarray]):
+        self.city = city
+        self.version = version
+        self.columns = columns
+        self.ids = columns['id']
+        # Rows by descending overall score, and the scores in that order
+        self.order = np.argsort(-columns['score_overall'], kind='stable')
+        self._sorted_scores = columns['score_overall'][self.order]
+        self.stats = self._compute_stats()
+        self._spatial_index = None
+
+    @classmethod
+    def from_rows(cls, city, version, rows):
+        """Build from row tuples in COLUMNS order (need not be sorted)."""
+        if rows:
+            values = list(zip(*rows))
+        else:
+            values = [()] * len(COLUMNS)
+        columns = {}
+        for (name, dtype), column in zip(COLUMNS.items(), values):
+            if dtype is np.int64:
+                column = [value or 0 for value in column]
+            columns[name] = np.array(column, dtype=dtype)
+
+        by_id = np.argsort(columns['id'], kind='stable')
+        if not np.array_equal(by_id, np.arange(len(by_id))):
+            columns = {name: array[by_id] for name, array in columns.items()}
+        return cls(city, version, columns)
+
+    @classmethod
+    def load(cls, session, city):
+        """
+        Read a city's sites and dataset version (two queries, one session).
+        """
+        version = session.execute(
+            select(DatasetVersion.version).where(DatasetVersion.city == city)
+        ).scalar()
+        table = Site.__table__
+        rows = session.execute(
+            select(*[table.c[name] for name in COLUMNS]).where(table.c.city == city).order_by(table.c.id)
+        ).all()
+        return cls.from_rows(city, version, rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        """Size of the numeric columns."""
+        return sum(
+            column.nbytes for column in self.columns.values()
+            if isinstance(column, np.ndarray) and column.dtype != object
+        )
+
+    @property
+    def mapped(self):
+        """Whether the columns are read-only views of a mapped snapshot."""
+        return not self.ids.flags.writeable
+
+    @property
+    def spatial_index(self):
+        """KD-tree over the site coordinates (built once per table)."""
+        if self._spatial_index is None:
+            from app.services.site_index import SiteIndex
+            self._spatial_index = SiteIndex(self.columns['lat'], self.columns['lng'], self.columns['score_overall'])
+        return self._spatial_index
+
+    def row(self, site_id: int) -> Optional[int]:
+        """Row of a site id, or None."""
+        row = int(np.searchsorted(self.ids, site_id))
+        if row < len(self.ids) and self.ids[row] == site_id:
+            return row
+        return None
+
+    def top(self, limit: int, min_score: Optional[float] = None) -> np.ndarray:
+        """
+        Rows of the best sites, best first.
+
+        Args:
+            limit: Maximum number of rows
+            min_score: Optional minimum overall score (inclusive)
+        """
+        count = len(self.order)
+        if min_score is not None:
+            # Scores are descending, so the matches are a prefix
+            count = int(np.searchsorted(-self._sorted_scores, -min_score, side='right'))
+        return self.order[:min(limit, count)]
+
+    def geojson_features(self, rows) -> List[dict]:
+        """GeoJSON features of the given rows (see Site.to_geojson_feature)."""
+        c = {name: self.columns[name][rows] for name in ('id', 'lat', 'lng', 'daily_kwh_estimate')}
+        scores = {name: _rounded(self.columns[f'score_{name}'][rows], 1) for name in SCORE_NAMES}
+        kwh = _rounded(c['daily_kwh_estimate'], 1)
+        return [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lng, lat]},
+                "properties": {
+                    "id": site_id,
+                    "city": city,
+                    "location_label": label,
+                    "score_overall": overall,
+                    "score_demand": demand,
+                    "score_equity": equity,
+                    "score_traffic": traffic,
+                    "score_grid": grid,
+                    "daily_kwh_estimate": daily_kwh,
+                },
+            }
+            for site_id, city, lng, lat, label, overall, demand, equity, traffic, grid, daily_kwh in zip(
+                c['id'].tolist(), _take(self.columns['city'], rows), c['lng'].tolist(), c['lat'].tolist(),
+                _take(self.columns['location_label'], rows), scores['overall'], scores['demand'], scores['equity'],
+                scores['traffic'], scores['grid'], kwh,
+            )
+        ]
+
+    def site_dict(self, row: int) -> dict:
+        """Full record of one row (see Site.to_dict)."""
+        value = {name: _item(column, row) for name, column in self.columns.items()}
+        return {
+            "id": value['id'],
+            "city": value['city'],
+            "lat": value['lat'],
+            "lng": value['lng'],
+            "location_label": value['location_label'],
+            "parcel_id": value['parcel_id'],
+            "features": {
+                **{name: round(value[name], 3) for name in FEATURE_COLUMNS},
+                **{name: value[name] for name in FLAG_COLUMNS},
+                "catchment_index": _rounded_or_none(value['catchment_index'], 3),
+            },
+            "catchment": {name[len('catchment_'):]: round(value[name], 1) for name in CATCHMENT_TOTALS},
+            "scores": {name: round(value[f'score_{name}'], 1) for name in SCORE_NAMES},
+            "daily_kwh_estimate": round(value['daily_kwh_estimate'], 1),
+        }
+
+    def _compute_stats(self):
+        """Aggregates served by /api/stats (computed once per version)."""
+        if not len(self):
+            return None
+        scores = self.columns['score_overall']
+        demands = self.columns['daily_kwh_estimate']
+        top = self.order[:10]
+        return {
+            "score_stats": {
+                "min": round(float(scores.min()), 1),
+                "max": round(float(scores.max()), 1),
+                "mean": round(float(scores.mean()), 1),
+            },
+            "demand_stats": {
+                "total_daily_kwh": round(float(demands.sum()), 0),
+                "mean_daily_kwh": round(float(demands.mean()), 1),
+            },
+            "top_sites": [
+                {
+                    "id": site_id,
+                    "location_label": label,
+                    "score_overall": overall,
+                    "daily_kwh_estimate": daily_kwh,
+                }
+                for site_id, label, overall, daily_kwh in zip(
+                    self.ids[top].tolist(),
+                    _take(self.columns['location_label'], top),
+                    _rounded(scores[top], 1),
+                    _rounded(demands[top], 1),
+                )
+            ],
+        }
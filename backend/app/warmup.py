@@ -0,0 +1,127 @@
+"""
+Startup warm-up for the API process.
+
+Work that is not needed to import the app runs here instead of at
+import time:
+- schema: create missing tables and columns (only when
+  CREATE_TABLES_ON_STARTUP is set, for local development) or check that the published tables and
+  columns exist
+- model: unpickle the ML model (app/services/ml_predictor.py)
+- sites: load every city into the in-memory site store
+  (app/services/site_store.py)
+
+The steps run before serving by default, or in a background thread with
+FAST_START=true. The production server runs them in the master process
+before forking so workers share the loaded model and site tables. Each step's outcome
+is kept in `warm_up.status()`.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import inspect
+
+from app.config import settings
+
+logger = logging.getLogger("app.warmup")
+
+
+def ddl_on_startup():
+    """Whether startup may create tables (CREATE_TABLES_ON_STARTUP, off by default)."""
+    return settings.create_tables_on_startup
+
+
+def prepare_schema():
+    """
+    Create the tables, or check that they exist when DDL is disabled.
+
+    Returns:
+        "created" or "checked"
+
+    Raises:
+        RuntimeError: If tables or columns are missing and DDL is disabled
+    """
+    from app import models  # noqa: F401  (registers the tables on Base)
+    from app.database import Base, engine, init_db, missing_columns
+
+    if ddl_on_startup():
+        init_db()
+        return "created"
+
+    inspector = inspect(engine)
+    missing = [name for name in Base.metadata.tables if not inspector.has_table(name)]
+    if missing:
+        raise RuntimeError(
+            f"Missing tables: {', '.join(missing)}. "
+            f"Run the data pipeline or set CREATE_TABLES_ON_STARTUP=true"
+        )
+    columns = [f"{table.name}.{column.name}" for table, column in missing_columns(engine)]
+    if columns:
+        raise RuntimeError(
+            f"Missing columns: {', '.join(columns)}. "
+            f"Run the data pipeline or set CREATE_TABLES_ON_STARTUP=true"
+        )
+    return "checked"
+
+
+def load_model():
+    """Load the ML model; returns its type."""
+    from app.services.ml_predictor import predictor
+    predictor.load()
+    return predictor.get_model_info()["model_type"]
+
+
+def load_sites():
+    """Load the site store; returns a summary."""
+    from app.services.site_store import site_store
+    tables = site_store.load_all()
+    return f"{sum(len(table) for table in tables)} sites in {len(tables)} cities"
+
+
+class WarmUp:
+    """Runs the warm-up steps once and records their outcome."""
+
+    STEPS = (("schema", prepare_schema), ("model", load_model), ("sites", load_sites))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.steps = {name: {"status": "pending"} for name, _ in self.STEPS}
+
+    @property
+    def done(self):
+        return all(step["status"] != "pending" for step in self.steps.values())
+
+    def run(self):
+        """Run the pending steps in this thread (no-op once done)."""
+        with self._lock:
+            for name, step in self.STEPS:
+                if self.steps[name]["status"] != "pending":
+                    continue
+                start = time.perf_counter()
+                try:
+                    result = step()
+                    self.steps[name] = {"status": "ok", "result": result}
+                except Exception as e:
+                    logger.warning("Warm-up step '%s' failed: %s", name, e)
+                    self.steps[name] = {"status": "failed", "error": str(e)}
+                self.steps[name]["duration_s"] = round(time.perf_counter() - start, 3)
+        return self.status()
+
+    def start(self):
+        """Run the steps in a background thread; returns the thread."""
+        if self._thread is None and not self.done:
+            self._thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def status(self):
+        """
+        Returns:
+            Dictionary with `done` and, per step, its status ("pending",
+            "ok" or "failed"), result or error and duration
+        """
+        return {"done": self.done, "steps": {name: dict(step) for name, step in self.steps.items()}}
+
+
+warm_up = WarmUp()
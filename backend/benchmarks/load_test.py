@@ -0,0 +1,244 @@
+"""
+Load generator for the MA EV ChargeMap API.
+
+Drives the API with a weighted mix of requests from many concurrent
+clients for a fixed duration and reports throughput, latency
+percentiles (p50/p95/p99) and error rate, overall and per endpoint.
+
+Targets:
+- in-process: the FastAPI `app` through httpx's ASGI transport (no
+  network or server; uses the configured DATABASE_URL)
+- a running server: `--url http://localhost:8000`
+
+Endpoints (name=weight in --mix):
+    sites    GET  /api/sites?city=<city>&limit=<limit>
+    site     GET  /api/sites/{id}   (ids sampled from the city's sites)
+    predict  POST /api/predict      (random features)
+    stats    GET  /api/stats/<city>
+
+Usage (from backend/):
+    python -m benchmarks.load_test --duration 30 --concurrency 32
+    python -m benchmarks.load_test --url http://localhost:8000 --mix sites=6,site=3,predict=1
+    python -m benchmarks.load_test --mix stats=1 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+
+DEFAULT_MIX = {'sites': 4, 'site': 4, 'predict': 1, 'stats': 1}
+
+PREDICT_FEATURES = ['traffic_index', 'pop_density_index', 'renters_share', 'income_index', 'poi_index']
+
+
+def parse_mix(value):
+    """'sites=4,site=4,predict=1' → {'sites': 4.0, 'site': 4.0, 'predict': 1.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint '{name}'. Choose from: {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+class RequestFactory:
+    """Builds the next request for each endpoint of the mix."""
+
+    def __init__(self, city, limit, site_ids, seed=None):
+        self.city = city
+        self.limit = limit
+        self.site_ids = site_ids
+        self.rng = random.Random(seed)
+
+    def build(self, name):
+        """Returns (method, path, json body or None)."""
+        if name == 'sites':
+            return 'GET', f"/api/sites?city={self.city}&limit={self.limit}", None
+        if name == 'site':
+            return 'GET', f"/api/sites/{self.rng.choice(self.site_ids)}", None
+        if name == 'predict':
+            body = {feature: round(self.rng.random(), 3) for feature in PREDICT_FEATURES}
+            body['parking_lot_flag'] = self.rng.randint(0, 1)
+            return 'POST', "/api/predict", body
+        return 'GET', f"/api/stats/{self.city}", None
+
+
+async def discover_site_ids(client, city, count=1000):
+    """Site ids of the city (for the 'site' endpoint)."""
+    response = await client.get(f"/api/sites?city={city}&limit={count}")
+    response.raise_for_status()
+    return [feature['properties']['id'] for feature in response.json()['features']]
+
+
+async def _worker(client, factory, names, weights, deadline, samples):
+    while time.perf_counter() < deadline:
+        name = factory.rng.choices(names, weights)[0]
+        method, path, body = factory.build(name)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = None
+        samples[name].append((time.perf_counter() - start, status))
+
+
+def summarize(samples, elapsed):
+    """
+    Aggregate raw samples into a report.
+
+    Args:
+        samples: Mapping of endpoint → list of (latency seconds, status or None)
+        elapsed: Duration of the measured run in seconds
+
+    Returns:
+        Dictionary with overall and per-endpoint requests, throughput,
+        error rate and latency percentiles (milliseconds)
+    """
+    def stats(entries):
+        if not entries:
+            return {'requests': 0}
+        latencies = np.array([latency for latency, _ in entries]) * 1000
+        errors = sum(1 for _, status in entries if status is None or status >= 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            'requests': len(entries),
+            'rps': round(len(entries) / elapsed, 1),
+            'error_rate': round(errors / len(entries), 4),
+            'mean_ms': round(float(latencies.mean()), 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2),
+        }
+
+    return {
+        'duration_s': round(elapsed, 2),
+        'total': stats([entry for entries in samples.values() for entry in entries]),
+        'endpoints': {name: stats(entries) for name, entries in sorted(samples.items())},
+    }
+
+
+async def run_load(client, mix=None, concurrency=16, duration=10.0, warmup=1.0,
+                   city='worcester', limit=100, seed=None):
+    """
+    Run a load test against an httpx.AsyncClient.
+
+    Args:
+        client: AsyncClient with base_url (ASGI transport or real server)
+        mix: Mapping of endpoint name → weight (default DEFAULT_MIX)
+        concurrency: Number of concurrent clients
+        duration: Measured seconds
+        warmup: Seconds of unmeasured load before the run
+        city: City slug used by the sites/site/stats endpoints
+        limit: `limit` parameter of /api/sites
+        seed: Random seed for reproducible request sequences
+
+    Returns:
+        Report dictionary (see summarize)
+    """
+    mix = mix or DEFAULT_MIX
+    site_ids = await discover_site_ids(client, city) if 'site' in mix else []
+    if 'site' in mix and not site_ids:
+        raise RuntimeError(f"No sites for '{city}'; run the data pipeline or drop 'site' from the mix")
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    async def phase(seconds):
+        samples = defaultdict(list)
+        deadline = time.perf_counter() + seconds
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(
+                client,
+                RequestFactory(city, limit, site_ids, seed=None if seed is None else seed + i),
+                names, weights, deadline, samples,
+            )
+            for i in range(concurrency)
+        ])
+        return samples, time.perf_counter() - start
+
+    if warmup > 0:
+        await phase(warmup)
+    samples, elapsed = await phase(duration)
+    return summarize(samples, elapsed)
+
+
+def make_client(url=None, concurrency=16, timeout=30.0):
+    """AsyncClient for a server URL, or for the in-process app."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout)
+
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+
+def print_report(report):
+    total = report['total']
+    print(f"\n🚦 {total['requests']:,} requests in {report['duration_s']}s "
+          f"→ {total.get('rps', 0):,.1f} req/s, {total.get('error_rate', 0):.2%} errors")
+    print(f"  {'endpoint':<10} {'reqs':>8} {'req/s':>9} {'err':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, stats in [*report['endpoints'].items(), ('total', total)]:
+        if not stats['requests']:
+            continue
+        print(
+            f"  {name:<10} {stats['requests']:>8,} {stats['rps']:>9,.1f} {stats['error_rate']:>7.2%} "
+            f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms"
+        )
+
+
+async def _main(args):
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    target = args.url or "in-process app (ASGI transport)"
+    print(f"⏱  Load test: {target}, {args.concurrency} clients, {args.duration}s, mix {mix}")
+
+    async with make_client(args.url, args.concurrency) as client:
+        report = await run_load(
+            client,
+            mix=mix,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            city=args.city,
+            limit=args.limit,
+            seed=args.seed,
+        )
+
+    report.update({'target': target, 'concurrency': args.concurrency, 'mix': mix})
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report: {args.json}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the MA EV ChargeMap API")
+    parser.add_argument('--url', help="Server to test (default: the app in-process)")
+    parser.add_argument('--mix', help="Endpoint weights, e.g. sites=4,site=4,predict=1,stats=1")
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Unmeasured warm-up seconds")
+    parser.add_argument('--city', default='worcester', help="City slug for site endpoints")
+    parser.add_argument('--limit', type=int, default=100, help="limit parameter of /api/sites")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed")
+    parser.add_argument('--json', help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args))
+    return 1 if report['total']['requests'] == 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
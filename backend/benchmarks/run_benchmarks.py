@@ -0,0 +1,415 @@
+"""
+Benchmark suite for MA EV ChargeMap.
+
+Generates synthetic sites at a given scale into a local SQLite database
+(or any DATABASE_URL, e.g. Postgres), then times:
+- ScoringService (per-site and vectorized batch)
+- Site.to_geojson_feature / Site.to_dict
+- the in-memory site store (top-N features, id lookup) and opening /
+  serving its memory-mapped snapshot
+- building the nearest-site KD-tree
+- the portfolio optimizer (coverage matrix, lazy greedy for 500 sites)
+- heat-map rasters (FFT kernel density at zoom 13) and PNG tile encoding
+- GET /api/sites, GET /api/sites/nearest, GET /api/stats/{city},
+  GET /api/optimize/{city}, GET /api/heatmap/..., POST /api/predict
+- the pipeline stages (parcels, demographics, traffic, catchment at full
+  scale, scores)
+
+Results are written as JSON to `benchmarks/results/`. With
+`--save-baseline` they become the baseline for that scale and database;
+later runs compare their median times against it and exit with status 1
+when a benchmark is slower by more than `--threshold`.
+
+Usage (from backend/):
+    python -m benchmarks.run_benchmarks --scale 1k
+    python -m benchmarks.run_benchmarks --scale 100k --save-baseline
+    python -m benchmarks.run_benchmarks --scale 1m --threshold 0.1
+    python -m benchmarks.run_benchmarks --scale 1k --database-url postgresql://...
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, add_missing_columns, get_db
+from app.main import app
+from app.models import Site
+from app.models.site import CATCHMENT_TOTALS
+from app.services.scoring import ScoringService
+from app.services.heatmap import TILE_SIZE, HeatmapRaster, world_pixels
+from app.services.site_index import SiteIndex
+from app.services.site_optimizer import CoverageProblem
+from app.services.site_snapshot import open_snapshot, write_snapshot
+from app.services.site_store import site_store
+from site_frame import FEATURE_COLUMNS, SCORE_COLUMNS, SITE_COLUMNS, bump_dataset_version, resolve_city
+
+import build_catchments
+import build_scores
+import ingest_demographics
+import ingest_parcels
+import ingest_traffic
+
+
+BENCH_DIR = Path(__file__).parent
+DATA_DIR = BENCH_DIR / ".data"
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE_DIR = BENCH_DIR / "baselines"
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+# Sites are generated for a registered city so the API accepts it
+BENCH_CITY = 'worcester'
+
+# Relative slowdown of the median counted as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Caps keeping per-object benchmarks and the per-site pipeline loops
+# to a few seconds at the largest scales
+SCALAR_MAX_ROWS = 100_000
+SERIALIZE_MAX_ROWS = 10_000
+STAGE_MAX_ROWS = 100_000
+
+INSERT_CHUNK_SIZE = 50_000
+
+
+def parse_scale(value):
+    """'1k' / '100k' / '1m' or a plain number of sites."""
+    return SCALES.get(value.lower()) or int(value)
+
+
+def synthetic_sites(count, city, seed=0):
+    """
+    Site frame with random features and consistent scores.
+
+    Sites are spread uniformly over the city's bounding box.
+    """
+    rng = np.random.default_rng(seed)
+    west, south, east, north = city['bbox']
+    df = pd.DataFrame({
+        'city': city['slug'],
+        'lat': rng.uniform(south, north, count),
+        'lng': rng.uniform(west, east, count),
+        'location_label': [f"Bench site {i}" for i in range(count)],
+        'parcel_id': [f"BENCH-{i}" for i in range(count)],
+        'traffic_index': rng.random(count),
+        'pop_density_index': rng.random(count),
+        'renters_share': rng.random(count),
+        'income_index': rng.random(count),
+        'poi_index': rng.random(count),
+        'parking_lot_flag': (rng.random(count) < 0.3).astype(int),
+        'municipal_parcel_flag': (rng.random(count) < 0.1).astype(int),
+        **{name: rng.uniform(0, 50000, count) for name in CATCHMENT_TOTALS},
+        'catchment_index': rng.random(count),
+    })
+    scores = ScoringService.compute_all_scores_batch({name: df[name].to_numpy() for name in FEATURE_COLUMNS})
+    for name in SCORE_COLUMNS:
+        df[name] = scores[name].round(1)
+    return df
+
+
+def prepare_database(database_url, count, city, regenerate=False):
+    """
+    Create the benchmark database with `count` sites for the city.
+
+    An existing database that already holds exactly `count` sites for
+    the city is reused unless `regenerate` is set.
+
+    Returns:
+        SQLAlchemy engine
+    """
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    add_missing_columns(engine)
+
+    with engine.connect() as conn:
+        existing = conn.execute(
+            select(func.count()).select_from(Site).where(Site.city == city['slug'])
+        ).scalar()
+    if existing == count and not regenerate:
+        return engine
+
+    print(f"  Generating {count:,} synthetic sites...")
+    sites_df = synthetic_sites(count, city)
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.delete().where(Site.city == city['slug']))
+        for start in range(0, count, INSERT_CHUNK_SIZE):
+            chunk = sites_df.iloc[start:start + INSERT_CHUNK_SIZE]
+            conn.execute(insert(Site), chunk[SITE_COLUMNS].to_dict('records'))
+        bump_dataset_version(conn, city['slug'], count)
+    return engine
+
+
+def time_call(fn, repeat):
+    """Run fn `repeat` times; returns the list of durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def quiet(fn):
+    """Wrap a pipeline stage so its progress output is discarded."""
+    def run():
+        with redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def build_benchmarks(engine, count, city):
+    """
+    Benchmarks for a prepared database.
+
+    Returns:
+        List of (name, zero-argument callable, rows processed per call)
+    """
+    Session = sessionmaker(bind=engine)
+    slug = city['slug']
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    site_store.reset(session_factory=Session, snapshot_dir=DATA_DIR / 'snapshots')
+    client = TestClient(app)
+
+    sites_df = synthetic_sites(count, city, seed=1)
+    features = {name: sites_df[name].to_numpy() for name in FEATURE_COLUMNS}
+    scalar_rows = sites_df[FEATURE_COLUMNS].head(SCALAR_MAX_ROWS).to_dict('records')
+    stage_df = sites_df.head(STAGE_MAX_ROWS)[['city', 'lat', 'lng', 'location_label', 'parcel_id',
+                                               'parking_lot_flag', 'municipal_parcel_flag']]
+
+    with Session() as session:
+        sites = session.query(Site).filter(Site.city == slug).limit(SERIALIZE_MAX_ROWS).all()
+        session.expunge_all()
+
+    table = site_store.load(slug)
+    lookup_ids = table.ids[::max(1, len(table) // SERIALIZE_MAX_ROWS)].tolist()
+    snapshot = write_snapshot(table, DATA_DIR / 'snapshots')
+    mapped = open_snapshot(snapshot, slug, table.version)
+    center_lat, center_lng = city['center']
+    nearest_url = f"/api/sites/nearest?city={slug}&lat={center_lat}&lng={center_lng}&k=100"
+    portfolio_size = min(count, 500)
+    problem = CoverageProblem.build(table, 0.8)
+    raster = HeatmapRaster.build(table, 'demand', 13)
+    tile_x, tile_y = (int(v // TILE_SIZE) for v in world_pixels(center_lat, center_lng, 13))
+    heatmap_url = f"/api/heatmap/{slug}/demand/13/{tile_x}/{tile_y}.png"
+
+    predict_body = {name: 0.5 for name in FEATURE_COLUMNS if name.endswith('_index') or name == 'renters_share'}
+    api_limit = min(count, 1000)
+
+    def check(response):
+        response.raise_for_status()
+        return response
+
+    demographics_df = quiet(lambda: ingest_demographics.add_demographic_features(stage_df.copy(), city))()
+    traffic_df = quiet(lambda: ingest_traffic.add_traffic_features(demographics_df.copy(), city))()
+    catchment_df = quiet(lambda: build_catchments.add_catchment_features(traffic_df.copy(), city))()
+
+    return [
+        ('scoring.compute_all_scores', lambda: [ScoringService.compute_all_scores(f) for f in scalar_rows],
+         len(scalar_rows)),
+        ('scoring.compute_all_scores_batch', lambda: ScoringService.compute_all_scores_batch(features), count),
+        ('site.to_geojson_feature', lambda: [site.to_geojson_feature() for site in sites], len(sites)),
+        ('site.to_dict', lambda: [site.to_dict() for site in sites], len(sites)),
+        ('site_store.top', lambda: table.geojson_features(table.top(api_limit)), api_limit),
+        ('site_store.find', lambda: [site_store.find(site_id) for site_id in lookup_ids], len(lookup_ids)),
+        ('site_snapshot.open', lambda: open_snapshot(snapshot, slug, table.version), count),
+        ('site_snapshot.top', lambda: mapped.geojson_features(mapped.top(api_limit)), api_limit),
+        ('site_index.build', lambda: SiteIndex(table.columns['lat'], table.columns['lng'],
+                                               table.columns['score_overall']), count),
+        ('site_optimizer.build', lambda: CoverageProblem.build(table, 0.8), count),
+        ('site_optimizer.select', lambda: problem.select(portfolio_size), portfolio_size),
+        ('heatmap.raster', lambda: HeatmapRaster.build(table, 'demand', 13), count),
+        ('heatmap.png', lambda: raster.png(tile_x, tile_y), TILE_SIZE * TILE_SIZE),
+        ('api.get_sites', lambda: check(client.get(f"/api/sites?city={slug}&limit={api_limit}")), api_limit),
+        ('api.get_nearest_sites', lambda: check(client.get(nearest_url)), 100),
+        ('api.get_nearest_sites.combined', lambda: check(client.get(nearest_url + "&rank=combined")), 100),
+        ('api.get_city_stats', lambda: check(client.get(f"/api/stats/{slug}")), count),
+        ('api.optimize_sites', lambda: check(client.get(f"/api/optimize/{slug}?n=10")), 10),
+        ('api.get_heatmap_tile', lambda: check(client.get(heatmap_url)), 1),
+        ('api.predict', lambda: check(client.post("/api/predict", json=predict_body)), 1),
+        ('stage.parcels', quiet(lambda: ingest_parcels.build_sites_frame(None, city)), None),
+        ('stage.demographics', quiet(lambda: ingest_demographics.add_demographic_features(stage_df.copy(), city)),
+         len(stage_df)),
+        ('stage.traffic', quiet(lambda: ingest_traffic.add_traffic_features(demographics_df.copy(), city)),
+         len(stage_df)),
+        ('stage.catchment', quiet(lambda: build_catchments.add_catchment_features(sites_df.copy(), city)), count),
+        ('stage.scores', quiet(lambda: build_scores.compute_scores(catchment_df.copy(), city)), len(stage_df)),
+    ]
+
+
+def run_benchmarks(engine, count, city, repeat=3, only=None):
+    """
+    Time every benchmark.
+
+    Args:
+        engine: Engine of a database prepared with prepare_database
+        count: Number of sites in the database
+        city: City registry record
+        repeat: Timed runs per benchmark (after one warm-up run)
+        only: Optional list of benchmark name prefixes to run
+
+    Returns:
+        Mapping of benchmark name → {median_s, min_s, runs, rows, rows_per_sec}
+    """
+    results = {}
+    try:
+        for name, fn, rows in build_benchmarks(engine, count, city):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            fn()
+            durations = time_call(fn, repeat)
+            median = statistics.median(durations)
+            results[name] = {
+                'median_s': round(median, 6),
+                'min_s': round(min(durations), 6),
+                'runs': repeat,
+                'rows': rows,
+                'rows_per_sec': round(rows / median, 1) if rows and median > 0 else None,
+            }
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        site_store.reset()
+    return results
+
+
+def baseline_path(count, dialect, baseline_dir=BASELINE_DIR):
+    return Path(baseline_dir) / f"{count}-{dialect}.json"
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Benchmarks whose median got slower than the baseline by more than threshold.
+
+    Returns:
+        List of (name, baseline median, current median, relative change)
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is None or previous['median_s'] <= 0:
+            continue
+        change = result['median_s'] / previous['median_s'] - 1
+        if change > threshold:
+            regressions.append((name, previous['median_s'], result['median_s'], change))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"\n  {'benchmark':<34} {'median':>10} {'min':>10} {'rows/s':>12} {'vs base':>8}")
+    for name, result in results.items():
+        rate = f"{result['rows_per_sec']:,.0f}" if result['rows_per_sec'] else '-'
+        change = ''
+        previous = baseline['benchmarks'].get(name) if baseline else None
+        if previous and previous['median_s'] > 0:
+            change = f"{result['median_s'] / previous['median_s'] - 1:+.0%}"
+        print(
+            f"  {name:<34} {result['median_s'] * 1000:>8.2f}ms {result['min_s'] * 1000:>8.2f}ms "
+            f"{rate:>12} {change:>8}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MA EV ChargeMap benchmark suite")
+    parser.add_argument('--scale', default='1k', help="Number of sites: 1k, 100k, 1m or an integer")
+    parser.add_argument(
+        '--database-url',
+        default=None,
+        help="Database to benchmark (default: SQLite file in benchmarks/.data)"
+    )
+    parser.add_argument('--regenerate', action='store_true', help="Rebuild the synthetic sites")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--only', action='append', help="Run benchmarks starting with this prefix (repeatable)")
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown counted as a regression (default: 0.25)"
+    )
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--baseline-dir', default=str(BASELINE_DIR), help="Directory of baseline files")
+    args = parser.parse_args(argv)
+
+    count = parse_scale(args.scale)
+    city = resolve_city(BENCH_CITY)
+    database_url = args.database_url
+    if database_url is None:
+        DATA_DIR.mkdir(exist_ok=True)
+        database_url = f"sqlite:///{DATA_DIR / f'bench-{count}.db'}"
+
+    print(f"⏱  Benchmarks: {count:,} sites, {database_url.split(':')[0]}")
+    engine = prepare_database(database_url, count, city, regenerate=args.regenerate)
+    dialect = engine.dialect.name
+
+    try:
+        results = run_benchmarks(engine, count, city, repeat=args.repeat, only=args.only)
+    finally:
+        engine.dispose()
+
+    report = {
+        'scale': count,
+        'database': dialect,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'benchmarks': results,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = RESULTS_DIR / f"{count}-{dialect}.json"
+    with open(result_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    base_path = baseline_path(count, dialect, args.baseline_dir)
+    baseline = None
+    if base_path.exists() and not args.save_baseline:
+        with open(base_path) as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+    print(f"\n📝 Results: {result_path}")
+
+    if args.save_baseline:
+        base_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(base_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved: {base_path}")
+        return 0
+
+    if baseline is None:
+        print(f"ℹ No baseline at {base_path}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"⚠ {name}: {before * 1000:.2f}ms → {after * 1000:.2f}ms ({change:+.0%})")
+    if regressions:
+        print(f"\n✗ {len(regressions)} benchmark(s) regressed past {args.threshold:.0%}")
+        return 1
+    print(f"\n✓ No regressions past {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
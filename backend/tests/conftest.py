@@ -0,0 +1,95 @@
+"""
+Shared test fixtures and helpers.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_db, instrument_engine
+from app.main import app
+from app.models import Site
+from app.services.site_store import site_store
+
+
+def make_site(city, index, score=50.0):
+    """Site row with neutral features."""
+    return Site(
+        city=city,
+        lat=42.26 + index * 0.001,
+        lng=-71.80,
+        location_label=f"{city} site {index}",
+        parcel_id=f"{city}-{index}",
+        traffic_index=0.5,
+        pop_density_index=0.5,
+        renters_share=0.5,
+        income_index=0.5,
+        poi_index=0.5,
+        parking_lot_flag=0,
+        municipal_parcel_flag=0,
+        score_demand=score,
+        score_equity=score,
+        score_traffic=score,
+        score_grid=score,
+        score_overall=score,
+        daily_kwh_estimate=200.0,
+    )
+
+
+@pytest.fixture
+def api_db(tmp_path):
+    """
+    SQLite database served by the API for the duration of a test.
+
+    Seeds 20 Worcester sites, overrides the get_db dependency
+    and points the site store at it (with an empty snapshot directory).
+    Yields the (instrumented) engine.
+    """
+    engine = instrument_engine(create_engine(f"sqlite:///{tmp_path / 'api.db'}"))
+    Base.metadata.create_all(engine)
+    TestSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with TestSession() as session:
+        session.add_all([make_site('worcester', i, score=40.0 + i) for i in range(20)])
+        session.commit()
+
+    def override_get_db():
+        db = TestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    site_store.reset(session_factory=TestSession, snapshot_dir=tmp_path / 'snapshots')
+    yield engine
+    site_store.reset()
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+
+
+@contextmanager
+def assert_max_queries(engine, max_count):
+    """
+    Fail if more than max_count SQL statements run inside the block.
+
+    Usage:
+        with assert_max_queries(api_db, 1):
+            client.get("/api/sites?city=worcester")
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+    assert len(statements) <= max_count, (
+        f"Expected at most {max_count} queries, got {len(statements)}:\n"
+        + "\n".join(statements)
+    )
@@ -48,6 +48,14 @@ class TestAPIEndpoints:
         assert "bbox" in worcester
         assert "center" in worcester
     
+    def test_get_cities_matches_registry(self):
+        """Test that every registered city is served."""
+        from app.cities import CITIES
+        
+        response = client.get("/api/cities")
+        slugs = {c["slug"] for c in response.json()}
+        assert slugs == set(CITIES)
+    
     def test_get_city_by_slug(self):
         """Test getting specific city info."""
         response = client.get("/api/cities/worcester")
@@ -0,0 +1,61 @@
+"""
+Smoke tests for the benchmark suite (tiny scale).
+"""
+from app.models import Site
+from benchmarks.run_benchmarks import (
+    compare_to_baseline, parse_scale, prepare_database, run_benchmarks, synthetic_sites
+)
+from site_frame import resolve_city
+from sqlalchemy import func, select
+
+
+class TestBenchmarks:
+    """Test suite for benchmarks/run_benchmarks.py."""
+
+    def test_parse_scale(self):
+        assert parse_scale('1k') == 1_000
+        assert parse_scale('1M') == 1_000_000
+        assert parse_scale('2500') == 2_500
+
+    def test_synthetic_sites_are_scored(self):
+        df = synthetic_sites(100, resolve_city('worcester'))
+        assert len(df) == 100
+        assert df['score_overall'].between(0, 100).all()
+
+    def test_prepare_database_reuses_rows(self, tmp_path):
+        city = resolve_city('worcester')
+        url = f"sqlite:///{tmp_path / 'bench.db'}"
+
+        engine = prepare_database(url, 150, city)
+        engine = prepare_database(url, 150, city)
+        with engine.connect() as conn:
+            assert conn.execute(select(func.count()).select_from(Site)).scalar() == 150
+
+    def test_run_small_scale(self, tmp_path):
+        city = resolve_city('worcester')
+        engine = prepare_database(f"sqlite:///{tmp_path / 'bench.db'}", 200, city)
+
+        results = run_benchmarks(engine, 200, city, repeat=1, only=['scoring', 'api'])
+
+        assert set(results) == {
+            'scoring.compute_all_scores', 'scoring.compute_all_scores_batch',
+            'api.get_sites', 'api.get_nearest_sites', 'api.get_nearest_sites.combined',
+            'api.get_city_stats', 'api.optimize_sites', 'api.get_heatmap_tile', 'api.predict',
+        }
+        assert all(result['median_s'] > 0 for result in results.values())
+
+    def test_compare_to_baseline(self):
+        baseline = {'benchmarks': {
+            'a': {'median_s': 1.0},
+            'b': {'median_s': 1.0},
+            'c': {'median_s': 1.0},
+        }}
+        results = {
+            'a': {'median_s': 1.2},
+            'b': {'median_s': 1.5},
+            'c': {'median_s': 0.5},
+            'new': {'median_s': 9.0},
+        }
+
+        regressions = compare_to_baseline(results, baseline, threshold=0.25)
+        assert [name for name, *_ in regressions] == ['b']
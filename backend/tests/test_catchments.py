@@ -0,0 +1,168 @@
+"""
+Tests for the catchment stage (summed-area tables over rasterized layers).
+"""
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from shapely.geometry import box
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import ingest_parcels  # noqa: E402
+from build_catchments import (  # noqa: E402
+    CATCHMENT_COLUMNS, CatchmentGrid, box_sums, catchment_layers, compute_catchments, square_sums,
+    summed_area_table,
+)
+from build_scores import compute_scores  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.site import CATCHMENT_TOTALS  # noqa: E402
+from app.services.scoring import ScoringService  # noqa: E402
+from site_frame import SITE_COLUMNS, load_sites_frame, replace_city_sites, resolve_city  # noqa: E402
+
+client = TestClient(app)
+
+BBOX = [-71.85, 42.24, -71.75, 42.30]
+
+
+def make_sites(lat, lng, pop_density=0.5, renters=0.4, poi=0.5):
+    count = len(lat)
+    return pd.DataFrame({
+        'lat': lat,
+        'lng': lng,
+        'pop_density_index': np.full(count, pop_density),
+        'renters_share': np.full(count, renters),
+        'poi_index': np.full(count, poi),
+    })
+
+
+class TestSummedAreaTable:
+    """Test suite for the summed-area table helpers in data/build_catchments.py."""
+
+    def test_box_sums_match_brute_force(self):
+        rng = np.random.default_rng(0)
+        grid = rng.random((37, 53))
+        table = summed_area_table(grid)
+
+        row0, col0 = rng.integers(-5, 40, 200), rng.integers(-5, 55, 200)
+        row1, col1 = row0 + rng.integers(0, 20, 200), col0 + rng.integers(0, 20, 200)
+        expected = [
+            grid[max(r0, 0):max(r1, 0), max(c0, 0):max(c1, 0)].sum()
+            for r0, c0, r1, c1 in zip(row0, col0, row1, col1)
+        ]
+        assert box_sums(table, row0, col0, row1, col1) == pytest.approx(expected)
+
+    def test_square_sums(self):
+        grid = np.ones((10, 10))
+        table = summed_area_table(grid)
+        # Centre, corner (clipped) and half-width 0
+        assert square_sums(table, np.array([5, 0, 3]), np.array([5, 0, 3]), 2).tolist() == [25.0, 9.0, 25.0]
+        assert square_sums(table, np.array([5]), np.array([5]), 0).tolist() == [1.0]
+
+
+class TestCatchments:
+    """Test suite for data/build_catchments.py."""
+
+    def test_grid_cells_and_centres(self):
+        grid = CatchmentGrid.around(np.array([42.27]), np.array([-71.80]), BBOX, margin_km=2.0)
+        lat, lng = grid.centres()
+        rows, cols = grid.cells(lat, lng)
+
+        assert len(lat) == grid.shape[0] * grid.shape[1]
+        assert (rows * grid.shape[1] + cols == np.arange(len(lat))).all()
+        assert grid.rasterize(np.array([42.27, 42.27, 50.0]), np.array([-71.80, -71.80, -71.80])).sum() == 2
+
+    def test_point_counts_by_radius(self):
+        grid = CatchmentGrid.around(np.array([42.27]), np.array([-71.80]), BBOX, margin_km=2.0)
+        sites = make_sites([42.27], [-71.80])
+        # POIs 0.3 km, 0.8 km and 1.6 km north of the site
+        pois = pd.DataFrame({'lat': 42.27 + np.array([0.3, 0.8, 1.6]) / 110.574, 'lon': -71.80})
+        layers = catchment_layers(grid, sites, pois_df=pois)
+
+        catchments = compute_catchments(sites, grid, layers).iloc[0]
+        assert catchments['catchment_pois_500m'] == 1.0
+        assert catchments['catchment_pois_1km'] == 2.0
+        assert catchments['catchment_pois_2km'] == 3.0
+
+    def test_uniform_tract_population(self):
+        lat, lng = np.array([42.27, 42.29]), np.array([-71.80, -71.80])
+        grid = CatchmentGrid.around(lat, lng, BBOX, margin_km=2.0)
+        tracts = gpd.GeoDataFrame(
+            {'GEOID': ['25027000100'], 'ALAND': [1e12]}, geometry=[box(-72.5, 41.5, -71.0, 43.0)]
+        )
+        census = pd.DataFrame({
+            'state': ['25'], 'county': ['027'], 'tract': ['000100'],
+            'total_population': [1e9], 'renters_share': [0.4],
+        })
+        sites = make_sites(lat, lng)
+        no_pois = pd.DataFrame({'lat': [], 'lon': []})
+
+        # 1000 people per km² over squares (2 r + 0.1) km wide
+        layers = catchment_layers(grid, sites, census_df=census, tracts_gdf=tracts, pois_df=no_pois)
+        catchments = compute_catchments(sites, grid, layers)
+        assert catchments['catchment_population_500m'].tolist() == pytest.approx([1000 * 1.1 ** 2] * 2)
+        assert catchments['catchment_population_2km'].tolist() == pytest.approx([1000 * 4.1 ** 2] * 2)
+        assert catchments['catchment_renters_1km'].tolist() == pytest.approx([0.4 * 1000 * 2.1 ** 2] * 2)
+        # No POIs, so only population access counts
+        assert catchments['catchment_index'].tolist() == [0.375, 0.375]
+
+    def test_synthetic_layers_rank_dense_sites_higher(self):
+        lat = np.linspace(42.25, 42.29, 30)
+        sites = make_sites(lat, np.full(30, -71.80))
+        sites['pop_density_index'] = np.linspace(0, 1, 30)
+        sites['poi_index'] = np.linspace(0, 1, 30)
+        grid = CatchmentGrid.around(lat, sites['lng'].to_numpy(), BBOX, margin_km=2.0)
+
+        catchments = compute_catchments(sites, grid, catchment_layers(grid, sites))
+        assert list(catchments.columns) == CATCHMENT_COLUMNS
+        assert catchments['catchment_index'].iloc[-1] > catchments['catchment_index'].iloc[0]
+        assert catchments['catchment_index'].between(0, 1).all()
+        for layer in ('population', 'renters', 'pois'):
+            assert (catchments[f'catchment_{layer}_500m'] <= catchments[f'catchment_{layer}_1km']).all()
+            assert (catchments[f'catchment_{layer}_1km'] <= catchments[f'catchment_{layer}_2km']).all()
+
+    def test_columns_are_site_columns(self):
+        assert set(CATCHMENT_COLUMNS) <= set(SITE_COLUMNS)
+        assert CATCHMENT_COLUMNS == CATCHMENT_TOTALS + ['catchment_index']
+
+
+class TestCatchmentEndpoint:
+    """Test suite for the catchment fields of GET /api/sites/{id}."""
+
+    def test_site_detail(self, api_db):
+        site = client.get("/api/sites/1").json()
+        assert site['features']['catchment_index'] is None
+        assert set(site['catchment']) == {name[len('catchment_'):] for name in CATCHMENT_TOTALS}
+
+
+class TestWithoutCatchments:
+    """Test suite for sites the catchment stage has not processed."""
+
+    def test_standalone_chain_keeps_point_demand(self, tmp_path, monkeypatch):
+        # ingest_parcels → (demographics, traffic) → build_scores, no build_catchments
+        monkeypatch.setattr(ingest_parcels, 'load_real_buildings', lambda city: None)
+        sites = ingest_parcels.build_sites_frame(city=resolve_city('worcester'))
+        rng = np.random.default_rng(0)
+        for name in ('traffic_index', 'pop_density_index', 'poi_index'):
+            sites[name] = rng.random(len(sites))
+        assert sites['catchment_index'].isna().all()
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'sites.db'}")
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as session:
+            replace_city_sites(session, sites, city='worcester')
+            scored = compute_scores(load_sites_frame(session, city='worcester'))
+
+        with engine.connect() as conn:
+            assert set(conn.execute(text("SELECT catchment_index FROM sites")).scalars()) == {None}
+        expected = ScoringService.compute_demand_score(
+            scored['traffic_index'], scored['pop_density_index'], scored['poi_index']
+        ).round(1)
+        assert scored['score_demand'].tolist() == expected.tolist()
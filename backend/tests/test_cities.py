@@ -0,0 +1,261 @@
+"""
+Tests for the city registry, its generator and multi-city pipeline runs.
+"""
+import json
+import multiprocessing
+import os
+import sys
+import zipfile
+
+import pandas as pd
+import pytest
+from shapely.geometry import box, mapping
+from sqlalchemy import create_engine, func, inspect, select
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import build_scores  # noqa: E402
+import pipeline  # noqa: E402
+import publish  # noqa: E402
+from build_city_registry import build_registry, city_slug, read_municipalities  # noqa: E402
+from site_frame import SITE_COLUMNS  # noqa: E402
+from stage_cache import Stage, StageCache  # noqa: E402
+from app.cities import (  # noqa: E402
+    DEFAULT_REGISTRY_PATH, bbox_distance_km, cities_by_distance, load_city_registry, validate_city,
+)
+from app.database import Base  # noqa: E402
+from app.models import DatasetVersion, Site  # noqa: E402
+
+
+def make_city(slug='testville', **overrides):
+    city = {
+        'slug': slug,
+        'name': slug.title(),
+        'state': 'MA',
+        'county_fips': '027',
+        'bbox': [-71.9, 42.2, -71.7, 42.3],
+        'center': [42.25, -71.8],
+    }
+    city.update(overrides)
+    return city
+
+
+def write_registry(path, cities):
+    path.write_text(json.dumps({'cities': cities}))
+    return path
+
+
+class TestCityRegistry:
+    """Test suite for load_city_registry and validate_city in app/cities.py."""
+
+    def test_bundled_registry_is_valid(self):
+        cities = load_city_registry(DEFAULT_REGISTRY_PATH)
+        assert list(cities)[0] == 'worcester'
+        assert all(city['state'] == 'MA' for city in cities.values())
+
+    def test_loads_in_order(self, tmp_path):
+        path = write_registry(tmp_path / 'cities.json', [make_city('b'), make_city('a')])
+        assert list(load_city_registry(path)) == ['b', 'a']
+
+    @pytest.mark.parametrize("overrides,message", [
+        ({'bbox': [-71.7, 42.2, -71.9, 42.3]}, "empty or out of range"),
+        ({'bbox': [-71.9, 42.2, -71.7]}, "bbox must be"),
+        ({'center': [42.35, -71.8]}, "outside its bbox"),
+        ({'county_fips': 27}, "3-digit"),
+        ({'slug': 'New Town'}, "lowercase"),
+    ])
+    def test_invalid_city(self, overrides, message):
+        with pytest.raises(ValueError, match=message):
+            validate_city(make_city(**overrides))
+
+    def test_missing_field(self):
+        city = make_city()
+        del city['bbox']
+        with pytest.raises(ValueError, match="missing bbox"):
+            validate_city(city)
+
+    def test_bbox_distance(self):
+        city = make_city()
+        assert bbox_distance_km(city, 42.25, -71.8) == 0.0
+        # 0.1° of latitude north of the bbox
+        assert bbox_distance_km(city, 42.4, -71.8) == pytest.approx(11.12, abs=0.01)
+        assert bbox_distance_km(city, 42.4, -71.6) > bbox_distance_km(city, 42.4, -71.8)
+
+    def test_cities_by_distance(self):
+        assert [slug for _, slug in cities_by_distance(42.2626, -71.8023)][0] == 'worcester'
+        assert [slug for _, slug in cities_by_distance(42.3601, -71.0589)][:2] == ['boston', 'cambridge']
+
+    def test_duplicate_slug(self, tmp_path):
+        path = write_registry(tmp_path / 'cities.json', [make_city(), make_city()])
+        with pytest.raises(ValueError, match="listed twice"):
+            load_city_registry(path)
+
+
+@pytest.fixture
+def cousub_zip(tmp_path):
+    """TIGER-style county subdivision zip with three towns and a water feature."""
+    import fiona
+
+    schema = {
+        'geometry': 'Polygon',
+        'properties': {
+            'COUNTYFP': 'str', 'COUSUBFP': 'str', 'NAME': 'str', 'INTPTLAT': 'str', 'INTPTLON': 'str',
+        },
+    }
+    features = [
+        ('027', '82000', 'Worcester', box(-71.88, 42.21, -71.73, 42.31)),
+        ('009', '38400', 'Manchester-by-the-Sea', box(-70.82, 42.55, -70.72, 42.60)),
+        ('017', '11000', 'Cambridge', box(-71.16, 42.35, -71.06, 42.40)),
+        ('001', '00000', 'County subdivisions not defined', box(-70.5, 41.5, -70.4, 41.6)),
+    ]
+    shp_dir = tmp_path / 'shp'
+    shp_dir.mkdir()
+    with fiona.open(shp_dir / 'tl_cousub.shp', 'w', driver='ESRI Shapefile',
+                    schema=schema, crs='EPSG:4269') as sink:
+        for county, cousub, name, geometry in features:
+            point = geometry.representative_point()
+            sink.write({
+                'geometry': mapping(geometry),
+                'properties': {
+                    'COUNTYFP': county, 'COUSUBFP': cousub, 'NAME': name,
+                    'INTPTLAT': f"+{point.y:.7f}", 'INTPTLON': f"{point.x:.7f}",
+                },
+            })
+
+    zip_path = tmp_path / 'county_subdivisions.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for path in shp_dir.iterdir():
+            zf.write(path, path.name)
+    return zip_path
+
+
+class TestBuildCityRegistry:
+    """Test suite for data/build_city_registry.py."""
+
+    def test_slug(self):
+        assert city_slug("Manchester-by-the-Sea") == 'manchester-by-the-sea'
+        assert city_slug("West Boylston") == 'west-boylston'
+
+    def test_reads_municipalities(self, cousub_zip):
+        cities = read_municipalities(cousub_zip)
+
+        assert [city['slug'] for city in cities] == ['cambridge', 'manchester-by-the-sea', 'worcester']
+        assert cities[2]['bbox'] == [-71.88, 42.21, -71.73, 42.31]
+        assert cities[2]['county_fips'] == '027'
+        for city in cities:
+            validate_city(city)
+
+    def test_merges_into_existing_registry(self, cousub_zip, tmp_path):
+        corridors = [{'name': 'I-290', 'lat': 42.255, 'lng': -71.81, 'influence': 0.02}]
+        registry = write_registry(tmp_path / 'cities.json', [
+            make_city('worcester', corridors=corridors, bbox=[-71.87, 42.2, -71.72, 42.32]),
+            make_city('boston', bbox=[-71.19, 42.22, -70.98, 42.4], center=[42.36, -71.06]),
+        ])
+        output = tmp_path / 'statewide.json'
+
+        assert build_registry(zip_path=cousub_zip, registry_path=registry, output_path=output) == 4
+        cities = load_city_registry(output)
+        # Existing cities first, then new ones by name
+        assert list(cities) == ['worcester', 'boston', 'cambridge', 'manchester-by-the-sea']
+        assert cities['worcester']['corridors'] == corridors
+        assert cities['worcester']['bbox'] == [-71.88, 42.21, -71.73, 42.31]
+
+
+def toy_sites(city, count):
+    rows = []
+    for i in range(count):
+        row = {column: 0.0 for column in SITE_COLUMNS}
+        row.update({
+            'city': city['slug'],
+            'lat': city['center'][0] + i * 0.001,
+            'lng': city['center'][1],
+            'location_label': f"{city['slug']} {i}",
+            'parcel_id': f"{city['slug']}-{i}",
+            'parking_lot_flag': 0,
+            'municipal_parcel_flag': 0,
+            'score_overall': 75.0,
+        })
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def toy_parcels(_, city):
+    if city['slug'] == 'failtown':
+        raise RuntimeError("parcel source unavailable")
+    return toy_sites(city, city['sites'])
+
+
+TOY_CITIES = {
+    'boston': make_city('boston', sites=3),
+    'lowell': make_city('lowell', sites=2),
+    'failtown': make_city('failtown', sites=4),
+}
+
+
+@pytest.fixture
+def toy_run(tmp_path, monkeypatch):
+    """
+    Toy one-stage pipeline over a SQLite database.
+
+    Pool workers are forked, so they inherit these monkeypatches.
+    Yields the engine; exported snapshot cities are collected on it.
+    """
+    if multiprocessing.get_start_method() != 'fork':
+        pytest.skip("workers only inherit the toy pipeline when forked")
+
+    url = f"sqlite:///{tmp_path / 'sites.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.exported = []
+
+    stages = [Stage(name='parcels', func=toy_parcels)]
+    monkeypatch.setattr(pipeline, 'STAGES', stages)
+    monkeypatch.setattr(pipeline, 'STAGES_BY_NAME', {'parcels': stages[0]})
+    monkeypatch.setattr(pipeline, 'resolve_city', TOY_CITIES.__getitem__)
+    monkeypatch.setattr(pipeline, 'StageCache', lambda slug: StageCache(slug, cache_dir=tmp_path / slug))
+    monkeypatch.setattr(pipeline, 'get_engine', lambda create_tables=False: create_engine(url))
+    monkeypatch.setattr(
+        build_scores, 'export_snapshots', lambda engine_, slugs: engine.exported.extend(slugs)
+    )
+    yield engine
+    engine.dispose()
+
+
+def city_rows(engine):
+    with engine.connect() as conn:
+        counts = dict(conn.execute(select(Site.city, func.count()).group_by(Site.city)).fetchall())
+        versions = dict(conn.execute(select(DatasetVersion.city, DatasetVersion.version)).fetchall())
+    return counts, versions
+
+
+class TestRunCities:
+    """Test suite for run_cities in data/pipeline.py."""
+
+    def test_failing_city_keeps_previous_sites(self, toy_run):
+        publish.publish_cities(toy_run, {
+            'boston': toy_sites(TOY_CITIES['boston'], 1),
+            'failtown': toy_sites(TOY_CITIES['failtown'], 2),
+        })
+
+        results = pipeline.run_cities(['boston', 'lowell', 'failtown'], workers=2, max_db_connections=1)
+
+        by_city = {result['city']: result for result in results}
+        assert by_city['boston']['ok'] and by_city['boston']['sites'] == 3
+        assert by_city['lowell']['ok'] and by_city['lowell']['sites'] == 2
+        assert not by_city['failtown']['ok']
+        assert "parcel source unavailable" in by_city['failtown']['error']
+
+        counts, versions = city_rows(toy_run)
+        assert counts == {'boston': 3, 'lowell': 2, 'failtown': 2}
+        assert versions == {'boston': 2, 'lowell': 1, 'failtown': 1}
+        assert sorted(toy_run.exported) == ['boston', 'lowell']
+
+    def test_all_cities_failing_leaves_table_unchanged(self, toy_run):
+        publish.publish_cities(toy_run, {'failtown': toy_sites(TOY_CITIES['failtown'], 2)})
+
+        results = pipeline.run_cities(['failtown'], workers=1)
+
+        assert [result['ok'] for result in results] == [False]
+        assert city_rows(toy_run) == ({'failtown': 2}, {'failtown': 1})
+        assert publish.STAGING_TABLE not in inspect(toy_run).get_table_names()
+        assert toy_run.exported == []
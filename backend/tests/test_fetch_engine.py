@@ -0,0 +1,229 @@
+"""
+Tests for the raw data fetch engine, run against a local HTTP server.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import fetch_engine  # noqa: E402
+from fetch_engine import FetchEngine, split_bbox  # noqa: E402
+
+
+FILE_BODY = bytes(range(256)) * 400
+ETAG = '"v1"'
+# /file versions served by the stand-in server: ETag → body
+FILE_VERSIONS = {ETAG: FILE_BODY, '"v2"': FILE_BODY[::-1]}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves JSON, an ETag-validated resource and a Range-capable file."""
+
+    hits = []
+    file_etag = ETAG
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.hits.append((self.path, dict(self.headers)))
+        self._send(200, b'{"elements": [{"type": "node", "id": 1}]}')
+
+    def do_GET(self):
+        self.hits.append((self.path, dict(self.headers)))
+        if self.path.startswith('/etag'):
+            if self.headers.get('If-None-Match') == ETAG:
+                self._send(304)
+            else:
+                self._send(200, b'{"ok": true}', {'ETag': ETAG})
+        elif self.path.startswith('/file'):
+            etag = self.file_etag
+            body = FILE_VERSIONS[etag]
+            range_header = self.headers.get('Range')
+            if range_header and self.headers.get('If-Range') == etag:
+                start = int(range_header.split('=')[1].rstrip('-'))
+                if start >= len(body):
+                    self._send(416, headers={'Content-Range': f"bytes */{len(body)}"})
+                else:
+                    self._send(206, body[start:], {
+                        'ETag': etag,
+                        'Content-Range': f"bytes {start}-{len(body) - 1}/{len(body)}",
+                    })
+            elif self.headers.get('If-None-Match') == etag:
+                self._send(304)
+            else:
+                self._send(200, body, {'ETag': etag})
+        else:
+            self._send(404)
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def hits():
+    StandInHandler.hits.clear()
+    StandInHandler.file_etag = ETAG
+    return StandInHandler.hits
+
+
+class InterruptedSession(requests.Session):
+    """Session whose response bodies break off after `chunks` chunks."""
+
+    def __init__(self, chunks):
+        super().__init__()
+        self.chunks = chunks
+
+    def request(self, *args, **kwargs):
+        response = super().request(*args, **kwargs)
+        iter_content = response.iter_content
+
+        def interrupted(chunk_size=1, decode_unicode=False):
+            for count, chunk in enumerate(iter_content(chunk_size, decode_unicode)):
+                if count == self.chunks:
+                    raise requests.ConnectionError("connection reset")
+                yield chunk
+
+        response.iter_content = interrupted
+        return response
+
+
+class TestFetchEngine:
+    """Test suite for FetchEngine."""
+
+    def test_cached_response_skips_network(self, server, hits, tmp_path):
+        """A repeated query is served from the disk cache."""
+        engine = FetchEngine(cache_dir=tmp_path)
+        first = engine.fetch_json('POST', f"{server}/overpass", data={'data': 'q'})
+        second = engine.fetch_json('POST', f"{server}/overpass", data={'data': 'q'})
+        other = engine.fetch_json('POST', f"{server}/overpass", data={'data': 'other'})
+
+        assert first == second == other
+        assert len(hits) == 2
+        assert engine.stats['cached'] == 1
+
+    def test_stale_response_is_revalidated(self, server, hits, tmp_path):
+        """Stale entries send If-None-Match and reuse the body on 304."""
+        engine = FetchEngine(cache_dir=tmp_path, max_age=0)
+        assert engine.fetch_json('GET', f"{server}/etag") == {'ok': True}
+        assert engine.fetch_json('GET', f"{server}/etag") == {'ok': True}
+
+        assert hits[1][1].get('If-None-Match') == ETAG
+        assert engine.stats['revalidated'] == 1
+
+    def test_download_resumes_partial_file(self, server, hits, tmp_path):
+        """An interrupted download continues with a Range request."""
+        engine = FetchEngine(cache_dir=tmp_path)
+        dest = tmp_path / "tracts.zip"
+        assert engine.download(f"{server}/file", dest)
+
+        # Simulate an interruption halfway through the download
+        dest.rename(tmp_path / "tracts.zip.part")
+        (tmp_path / "tracts.zip.meta.json").rename(tmp_path / "tracts.zip.part.meta.json")
+        with open(tmp_path / "tracts.zip.part", 'r+b') as f:
+            f.truncate(len(FILE_BODY) // 2)
+
+        assert engine.download(f"{server}/file", dest)
+        assert hits[-1][1].get('Range') == f"bytes={len(FILE_BODY) // 2}-"
+        assert dest.read_bytes() == FILE_BODY
+
+        # Complete file is revalidated and left alone
+        assert not engine.download(f"{server}/file", dest)
+
+    def test_interrupted_update_keeps_old_validator(self, server, hits, tmp_path, monkeypatch):
+        """A new version's validator only describes dest once dest holds it."""
+        monkeypatch.setattr(fetch_engine, 'DOWNLOAD_CHUNK_SIZE', 4096)
+        dest = tmp_path / "tracts.zip"
+        assert FetchEngine(cache_dir=tmp_path).download(f"{server}/file", dest)
+
+        StandInHandler.file_etag = '"v2"'
+        with pytest.raises(requests.ConnectionError):
+            FetchEngine(cache_dir=tmp_path, session=InterruptedSession(chunks=2)).download(f"{server}/file", dest)
+        assert dest.read_bytes() == FILE_BODY
+        assert (tmp_path / "tracts.zip.part").stat().st_size == 2 * 4096
+
+        # Without the part, dest is revalidated against its own (old) ETag
+        (tmp_path / "tracts.zip.part").unlink()
+        engine = FetchEngine(cache_dir=tmp_path)
+        assert engine.download(f"{server}/file", dest)
+        assert hits[-1][1].get('If-None-Match') == ETAG
+        assert dest.read_bytes() == FILE_VERSIONS['"v2"']
+        assert not engine.download(f"{server}/file", dest)
+
+    def test_interrupted_download_resumes_with_part_validator(self, server, hits, tmp_path, monkeypatch):
+        """The part's own ETag guards the Range request."""
+        monkeypatch.setattr(fetch_engine, 'DOWNLOAD_CHUNK_SIZE', 4096)
+        dest = tmp_path / "tracts.zip"
+        with pytest.raises(requests.ConnectionError):
+            FetchEngine(cache_dir=tmp_path, session=InterruptedSession(chunks=3)).download(f"{server}/file", dest)
+        assert not dest.exists() and not (tmp_path / "tracts.zip.meta.json").exists()
+
+        assert FetchEngine(cache_dir=tmp_path).download(f"{server}/file", dest)
+        assert hits[-1][1].get('Range') == f"bytes={3 * 4096}-"
+        assert hits[-1][1].get('If-Range') == ETAG
+        assert dest.read_bytes() == FILE_BODY
+        assert not (tmp_path / "tracts.zip.part.meta.json").exists()
+
+    def test_complete_part_is_finalized_on_416(self, server, hits, tmp_path):
+        """A part interrupted after its last byte is moved into place."""
+        dest = tmp_path / "tracts.zip"
+        (tmp_path / "tracts.zip.part").write_bytes(FILE_BODY)
+        (tmp_path / "tracts.zip.part.meta.json").write_text(json.dumps({'etag': ETAG}))
+
+        engine = FetchEngine(cache_dir=tmp_path)
+        assert engine.download(f"{server}/file", dest)
+        assert dest.read_bytes() == FILE_BODY
+        assert not (tmp_path / "tracts.zip.part").exists()
+        assert json.loads((tmp_path / "tracts.zip.meta.json").read_text())['etag'] == ETAG
+        assert not engine.download(f"{server}/file", dest)
+
+    def test_rate_limit_spaces_requests_per_host(self, server, hits, tmp_path):
+        """Concurrent requests to one host respect the minimum interval."""
+        host = server.split('//')[1]
+        engine = FetchEngine(cache_dir=tmp_path, rate_limits={host: {'interval': 0.1}})
+
+        start = time.monotonic()
+        engine.run({
+            i: (lambda i=i: engine.fetch('POST', f"{server}/overpass", data={'data': str(i)}))
+            for i in range(4)
+        })
+
+        assert len(hits) == 4
+        assert time.monotonic() - start >= 0.3
+
+
+class TestSplitBbox:
+    """Test suite for bbox tiling."""
+
+    def test_tiles_cover_bbox(self):
+        """Tiles respect the maximum span and cover the bbox exactly."""
+        bbox = [-71.8744, 42.2084, -71.7277, 42.3126]
+        tiles = split_bbox(bbox, 0.05)
+
+        assert len(tiles) == 3 * 3
+        assert all(t[2] - t[0] <= 0.05 and t[3] - t[1] <= 0.05 for t in tiles)
+        assert min(t[0] for t in tiles) == bbox[0]
+        assert max(t[3] for t in tiles) == bbox[3]
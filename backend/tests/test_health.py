@@ -0,0 +1,128 @@
+"""
+Tests for the liveness/readiness probes and the background database check.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.health
+import app.services.ml_predictor
+import app.warmup
+from app.health import DatabaseMonitor
+from app.main import app as fastapi_app
+from app.models import DatasetVersion
+from app.services.ml_predictor import MLPredictor
+from app.warmup import WarmUp
+from tests.conftest import assert_max_queries
+
+client = TestClient(fastapi_app)
+
+
+class ReadyWarmUp(WarmUp):
+    STEPS = (("schema", lambda: "checked"), ("model", lambda: "heuristic_fallback"))
+
+
+@pytest.fixture
+def monitor(api_db, monkeypatch):
+    """Checked monitor of the test database, installed for the probes."""
+    monitor = DatabaseMonitor(engine=api_db, interval=60)
+    monkeypatch.setattr(app.health, 'db_monitor', monitor)
+    return monitor
+
+
+class TestDatabaseMonitor:
+    """Test suite for app/health.py."""
+
+    def test_check_records_latency_and_versions(self, api_db):
+        with Session(api_db) as session:
+            session.add(DatasetVersion(city='worcester', version=3, site_count=20))
+            session.commit()
+        monitor = DatabaseMonitor(engine=api_db, interval=60)
+        assert monitor.status()["status"] == "pending"
+
+        assert monitor.check()
+        status = monitor.status()
+        assert status["status"] == "connected"
+        assert status["latency_ms"] >= 0
+        assert monitor.versions == {'worcester': 3}
+        assert monitor.healthy
+
+    def test_check_failure(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}")
+        monitor = DatabaseMonitor(engine=engine, interval=60)
+
+        assert not monitor.check()
+        assert monitor.status()["status"] == "error"
+        assert monitor.status()["error"]
+        assert not monitor.healthy
+
+    def test_stale_check_is_unhealthy(self, api_db):
+        monitor = DatabaseMonitor(engine=api_db, interval=1)
+        monitor.check()
+        monitor.checked_at = time.time() - 10
+        assert monitor.ok and not monitor.healthy
+
+    def test_background_thread_checks(self, api_db):
+        monitor = DatabaseMonitor(engine=api_db, interval=0.05)
+        monitor.start()
+        try:
+            deadline = time.time() + 5
+            while monitor.checked_at is None and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            monitor.stop()
+        assert monitor.ok
+
+
+class TestProbes:
+    """Test suite for /api/health/live and /api/health/ready."""
+
+    def test_liveness(self):
+        response = client.get("/api/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+
+    def test_ready(self, api_db, monitor, monkeypatch):
+        warm_up = ReadyWarmUp()
+        warm_up.run()
+        monkeypatch.setattr(app.warmup, 'warm_up', warm_up)
+        monitor.check()
+
+        # Probes report cached state: no query reaches the database
+        with assert_max_queries(api_db, 0):
+            response = client.get("/api/health/ready")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ready"] is True
+        assert data["database"]["status"] == "connected"
+        assert data["warm_up"]["steps"]["schema"]["status"] == "ok"
+
+    def test_not_ready_before_first_check(self, monitor, monkeypatch):
+        warm_up = ReadyWarmUp()
+        warm_up.run()
+        monkeypatch.setattr(app.warmup, 'warm_up', warm_up)
+
+        response = client.get("/api/health/ready")
+        assert response.status_code == 503
+        assert response.json()["database"]["status"] == "pending"
+
+    def test_not_ready_during_warm_up(self, monitor, monkeypatch):
+        monkeypatch.setattr(app.warmup, 'warm_up', ReadyWarmUp())
+        monitor.check()
+
+        response = client.get("/api/health/ready")
+        assert response.status_code == 503
+        assert response.json()["warm_up"]["done"] is False
+
+    def test_probe_does_not_load_model(self, monitor, monkeypatch):
+        lazy = MLPredictor(model_path="does-not-exist.pkl")
+        monkeypatch.setattr(app.services.ml_predictor, 'predictor', lazy)
+
+        response = client.get("/api/health/ready")
+
+        assert response.json()["model"] == {"loaded": False, "model_type": None}
+        assert not lazy.is_loaded
@@ -0,0 +1,179 @@
+"""
+Tests for the heat-map raster tiles.
+"""
+import io
+import math
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.heatmap import (
+    EMPTY_PNG, LAYERS, TILE_SIZE, HeatmapRaster, encode_png, gaussian_kernel, heatmap_raster,
+    max_rasters_per_table, meters_per_pixel, world_pixels,
+)
+from app.services.site_table import COLUMNS, SiteTable
+
+client = TestClient(app)
+
+
+def make_table(lat, lng, kwh):
+    count = len(lat)
+    columns = {
+        name: np.array([None] * count, dtype=object) if dtype is object else np.zeros(count, dtype=dtype)
+        for name, dtype in COLUMNS.items()
+    }
+    columns['id'] = np.arange(1, count + 1)
+    columns['lat'] = np.asarray(lat, dtype=np.float64)
+    columns['lng'] = np.asarray(lng, dtype=np.float64)
+    columns['daily_kwh_estimate'] = np.asarray(kwh, dtype=np.float64)
+    return SiteTable('worcester', 1, columns)
+
+
+def decode_png(data):
+    """(width, height, RGBA array) of a PNG written by encode_png."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    width, height = struct.unpack('>II', data[16:24])
+    idat_length = struct.unpack('>I', data[33:37])[0]
+    raw = zlib.decompress(data[41:41 + idat_length])
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert (rows[:, 0] == 0).all()
+    return width, height, rows[:, 1:].reshape(height, width, 4)
+
+
+def site_tile(lat, lng, zoom):
+    x, y = world_pixels(lat, lng, zoom)
+    return int(x // TILE_SIZE), int(y // TILE_SIZE)
+
+
+class TestHeatmapRaster:
+    """Test suite for app/services/heatmap.py."""
+
+    def test_kernel_is_normalized(self):
+        kernel = gaussian_kernel(4.2)
+        assert kernel.sum() == pytest.approx(1.0)
+        assert kernel.shape == (27, 27)
+        assert kernel[13, 13] == kernel.max()
+
+    def test_density_conserves_mass(self):
+        rng = np.random.default_rng(1)
+        table = make_table(rng.uniform(42.22, 42.3, 500), rng.uniform(-71.85, -71.75, 500), rng.uniform(50, 400, 500))
+        raster = HeatmapRaster.build(table, 'demand', 13)
+
+        pixel_km2 = (meters_per_pixel(float(table.columns['lat'].mean()), 13) / 1000) ** 2
+        assert raster.density.sum() * pixel_km2 == pytest.approx(table.columns['daily_kwh_estimate'].sum(), rel=1e-4)
+        assert raster.density.shape[0] % TILE_SIZE == 0 and raster.density.shape[1] % TILE_SIZE == 0
+
+    @pytest.mark.parametrize("zoom", [12, 13, 14])
+    def test_peak_density_is_zoom_independent(self, zoom):
+        # Gaussian peak of one site: weight / (2 pi sigma^2), sigma = 0.3 km
+        table = make_table([42.26], [-71.80], [100.0])
+        raster = HeatmapRaster.build(table, 'demand', zoom, bandwidth_m=300.0)
+        assert raster.max_density == pytest.approx(100.0 / (2 * math.pi * 0.3 ** 2), rel=0.05)
+
+        tile_x, tile_y = site_tile(42.26, -71.80, zoom)
+        assert raster.tile(tile_x, tile_y).max() == raster.max_density
+        assert raster.tile(tile_x + 50, tile_y) is None
+
+    def test_png_tiles(self):
+        table = make_table([42.26], [-71.80], [100.0])
+        raster = HeatmapRaster.build(table, 'demand', 12)
+        tile_x, tile_y = site_tile(42.26, -71.80, 12)
+
+        width, height, rgba = decode_png(raster.png(tile_x, tile_y))
+        assert (width, height) == (TILE_SIZE, TILE_SIZE)
+        assert rgba[..., 3].max() > 0
+        assert raster.png(tile_x + 50, tile_y) == EMPTY_PNG
+
+    def test_encode_png(self):
+        rgba = np.arange(2 * 3 * 4, dtype=np.uint8).reshape(2, 3, 4)
+        width, height, decoded = decode_png(encode_png(rgba))
+        assert (width, height) == (3, 2)
+        assert (decoded == rgba).all()
+
+    def test_cached_per_table_and_zoom(self):
+        table = make_table([42.26], [-71.80], [100.0])
+        raster = heatmap_raster(table, 'demand', 12)
+        assert heatmap_raster(table, 'demand', 12) is raster
+        assert heatmap_raster(table, 'demand', 13) is not raster
+        assert heatmap_raster(make_table([], [], []), 'demand', 12) is None
+
+    def test_every_layer_and_zoom_stays_cached(self, monkeypatch):
+        monkeypatch.setattr(settings, 'heatmap_min_zoom', 8)
+        monkeypatch.setattr(settings, 'heatmap_max_zoom', 14)
+        assert max_rasters_per_table() == len(LAYERS) * 7
+
+        table = make_table([42.26], [-71.80], [100.0])
+        keys = [(layer, zoom) for layer in LAYERS for zoom in range(8, 15)]
+        rasters = {key: heatmap_raster(table, *key) for key in keys}
+        assert all(heatmap_raster(table, *key) is rasters[key] for key in keys)
+
+    def test_concurrent_requests_build_once(self, monkeypatch):
+        table = make_table([42.26], [-71.80], [100.0])
+        build = HeatmapRaster.build
+        builds = []
+        started = threading.Event()
+
+        def slow_build(table, layer, zoom):
+            builds.append((layer, zoom))
+            started.set()
+            time.sleep(0.1)
+            return build(table, layer, zoom)
+
+        monkeypatch.setattr(HeatmapRaster, 'build', staticmethod(slow_build))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            first = pool.submit(heatmap_raster, table, 'demand', 12)
+            started.wait(5)
+            others = [pool.submit(heatmap_raster, table, 'demand', 12) for _ in range(6)]
+            other_zoom = pool.submit(heatmap_raster, table, 'demand', 13)
+            rasters = [first.result()] + [future.result() for future in others]
+
+        assert all(raster is rasters[0] for raster in rasters)
+        assert other_zoom.result() is not rasters[0]
+        assert sorted(builds) == [('demand', 12), ('demand', 13)]
+
+
+class TestHeatmapEndpoint:
+    """Test suite for GET /api/heatmap/{city}/{layer}/{z}/{x}/{y}.{fmt}."""
+
+    def test_png_tile(self, api_db):
+        tile_x, tile_y = site_tile(42.27, -71.80, 13)
+        response = client.get(f"/api/heatmap/worcester/score/13/{tile_x}/{tile_y}.png")
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'image/png'
+        assert decode_png(response.content)[2][..., 3].max() > 0
+
+    def test_npy_tile(self, api_db):
+        tile_x, tile_y = site_tile(42.27, -71.80, 13)
+        response = client.get(f"/api/heatmap/worcester/demand/13/{tile_x}/{tile_y}.npy")
+
+        values = np.load(io.BytesIO(response.content))
+        assert values.shape == (TILE_SIZE, TILE_SIZE)
+        assert values.dtype == np.float32
+        assert values.max() > 0
+
+    def test_etag(self, api_db):
+        url = "/api/heatmap/worcester/score/12/0/0.png"
+        response = client.get(url)
+        assert response.content == EMPTY_PNG
+
+        etag = response.headers['etag']
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    def test_empty_city(self, api_db):
+        tile_x, tile_y = site_tile(42.27, -71.80, 12)
+        assert client.get(f"/api/heatmap/lowell/score/12/{tile_x}/{tile_y}.png").content == EMPTY_PNG
+
+    def test_invalid_requests(self, api_db):
+        assert client.get("/api/heatmap/atlantis/score/12/0/0.png").status_code == 404
+        assert client.get("/api/heatmap/worcester/equity/12/0/0.png").status_code == 422
+        assert client.get("/api/heatmap/worcester/score/3/0/0.png").status_code == 422
+        assert client.get("/api/heatmap/worcester/score/12/0/0.jpg").status_code == 422
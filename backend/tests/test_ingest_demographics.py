@@ -0,0 +1,198 @@
+"""
+Tests for the census tract join and tract features of the demographics stage.
+"""
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import ingest_demographics  # noqa: E402
+import ingest_traffic  # noqa: E402
+from ingest_demographics import (  # noqa: E402
+    DEMOGRAPHIC_COLUMNS, add_demographic_features, assign_sites_to_tracts, census_geoids,
+    compute_poi_density, compute_tract_features,
+)
+from site_frame import resolve_city, site_seeds  # noqa: E402
+
+
+def make_tracts():
+    """Two unit-ish squares sharing the edge lng = -71.80."""
+    return gpd.GeoDataFrame(
+        {'GEOID': ['25027000100', '25027000200'], 'ALAND': [2_000_000, 1_000_000]},
+        geometry=[box(-71.82, 42.26, -71.80, 42.28), box(-71.80, 42.26, -71.78, 42.28)],
+    )
+
+
+def make_census(**overrides):
+    census = pd.DataFrame({
+        'state': [25, 25],
+        'county': [27, 27],
+        'tract': [100, 200],
+        'total_population': [4000, 1000],
+        'median_household_income': [40000, 80000],
+        'renters_share': [0.6, 0.2],
+    })
+    for name, values in overrides.items():
+        census[name] = values
+    return census
+
+
+class TestAssignSitesToTracts:
+    """Test suite for assign_sites_to_tracts in data/ingest_demographics.py."""
+
+    def test_inside_each_tract(self):
+        sites = pd.DataFrame({'lat': [42.27, 42.27], 'lng': [-71.81, -71.79]})
+        assert assign_sites_to_tracts(sites, make_tracts()).tolist() == ['25027000100', '25027000200']
+
+    def test_shared_boundary_takes_first_tract(self):
+        sites = pd.DataFrame({'lat': [42.27], 'lng': [-71.80]})
+        assert assign_sites_to_tracts(sites, make_tracts()).tolist() == ['25027000100']
+
+    def test_outside_every_tract_snaps_to_nearest(self):
+        # Just east of the second tract, and far west of the first
+        sites = pd.DataFrame({'lat': [42.27, 42.27, 42.27], 'lng': [-71.77, -71.90, -71.81]})
+        assert assign_sites_to_tracts(sites, make_tracts()).tolist() == [
+            '25027000200', '25027000100', '25027000100',
+        ]
+
+
+class TestComputeTractFeatures:
+    """Test suite for compute_tract_features in data/ingest_demographics.py."""
+
+    def test_geoid_zero_padding(self):
+        census = pd.DataFrame({'state': [25, '25'], 'county': [9, '027'], 'tract': [7051, '000100']})
+        assert census_geoids(census).tolist() == ['25009007051', '25027000100']
+
+    def test_features(self):
+        features = compute_tract_features(make_census(), make_tracts())
+
+        assert list(features.index) == ['25027000100', '25027000200']
+        assert features['income_index'].tolist() == [0.0, 1.0]
+        assert features['renters_share'].tolist() == [0.6, 0.2]
+        # 2000 vs 1000 people per km² → ranked
+        assert features['pop_density_index'].tolist() == [1.0, 0.5]
+
+    def test_acs_sentinels_become_nan(self):
+        census = make_census(
+            total_population=[-666666666, 1000], median_household_income=[-666666666, 80000]
+        )
+        features = compute_tract_features(census, make_tracts())
+
+        assert np.isnan(features.loc['25027000100', 'pop_density_index'])
+        assert np.isnan(features.loc['25027000100', 'income_index'])
+        assert features.loc['25027000200', 'pop_density_index'] == 1.0
+
+    def test_water_only_tract_has_no_density(self):
+        tracts = make_tracts()
+        tracts['ALAND'] = [0, 1_000_000]
+        features = compute_tract_features(make_census(), tracts)
+
+        assert np.isnan(features.loc['25027000100', 'pop_density_index'])
+        assert features.loc['25027000200', 'pop_density_index'] == 1.0
+
+    def test_tract_missing_from_census(self):
+        features = compute_tract_features(make_census().iloc[:1], make_tracts())
+        assert features.loc['25027000200'].isna().all()
+
+    def test_tract_without_occupied_units_has_no_renters_share(self):
+        # renter_occupied / total_occupied with 0 occupied units
+        features = compute_tract_features(make_census(renters_share=[np.inf, 0.2]), make_tracts())
+
+        assert np.isnan(features.loc['25027000100', 'renters_share'])
+        assert features.loc['25027000200', 'renters_share'] == 0.2
+
+
+class TestComputePoiDensity:
+    """Test suite for compute_poi_density in data/ingest_demographics.py."""
+
+    def test_matches_per_site_counts(self):
+        rng = np.random.default_rng(0)
+        sites = pd.DataFrame({'lat': rng.uniform(42.2, 42.3, 200), 'lng': rng.uniform(-71.9, -71.7, 200)})
+        pois = pd.DataFrame({'lat': rng.uniform(42.2, 42.3, 500), 'lon': rng.uniform(-71.9, -71.7, 500)})
+
+        density = compute_poi_density(sites, pois)
+
+        distances = np.hypot(
+            sites['lat'].to_numpy()[:, None] - pois['lat'].to_numpy(),
+            sites['lng'].to_numpy()[:, None] - pois['lon'].to_numpy(),
+        )
+        counts = (distances <= 0.005).sum(axis=1)
+        assert density == pytest.approx(counts / counts.max())
+
+
+@pytest.fixture
+def no_real_data(monkeypatch):
+    for loader in ('load_real_census_data', 'load_real_poi_data', 'load_tract_boundaries'):
+        monkeypatch.setattr(ingest_demographics, loader, lambda *args: None)
+
+
+def grid_sites(count=400):
+    lat, lng = np.meshgrid(np.linspace(42.26, 42.28, 20), np.linspace(-71.82, -71.78, count // 20))
+    return pd.DataFrame({'lat': lat.ravel(), 'lng': lng.ravel(), 'parking_lot_flag': 0})
+
+
+class TestAddDemographicFeatures:
+    """Test suite for add_demographic_features in data/ingest_demographics.py."""
+
+    def test_synthetic_features(self, no_real_data):
+        city = resolve_city('worcester')
+        first = add_demographic_features(grid_sites(), city)[DEMOGRAPHIC_COLUMNS]
+        second = add_demographic_features(grid_sites(), city)[DEMOGRAPHIC_COLUMNS]
+
+        pd.testing.assert_frame_equal(first, second)
+        for name in ('pop_density_index', 'income_index', 'renters_share', 'poi_index'):
+            assert first[name].between(0, 1).all()
+            assert first[name].nunique() > 1
+        assert set(first['municipal_parcel_flag']) == {0, 1}
+
+    def test_osm_parking_flag_is_kept(self, no_real_data):
+        sites = grid_sites()
+        sites['parking_lot_flag'] = 1
+
+        assert (add_demographic_features(sites, resolve_city('worcester'))['parking_lot_flag'] == 1).all()
+
+    def test_tract_values_override_synthetic(self, no_real_data, monkeypatch):
+        city = resolve_city('worcester')
+        synthetic = add_demographic_features(grid_sites(), city)
+
+        census = make_census(renters_share=[np.inf, 0.2])
+        monkeypatch.setattr(ingest_demographics, 'load_real_census_data', lambda city: census)
+        monkeypatch.setattr(ingest_demographics, 'load_tract_boundaries', lambda county: make_tracts())
+        sites = add_demographic_features(grid_sites(), city)
+
+        west = (sites['lng'] < -71.80).to_numpy()
+        east = (sites['lng'] > -71.80).to_numpy()
+        assert (sites.loc[west, 'pop_density_index'] == 1.0).all()
+        assert (sites.loc[east, 'renters_share'] == 0.2).all()
+        # No renters share for the west tract: the synthetic value is kept
+        assert sites.loc[west, 'renters_share'].tolist() == synthetic.loc[west, 'renters_share'].tolist()
+
+
+class TestSiteSeeds:
+    """Test suite for the synthetic feature seeds (site_seeds in data/site_frame.py)."""
+
+    def test_database_frame_matches_pipeline_frame(self, no_real_data, monkeypatch):
+        monkeypatch.setattr(ingest_traffic.road_store, 'load_road_network', lambda city: None)
+        city = resolve_city('worcester')
+        pipeline_frame = grid_sites()
+        # Standalone runs read the same sites back with database ids
+        database_frame = grid_sites()
+        database_frame.insert(0, 'id', np.arange(5001, 5001 + len(database_frame)))
+
+        assert (site_seeds(pipeline_frame) == site_seeds(database_frame)).all()
+        columns = DEMOGRAPHIC_COLUMNS + ['traffic_index']
+        for frame in (pipeline_frame, database_frame):
+            add_demographic_features(frame, city)
+            ingest_traffic.add_traffic_features(frame, city)
+        pd.testing.assert_frame_equal(pipeline_frame[columns], database_frame[columns])
+
+    def test_seeds_are_distinct_per_site(self):
+        sites = grid_sites()
+        assert len(set(site_seeds(sites))) == len(sites)
+        assert (site_seeds(sites) >= 0).all()
@@ -0,0 +1,50 @@
+"""
+Tests for the in-process load generator.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.load_test import make_client, parse_mix, run_load, summarize
+
+
+class TestLoadTest:
+    """Test suite for benchmarks/load_test.py."""
+
+    def test_parse_mix(self):
+        assert parse_mix("sites=3,predict") == {'sites': 3.0, 'predict': 1.0}
+        with pytest.raises(ValueError):
+            parse_mix("everything=1")
+
+    def test_summarize_percentiles_and_errors(self):
+        samples = {
+            'sites': [(i / 1000, 200) for i in range(1, 101)],
+            'site': [(0.001, 404), (0.002, None)],
+        }
+        report = summarize(samples, elapsed=2.0)
+
+        sites = report['endpoints']['sites']
+        assert sites['requests'] == 100
+        assert sites['rps'] == 50.0
+        assert sites['p50_ms'] == pytest.approx(50.5)
+        assert sites['p99_ms'] == pytest.approx(99.01)
+        assert report['endpoints']['site']['error_rate'] == 1.0
+        assert report['total']['requests'] == 102
+
+    def test_in_process_run(self, api_db):
+        async def run():
+            async with make_client() as client:
+                return await run_load(
+                    client,
+                    mix={'sites': 1, 'site': 1, 'predict': 1, 'stats': 1},
+                    concurrency=4,
+                    duration=0.5,
+                    warmup=0,
+                    seed=1,
+                )
+
+        report = asyncio.run(run())
+
+        assert report['total']['requests'] > 0
+        assert report['total']['error_rate'] == 0
+        assert set(report['endpoints']) == {'sites', 'site', 'predict', 'stats'}
@@ -0,0 +1,144 @@
+"""
+Tests for the Prometheus metrics endpoint and middleware.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.main import app
+from app.metrics import metrics_response
+from app.server import setup_multiprocess_metrics, worker_exit
+from app.services.ml_predictor import predictor
+
+client = TestClient(app)
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    """Test suite for app/metrics.py."""
+
+    def test_metrics_endpoint_format(self):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+    def test_request_counted_by_route_template(self):
+        """Path parameters are collapsed into the route template."""
+        labels = {"method": "GET", "route": "/api/cities/{city_slug}", "status": "404"}
+        before = sample("http_requests_total", labels)
+
+        client.get("/api/cities/nowhere")
+        client.get("/api/cities/elsewhere")
+
+        assert sample("http_requests_total", labels) == before + 2
+
+    def test_latency_and_sizes_recorded(self):
+        labels = {"method": "GET", "route": "/api/cities"}
+        count_before = sample("http_request_duration_seconds_count", labels)
+        size_before = sample("http_response_size_bytes_sum", labels)
+
+        response = client.get("/api/cities")
+
+        assert sample("http_request_duration_seconds_count", labels) == count_before + 1
+        assert sample("http_response_size_bytes_sum", labels) == size_before + len(response.content)
+        assert sample("http_requests_in_progress", {"method": "GET"}) == 0
+
+    def test_request_size_recorded(self):
+        labels = {"method": "POST", "route": "/api/predict"}
+        before = sample("http_request_size_bytes_sum", labels)
+
+        response = client.post("/api/predict", json={"traffic_index": 0.5, "pop_density_index": 0.5})
+
+        assert sample("http_request_size_bytes_sum", labels) == before + len(response.request.content)
+
+    def test_unknown_paths_share_a_label(self):
+        labels = {"method": "GET", "route": "unmatched", "status": "404"}
+        before = sample("http_requests_total", labels)
+
+        client.get("/no/such/path/1")
+        client.get("/no/such/path/2")
+
+        assert sample("http_requests_total", labels) == before + 2
+
+    def test_inference_timed(self):
+        model_type = type(predictor.model).__name__ if predictor.model is not None else "heuristic_fallback"
+        labels = {"model_type": model_type}
+        before = sample("model_inference_seconds_count", labels)
+
+        predictor.predict_daily_kwh({"traffic_index": 0.5})
+
+        assert sample("model_inference_seconds_count", labels) == before + 1
+
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# A worker (PROMETHEUS_MULTIPROC_DIR set before import, as by app.server):
+# serves two requests, then is left with one in flight
+WORKER_SCRIPT = """
+import os
+from fastapi.testclient import TestClient
+from app.main import app
+from app.metrics import REQUESTS_IN_PROGRESS
+client = TestClient(app)
+client.get("/api/cities")
+client.get("/api/cities")
+REQUESTS_IN_PROGRESS.labels("GET").inc()
+print(os.getpid())
+"""
+
+
+def run_worker(metrics_dir):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir)}
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return int(result.stdout.split()[-1])
+
+
+def scrape(labels):
+    """Samples of the aggregated /metrics body matching some labels."""
+    body = metrics_response().body.decode()
+    return {
+        sample.name: sample.value
+        for family in text_string_to_metric_families(body)
+        for sample in family.samples
+        if labels.items() <= sample.labels.items()
+    }
+
+
+class TestMultiprocessMetrics:
+    """Test suite for multiprocess metrics under app/server.py."""
+
+    def test_scrape_aggregates_workers(self, tmp_path, monkeypatch):
+        pids = [run_worker(tmp_path), run_worker(tmp_path)]
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        requests = scrape({"route": "/api/cities", "status": "200"})
+        assert requests["http_requests_total"] == 4
+        assert scrape({"method": "GET", "route": "/api/cities"})["http_request_duration_seconds_count"] == 4
+        assert scrape({"method": "GET"})["http_requests_in_progress"] == 2
+
+        # An exited worker's gauges go away, its counters stay
+        worker_exit(None, SimpleNamespace(pid=pids[0]))
+        assert scrape({"method": "GET"})["http_requests_in_progress"] == 1
+        assert scrape({"route": "/api/cities", "status": "200"})["http_requests_total"] == 4
+
+    def test_setup_clears_stale_files(self, tmp_path, monkeypatch):
+        (tmp_path / "counter_123.db").write_bytes(b"stale")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        # As in the gunicorn master, before the app is imported
+        monkeypatch.delitem(sys.modules, "prometheus_client")
+
+        assert setup_multiprocess_metrics() == tmp_path
+        assert list(tmp_path.iterdir()) == []
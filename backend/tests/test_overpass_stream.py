@@ -0,0 +1,161 @@
+"""
+Tests for the streaming Overpass JSON parser.
+"""
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import raw_store  # noqa: E402
+from fetch_engine import split_bbox  # noqa: E402
+from fetch_real_data import element_bounds, inside_tile, unique_elements  # noqa: E402
+from road_store import load_road_network, way_row  # noqa: E402
+from overpass_stream import iter_elements, iter_row_chunks  # noqa: E402
+
+
+def overpass_document(count):
+    """Overpass-style response with `out geom` ways."""
+    return {
+        'version': 0.6,
+        'generator': 'Overpass API',
+        'osm3s': {'timestamp_osm_base': '2024-01-01T00:00:00Z', 'copyright': 'ODbL'},
+        'elements': [
+            {
+                'type': 'way',
+                'id': 1000 + i,
+                'tags': {'highway': 'primary', 'name': f"Rue É{i}"},
+                'geometry': [{'lat': 42.0 + i * 1e-4, 'lon': -71.0 - j * 1e-4} for j in range(3)],
+            }
+            for i in range(count)
+        ],
+        'remark': 'done',
+    }
+
+
+def road_rows(element):
+    geometry = element['geometry']
+    return [way_row(
+        element['id'], element['tags']['highway'], element['tags']['name'],
+        [p['lon'] for p in geometry], [p['lat'] for p in geometry],
+    )]
+
+
+class TestIterElements:
+    """Test suite for iter_elements."""
+    
+    @pytest.mark.parametrize("read_size", [1, 7, 4096])
+    def test_matches_json_load(self, read_size):
+        """Elements equal a full parse, whatever the block boundaries."""
+        document = overpass_document(50)
+        payload = json.dumps(document, ensure_ascii=False, indent=1).encode('utf-8')
+        
+        elements = list(iter_elements(io.BytesIO(payload), read_size=read_size))
+        
+        assert elements == document['elements']
+    
+    def test_empty_elements(self):
+        """An empty result yields nothing."""
+        payload = b'{"version": 0.6, "elements": []}'
+        assert list(iter_elements(io.BytesIO(payload))) == []
+    
+    def test_memory_is_bounded(self):
+        """The text buffer stays near the read size for a large document."""
+        from overpass_stream import _StreamReader
+        
+        payload = json.dumps(overpass_document(5000)).encode('utf-8')
+        reader_sizes = []
+        original_fill = _StreamReader._fill
+        
+        def tracking_fill(self):
+            original_fill(self)
+            reader_sizes.append(self.max_buffer)
+        
+        _StreamReader._fill = tracking_fill
+        try:
+            count = sum(1 for _ in iter_elements(io.BytesIO(payload), read_size=4096))
+        finally:
+            _StreamReader._fill = original_fill
+        
+        assert count == 5000
+        assert len(payload) > 100 * 4096
+        assert max(reader_sizes) < 2 * 4096
+    
+    def test_truncated_document_raises(self):
+        """A cut-off response is an error, not a silent partial result."""
+        payload = json.dumps(overpass_document(3)).encode('utf-8')[:-40]
+        with pytest.raises(ValueError):
+            list(iter_elements(io.BytesIO(payload), read_size=16))
+
+
+class TestChunkedWriter:
+    """Test suite for writing streamed chunks to Parquet."""
+    
+    def test_chunks_roundtrip_through_dataset_writer(self, tmp_path, monkeypatch):
+        """Fixed-size chunks written as row groups read back as one dataset."""
+        monkeypatch.setattr(raw_store, 'RAW_DIR', tmp_path)
+        city = {'slug': 'testville'}
+        payload = json.dumps(overpass_document(40)).encode('utf-8')
+        
+        chunks = list(iter_row_chunks(iter_elements(io.BytesIO(payload)), road_rows, chunk_size=15))
+        assert [len(chunk) for chunk in chunks] == [15, 15, 10]
+        
+        with raw_store.DatasetWriter('roads', city) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        
+        df = raw_store.read_dataset('roads', city)
+        assert writer.rows == len(df) == 40
+        assert str(df['highway_type'].dtype) == 'category'
+        
+        roads = load_road_network(city)
+        assert roads.segment_count == 40 * 2
+
+
+def node(node_id, lat, lon):
+    return {'type': 'node', 'id': node_id, 'lat': lat, 'lon': lon}
+
+
+def way(way_id, points):
+    return {'type': 'way', 'id': way_id, 'geometry': [{'lat': lat, 'lon': lon} for lat, lon in points]}
+
+
+class TestUniqueElements:
+    """Test suite for the cross-tile deduplication in fetch_real_data.py."""
+    
+    def test_element_bounds(self):
+        """Bounds come from `bounds`, a node position or the geometry."""
+        bounded = {'type': 'way', 'id': 1, 'bounds': {'minlat': 1, 'minlon': 2, 'maxlat': 3, 'maxlon': 4}}
+        assert element_bounds(bounded) == (1, 2, 3, 4)
+        assert element_bounds(node(1, 42.1, -71.2)) == (42.1, -71.2, 42.1, -71.2)
+        assert element_bounds(way(2, [(42.0, -71.0), (42.2, -71.3)])) == (42.0, -71.3, 42.2, -71.0)
+        assert element_bounds({'type': 'relation', 'id': 3}) is None
+    
+    def test_inside_tile(self):
+        """Anything touching an edge may be returned by a neighbour."""
+        tile = [-71.2, 42.0, -71.0, 42.2]
+        assert inside_tile(tile, (42.1, -71.1, 42.1, -71.1))
+        assert not inside_tile(tile, (42.1, -71.0, 42.1, -71.0))
+        assert not inside_tile(tile, (42.1, -71.1, 42.3, -71.1))
+        assert not inside_tile(tile, None)
+    
+    def test_drops_cross_tile_duplicates(self, tmp_path):
+        """Edge nodes and crossing ways are kept once, in tile order."""
+        west_tile, east_tile = split_bbox([-71.2, 42.0, -71.0, 42.1], 0.15)
+        edge = west_tile[2]
+        crossing = way(10, [(42.05, -71.15), (42.05, -71.05)])
+        responses = [
+            (west_tile, [node(1, 42.05, -71.15), node(2, 42.05, edge), crossing]),
+            (east_tile, [node(2, 42.05, edge), crossing, node(3, 42.05, -71.05)]),
+        ]
+        tile_files = []
+        for i, (tile, elements) in enumerate(responses):
+            path = tmp_path / f"tile{i}.json"
+            path.write_text(json.dumps({'elements': elements}))
+            tile_files.append((tile, path))
+        
+        ids = [(element['type'], element['id']) for element in unique_elements(tile_files)]
+        assert ids == [('node', 1), ('node', 2), ('way', 10), ('node', 3)]
@@ -0,0 +1,166 @@
+"""
+Tests for the shadow-table publishing used by the data pipeline.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, insert, inspect, select, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import publish  # noqa: E402
+from site_frame import SITE_COLUMNS  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import DatasetVersion, Site  # noqa: E402
+
+
+def make_sites(city, count, score=50.0):
+    """Minimal site frame for a city."""
+    rows = []
+    for i in range(count):
+        row = {column: 0.0 for column in SITE_COLUMNS}
+        row.update({
+            'city': city,
+            'lat': 42.0 + i * 0.001,
+            'lng': -71.0,
+            'location_label': f"{city} {i}",
+            'parcel_id': f"{city}-{i}",
+            'parking_lot_flag': 0,
+            'municipal_parcel_flag': 0,
+            'score_overall': score,
+        })
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sites.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def city_counts(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(select(Site.city, func.count()).group_by(Site.city))
+        return dict(rows.fetchall())
+
+
+class TestShadowPublish:
+    """Test suite for publish.py."""
+    
+    def test_swap_replaces_only_rebuilt_cities(self, engine):
+        """Cities not being rebuilt are carried over unchanged."""
+        publish.publish_cities(engine, {'boston': make_sites('boston', 3), 'lowell': make_sites('lowell', 2)})
+        versions = publish.publish_cities(engine, {'boston': make_sites('boston', 5, score=80.0)})
+        
+        assert versions == {'boston': 2}
+        assert city_counts(engine) == {'boston': 5, 'lowell': 2}
+        
+        with engine.connect() as conn:
+            scores = conn.execute(select(Site.score_overall).where(Site.city == 'boston')).scalars()
+            assert set(scores) == {80.0}
+            lowell = conn.execute(
+                select(DatasetVersion.version).where(DatasetVersion.city == 'lowell')
+            ).scalar()
+            assert lowell == 1
+    
+    def test_swap_keeps_indexes_and_drops_staging(self, engine):
+        """The swapped-in table has the canonical indexes."""
+        publish.publish_cities(engine, {'boston': make_sites('boston', 3)})
+        
+        inspector = inspect(engine)
+        assert publish.STAGING_TABLE not in inspector.get_table_names()
+        index_names = {index['name'] for index in inspector.get_indexes('sites')}
+        assert {index.name for index in Site.__table__.indexes} <= index_names
+    
+    def test_failed_city_keeps_previous_sites(self, engine):
+        """A city whose rebuild did not finish keeps its live rows."""
+        publish.publish_cities(engine, {'boston': make_sites('boston', 3), 'lowell': make_sites('lowell', 2)})
+        
+        publish.create_staging_table(engine)
+        publish.load_staging_sites(engine, make_sites('boston', 4), 'boston')
+        publish.build_staging_indexes(engine)
+        publish.swap_staging_table(engine, {'boston': 4})
+        
+        assert city_counts(engine) == {'boston': 4, 'lowell': 2}
+    
+    def test_city_delete_uses_index(self, engine):
+        """Replacing one city's staged rows does not scan the whole table."""
+        publish.publish_cities(engine, {'boston': make_sites('boston', 3)})
+        publish.create_staging_table(engine)
+        
+        with engine.connect() as conn:
+            plan = conn.execute(text(
+                f"EXPLAIN QUERY PLAN DELETE FROM {publish.STAGING_TABLE} WHERE city = 'boston'"
+            )).fetchall()
+        assert any('USING INDEX' in str(row) for row in plan)
+        
+        publish.build_staging_indexes(engine)
+        index_names = {index['name'] for index in inspect(engine).get_indexes(publish.STAGING_TABLE)}
+        assert index_names == {publish.staging_index_name(index) for index in Site.__table__.indexes}
+        publish.drop_staging_table(engine)
+
+
+@pytest.fixture
+def pg_engine():
+    """Engine for TEST_POSTGRES_URL (a scratch database); skips without one."""
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_engine(url)
+    publish.drop_staging_table(engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    publish.drop_staging_table(engine)
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+class TestPostgresSwap:
+    """Test suite for the PostgreSQL-only steps of the swap in publish.py."""
+    
+    def test_swapped_table_keeps_sequence_and_names(self, pg_engine):
+        """LIKE ... INCLUDING DEFAULTS, OWNED BY and the index renames."""
+        publish.publish_cities(pg_engine, {'boston': make_sites('boston', 3)})
+        publish.publish_cities(pg_engine, {'boston': make_sites('boston', 2)})
+        
+        with pg_engine.begin() as conn:
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence('sites', 'id')")).scalar()
+            assert sequence is not None
+            max_id = conn.execute(select(func.max(Site.id))).scalar()
+            row = make_sites('lowell', 1)[SITE_COLUMNS].to_dict('records')[0]
+            new_id = conn.execute(insert(Site.__table__).returning(Site.id), row).scalar()
+            assert new_id > max_id
+        
+        inspector = inspect(pg_engine)
+        assert inspector.get_pk_constraint('sites')['name'] == 'sites_pkey'
+        index_names = {index['name'] for index in inspector.get_indexes('sites')}
+        assert index_names == {index.name for index in Site.__table__.indexes}
+        assert publish.STAGING_TABLE not in inspector.get_table_names()
+    
+    def test_swap_gives_up_behind_readers(self, pg_engine, monkeypatch):
+        """lock_timeout bounds the wait; the live table is left as it was."""
+        publish.publish_cities(pg_engine, {'boston': make_sites('boston', 3)})
+        monkeypatch.setattr(publish, 'SWAP_LOCK_TIMEOUT', '100ms')
+        monkeypatch.setattr(publish, 'SWAP_ATTEMPTS', 1)
+        
+        publish.create_staging_table(pg_engine)
+        publish.load_staging_sites(pg_engine, make_sites('boston', 5), 'boston')
+        publish.build_staging_indexes(pg_engine)
+        
+        with pg_engine.connect() as reader:
+            reader.begin()
+            reader.execute(select(func.count()).select_from(Site.__table__))
+            with pytest.raises(OperationalError):
+                publish.swap_staging_table(pg_engine, {'boston': 5})
+            reader.rollback()
+        
+        assert city_counts(pg_engine) == {'boston': 3}
+        assert publish.swap_staging_table(pg_engine, {'boston': 5}) == {'boston': 2}
+        assert city_counts(pg_engine) == {'boston': 5}
@@ -0,0 +1,89 @@
+"""
+Tests for per-request SQL instrumentation and query budgets.
+"""
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import track_queries
+from app.main import app
+from app.services.site_store import site_store
+from tests.conftest import assert_max_queries
+
+client = TestClient(app)
+
+
+class TestQueryBudgets:
+    """Maximum number of queries per endpoint."""
+
+    def test_cold_city_load(self, api_db):
+        """A city's first request reads its version and sites (site store)."""
+        with assert_max_queries(api_db, 2):
+            response = client.get("/api/sites?city=worcester&limit=10")
+        assert response.json()["count"] == 10
+
+    @pytest.mark.parametrize("path", [
+        "/api/sites?city=worcester&limit=10",
+        "/api/sites/1",
+        "/api/stats/worcester",
+    ])
+    def test_warm_reads_are_served_from_memory(self, api_db, path):
+        site_store.load_all()
+
+        with assert_max_queries(api_db, 0):
+            response = client.get(path)
+        assert response.status_code == 200
+
+    def test_budget_violation_fails(self, api_db):
+        with pytest.raises(AssertionError, match="got 2"):
+            with assert_max_queries(api_db, 1):
+                with api_db.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    conn.execute(text("SELECT 2"))
+
+
+class TestQueryStats:
+    """Test suite for the query stats contextvar and headers."""
+
+    def test_response_headers(self, api_db):
+        response = client.get("/api/sites?city=worcester")
+
+        assert response.headers["X-DB-Query-Count"] == "2"
+        assert response.headers["Server-Timing"].startswith("db;dur=")
+        assert 'desc="2 queries"' in response.headers["Server-Timing"]
+
+        response = client.get("/api/sites?city=worcester")
+        assert response.headers["X-DB-Query-Count"] == "0"
+
+    def test_no_queries(self):
+        response = client.get("/api/cities")
+        assert response.headers["X-DB-Query-Count"] == "0"
+
+    def test_track_queries(self, api_db):
+        with track_queries() as stats:
+            with api_db.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+        assert stats.count == 2
+        assert stats.duration > 0
+
+    def test_queries_outside_tracking_not_counted(self, api_db):
+        with track_queries() as stats:
+            pass
+        with api_db.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert stats.count == 0
+
+    def test_slow_query_logged_with_plan(self, api_db, monkeypatch, caplog):
+        monkeypatch.setattr(settings, "slow_query_ms", 0.0)
+
+        with caplog.at_level(logging.WARNING, logger="app.sql"):
+            with api_db.connect() as conn:
+                conn.execute(text("SELECT * FROM sites WHERE city = :city"), {"city": "worcester"})
+
+        messages = [record.getMessage() for record in caplog.records]
+        assert any("Slow query" in message and "Plan:" in message for message in messages)
@@ -0,0 +1,75 @@
+"""
+Tests for typed Parquet storage of raw datasets.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import raw_store  # noqa: E402
+
+
+CITY = {'slug': 'testville'}
+
+
+@pytest.fixture(autouse=True)
+def raw_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_store, 'RAW_DIR', tmp_path)
+    return tmp_path
+
+
+def pois_frame():
+    return pd.DataFrame({
+        'id': [101, 102, 202],
+        'lat': [42.26, 42.27, 42.28],
+        'lon': [-71.80, -71.81, -71.82],
+        'type': ['cafe', 'cafe', 'school'],
+        'name': ['Bean', None, 'Elm Park'],
+    })
+
+
+class TestRawStore:
+    """Test suite for raw_store.py."""
+    
+    def test_parquet_roundtrip_uses_compact_dtypes(self):
+        """Coordinates are float32, tags categorical and ids int64."""
+        raw_store.write_dataset(pois_frame(), 'pois', CITY)
+        df = raw_store.read_dataset('pois', CITY)
+        
+        assert df['lat'].dtype == np.float32
+        assert df['id'].dtype == np.int64
+        assert isinstance(df['type'].dtype, pd.CategoricalDtype)
+        assert df['lat'].tolist() == pytest.approx([42.26, 42.27, 42.28], abs=1e-5)
+    
+    def test_column_projection(self):
+        """Only the requested (and available) columns are loaded."""
+        raw_store.write_dataset(pois_frame(), 'pois', CITY)
+        df = raw_store.read_dataset('pois', CITY, columns=['lat', 'lon', 'missing'])
+        
+        assert list(df.columns) == ['lat', 'lon']
+    
+    def test_csv_fallback_and_import(self, raw_dir):
+        """Legacy CSVs are read with the same dtypes and can be converted."""
+        census = pd.DataFrame({
+            'total_population': [1200, 3400],
+            'state': ['25', '25'],
+            'county': ['027', '027'],
+            'tract': ['001100', '731200'],
+        })
+        census.to_csv(raw_store.csv_path('census', CITY), index=False)
+        
+        df = raw_store.read_dataset('census', CITY)
+        assert df['county'].tolist() == ['027', '027']
+        assert df['total_population'].dtype == np.float32
+        
+        path = raw_store.import_csv('census', CITY)
+        assert path == raw_store.parquet_path('census', CITY)
+        assert raw_store.read_dataset('census', CITY)['tract'].tolist() == ['001100', '731200']
+    
+    def test_missing_dataset_returns_none(self):
+        """A dataset that was never fetched reads as None."""
+        assert raw_store.read_dataset('pois', CITY) is None
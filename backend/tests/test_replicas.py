@@ -0,0 +1,111 @@
+"""
+Tests for read-replica routing (read_session).
+"""
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.database
+from app.config import Settings
+from app.database import Base, ReadReplicas, read_session
+from app.models import Site
+from tests.conftest import make_site
+
+
+def seeded_engine(path, sites):
+    """SQLite engine holding `sites` Worcester sites (identifies the database)."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([make_site('worcester', i) for i in range(sites)])
+        session.commit()
+    return engine
+
+
+def site_count(connection):
+    return connection.execute(select(func.count()).select_from(Site)).scalar()
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Primary with 1 site, replicas with 2 and 3 sites."""
+    engines = {
+        'primary': seeded_engine(tmp_path / 'primary.db', 1),
+        'replica_a': seeded_engine(tmp_path / 'a.db', 2),
+        'replica_b': seeded_engine(tmp_path / 'b.db', 3),
+    }
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+def unreachable_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'missing' / 'down.db'}")
+
+
+class TestReadReplicas:
+    """Test suite for ReadReplicas in app/database.py."""
+
+    def test_replica_urls_setting(self):
+        settings = Settings(database_replica_urls=" postgresql://a/db, postgresql://b/db ,")
+        assert settings.replica_urls == ["postgresql://a/db", "postgresql://b/db"]
+        assert Settings(database_replica_urls="").replica_urls == []
+
+    def test_round_robin(self, databases):
+        replicas = ReadReplicas([databases['replica_a'], databases['replica_b']])
+
+        counts = []
+        for _ in range(4):
+            with replicas.connect() as conn:
+                counts.append(site_count(conn))
+        assert counts == [2, 3, 2, 3]
+
+    def test_failover_skips_unreachable_replica(self, databases, tmp_path):
+        replicas = ReadReplicas([unreachable_engine(tmp_path), databases['replica_b']])
+
+        for _ in range(3):
+            with replicas.connect() as conn:
+                assert site_count(conn) == 3
+        assert not replicas.available(0)
+        assert replicas.status()[0]["available"] is False
+
+    def test_failed_replica_retried_after_successful_check(self, databases):
+        replicas = ReadReplicas([databases['replica_a']], retry_after=3600)
+        replicas._failed_at[0] = 0.0
+        replicas.monitors[0].check()
+        assert replicas.available(0)
+
+    def test_replica_reported_down_by_monitor_is_skipped(self, databases, tmp_path):
+        replicas = ReadReplicas([databases['replica_a'], unreachable_engine(tmp_path)])
+        for monitor in replicas.monitors:
+            monitor.check()
+
+        assert replicas.candidates() == [0]
+        assert not replicas.available(1)
+
+    def test_no_reachable_replica(self, tmp_path):
+        assert ReadReplicas([]).connect() is None
+        assert ReadReplicas([unreachable_engine(tmp_path)]).connect() is None
+
+
+class TestReadSession:
+    """Sessions from read_session use a replica, falling back to the primary."""
+
+    def read_count(self):
+        with read_session() as db:
+            return db.execute(select(func.count()).select_from(Site)).scalar()
+
+    def test_uses_replica(self, databases, monkeypatch):
+        monkeypatch.setattr(app.database, 'SessionLocal', sessionmaker(bind=databases['primary']))
+        monkeypatch.setattr(app.database, 'read_replicas', ReadReplicas([databases['replica_a']]))
+        assert self.read_count() == 2
+
+    def test_falls_back_to_primary(self, databases, tmp_path, monkeypatch):
+        monkeypatch.setattr(app.database, 'SessionLocal', sessionmaker(bind=databases['primary']))
+        monkeypatch.setattr(app.database, 'read_replicas', ReadReplicas([unreachable_engine(tmp_path)]))
+        assert self.read_count() == 1
+
+    def test_primary_without_replicas(self, databases, monkeypatch):
+        monkeypatch.setattr(app.database, 'SessionLocal', sessionmaker(bind=databases['primary']))
+        monkeypatch.setattr(app.database, 'read_replicas', ReadReplicas([]))
+        assert self.read_count() == 1
@@ -0,0 +1,71 @@
+"""
+Tests for the compact road store and nearest-segment index.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+from road_store import RoadNetwork, vertices_to_ways  # noqa: E402
+
+
+def vertex_rows():
+    """Two roads in the old one-row-per-vertex layout, plus a stray vertex."""
+    return pd.DataFrame({
+        'way_id': [1, 1, 1, 2, 2, 3],
+        'lat': [42.00, 42.00, 42.01, 42.02, 42.02, 42.05],
+        'lon': [-71.00, -70.99, -70.99, -71.00, -70.98, -71.00],
+        'highway_type': ['primary'] * 3 + ['motorway_link'] * 2 + ['trunk'],
+        'name': ['Main St'] * 3 + [None] * 2 + ['Lone'],
+    })
+
+
+def brute_force_distances(roads, lat, lng):
+    """Point-to-segment distance against every segment, in meters."""
+    starts, _ = roads.segments()
+    x, y = roads.project(roads.coords[:, 1], roads.coords[:, 0])
+    px, py = roads.project(lat, lng)
+    ax, ay, bx, by = x[starts], y[starts], x[starts + 1], y[starts + 1]
+    dx, dy = bx - ax, by - ay
+    t = np.clip(((px[:, None] - ax) * dx + (py[:, None] - ay) * dy) / (dx * dx + dy * dy), 0, 1)
+    return np.hypot(ax + t * dx - px[:, None], ay + t * dy - py[:, None]).min(axis=1)
+
+
+class TestRoadStore:
+    """Test suite for road_store.py."""
+    
+    def test_vertices_collapse_to_one_row_per_way(self):
+        """Attributes are kept once per way and vertex order is preserved."""
+        ways = vertices_to_ways(vertex_rows())
+        roads = RoadNetwork.from_ways(ways)
+        
+        assert list(ways['way_id']) == [1, 2]
+        assert list(roads.offsets) == [0, 3, 5]
+        assert roads.segment_count == 3
+        np.testing.assert_allclose(roads.coords[:3], [[-71.00, 42.00], [-70.99, 42.00], [-70.99, 42.01]])
+    
+    def test_nearest_matches_brute_force(self):
+        """Indexed nearest-segment distances equal an exhaustive search."""
+        roads = RoadNetwork.from_ways(vertices_to_ways(vertex_rows()))
+        rng = np.random.default_rng(7)
+        lat = rng.uniform(41.99, 42.04, 200)
+        lng = rng.uniform(-71.01, -70.97, 200)
+        
+        distances, _ = roads.nearest(lat, lng)
+        
+        np.testing.assert_allclose(distances, brute_force_distances(roads, lat, lng), rtol=1e-9)
+    
+    def test_nearest_filters_by_class(self):
+        """Only roads of the requested classes are considered."""
+        roads = RoadNetwork.from_ways(vertices_to_ways(vertex_rows()))
+        
+        distances, ways = roads.nearest([42.0], [-70.995], highway_types={'motorway_link'})
+        assert roads.way_ids[ways[0]] == 2
+        assert distances[0] == pytest.approx(0.02 * 111_320, rel=1e-3)
+        
+        distances, ways = roads.nearest([42.0], [-70.995], highway_types={'trunk'})
+        assert np.isinf(distances[0]) and ways[0] == -1
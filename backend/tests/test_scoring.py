@@ -139,3 +139,67 @@ class TestScoringService:
         # Should not raise error and should return valid results
         assert isinstance(results, dict)
         assert 'score_overall' in results
+    
+    def test_compute_all_scores_batch_matches_scalar(self):
+        """Test that the vectorized scorer agrees with compute_all_scores."""
+        rows = [
+            {'traffic_index': 0.8, 'pop_density_index': 0.6, 'renters_share': 0.5,
+             'income_index': 0.4, 'poi_index': 0.7, 'parking_lot_flag': 1,
+             'municipal_parcel_flag': 0},
+            {'traffic_index': 0.1, 'pop_density_index': 0.9, 'renters_share': 0.2,
+             'income_index': 0.8, 'poi_index': 0.3, 'parking_lot_flag': 1,
+             'municipal_parcel_flag': 1},
+        ]
+        columns = {key: [row[key] for row in rows] for key in rows[0]}
+        
+        batch = ScoringService.compute_all_scores_batch(columns)
+        
+        for idx, row in enumerate(rows):
+            expected = ScoringService.compute_all_scores(row)
+            for key, value in expected.items():
+                assert batch[key][idx] == pytest.approx(value)
+    
+    def test_catchment_index_blends_into_demand(self):
+        """Test that the catchment index shifts demand only when given."""
+        features = {'traffic_index': 0.5, 'pop_density_index': 0.5, 'poi_index': 0.5}
+        point = ScoringService.compute_all_scores(features)
+        
+        assert ScoringService.compute_all_scores({**features, 'catchment_index': None}) == point
+        assert ScoringService.compute_all_scores({**features, 'catchment_index': float('nan')}) == point
+        
+        rich = ScoringService.compute_all_scores({**features, 'catchment_index': 1.0})
+        poor = ScoringService.compute_all_scores({**features, 'catchment_index': 0.0})
+        # 0.75 * 50 + 0.25 * 100 and 0.75 * 50
+        assert rich['score_demand'] == pytest.approx(62.5)
+        assert poor['score_demand'] == pytest.approx(37.5)
+        assert rich['score_overall'] > point['score_overall'] > poor['score_overall']
+        assert rich['daily_kwh_estimate'] == point['daily_kwh_estimate']
+    
+    def test_compute_all_scores_batch_with_catchment(self):
+        """Test that the vectorized scorer blends the catchment index too."""
+        rows = [
+            {'traffic_index': 0.8, 'pop_density_index': 0.6, 'poi_index': 0.7, 'catchment_index': 0.9},
+            {'traffic_index': 0.1, 'pop_density_index': 0.9, 'poi_index': 0.3, 'catchment_index': 0.2},
+        ]
+        columns = {key: [row[key] for row in rows] for key in rows[0]}
+        
+        batch = ScoringService.compute_all_scores_batch(columns)
+        
+        for idx, row in enumerate(rows):
+            expected = ScoringService.compute_all_scores(row)
+            assert batch['score_demand'][idx] == pytest.approx(expected['score_demand'])
+    
+    def test_compute_all_scores_batch_skips_missing_catchment(self):
+        """Test that sites without a catchment index keep the point demand score."""
+        columns = {
+            'traffic_index': [0.8, 0.8, 0.8],
+            'pop_density_index': [0.6, 0.6, 0.6],
+            'poi_index': [0.7, 0.7, 0.7],
+            'catchment_index': [None, float('nan'), 0.9],
+        }
+        
+        batch = ScoringService.compute_all_scores_batch(columns)
+        
+        point = ScoringService.compute_demand_score(0.8, 0.6, 0.7)
+        assert batch['score_demand'][0] == batch['score_demand'][1] == point
+        assert batch['score_demand'][2] == pytest.approx(ScoringService.blend_catchment_demand(point, 0.9))
@@ -0,0 +1,49 @@
+"""
+Tests for the production server configuration.
+"""
+from app.config import settings
+from app.database import pool_sizes
+from app.server import DrainingUvicornWorker, memory_usage, server_options
+
+
+class TestPoolSizing:
+    """Per-worker connection pool sizes derived from Settings."""
+
+    def test_single_process_defaults(self, monkeypatch):
+        monkeypatch.setattr(settings, 'db_max_connections', 15)
+        assert pool_sizes(1) == (5, 10)
+
+    def test_budget_split_between_workers(self, monkeypatch):
+        monkeypatch.setattr(settings, 'db_max_connections', 40)
+        pool_size, max_overflow = pool_sizes(4)
+        assert pool_size + max_overflow == 10
+        assert pool_size >= 1
+
+    def test_more_workers_than_connections(self, monkeypatch):
+        monkeypatch.setattr(settings, 'db_max_connections', 4)
+        assert pool_sizes(16) == (1, 0)
+
+    def test_explicit_overrides(self, monkeypatch):
+        monkeypatch.setattr(settings, 'db_pool_size', 3)
+        monkeypatch.setattr(settings, 'db_max_overflow', 0)
+        assert pool_sizes(8) == (3, 0)
+
+
+class TestServerOptions:
+    """Test suite for app/server.py."""
+
+    def test_preload_and_graceful_shutdown(self, monkeypatch):
+        monkeypatch.setattr(settings, 'shutdown_timeout', 20)
+        options = server_options(4, '0.0.0.0', 8000)
+
+        assert options['workers'] == 4
+        assert options['preload_app'] is True
+        assert options['bind'] == '0.0.0.0:8000'
+        assert options['graceful_timeout'] > 20
+        assert options['worker_class'] == 'app.server.DrainingUvicornWorker'
+        assert 'timeout_graceful_shutdown' in DrainingUvicornWorker.CONFIG_KWARGS
+        assert options['worker_exit'] and options['child_exit']
+
+    def test_memory_usage(self):
+        usage = memory_usage()
+        assert usage['rss'] > 0
@@ -0,0 +1,131 @@
+"""
+Tests for the nearest-site index and /api/sites/nearest.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.services.site_index import EARTH_RADIUS_KM, SiteIndex
+from app.services.site_store import site_store
+from tests.conftest import make_site
+
+client = TestClient(app)
+
+
+def haversine_km(lat, lng, lats, lngs):
+    lat, lng, lats, lngs = map(np.radians, (lat, lng, lats, lngs))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def sites():
+    rng = np.random.default_rng(7)
+    lat = rng.uniform(42.2, 42.35, 2000)
+    lng = rng.uniform(-71.9, -71.7, 2000)
+    scores = rng.uniform(0, 100, 2000).round(1)
+    return lat, lng, scores, SiteIndex(lat, lng, scores)
+
+
+class TestSiteIndex:
+    """Test suite for app/services/site_index.py."""
+
+    @pytest.mark.parametrize("k,min_score,max_km", [(1, None, None), (25, None, None), (10, 90.0, None), (50, 50.0, 2.0)])
+    def test_nearest_matches_brute_force(self, sites, k, min_score, max_km):
+        lat, lng, scores, index = sites
+        km = haversine_km(42.27, -71.8, lat, lng)
+        keep = np.ones(len(km), dtype=bool)
+        if min_score is not None:
+            keep &= scores >= min_score
+        if max_km is not None:
+            keep &= km <= max_km
+        expected = np.flatnonzero(keep)[np.argsort(km[keep], kind='stable')][:k]
+
+        rows, distances = index.nearest(42.27, -71.8, k, min_score, max_km)
+        assert rows.tolist() == expected.tolist()
+        np.testing.assert_allclose(distances, km[expected], atol=1e-6)
+
+    @pytest.mark.parametrize("km_weight,min_score", [(0.5, None), (5.0, None), (50.0, None), (5.0, 80.0)])
+    def test_best_matches_brute_force(self, sites, km_weight, min_score):
+        lat, lng, scores, index = sites
+        ranks = scores - km_weight * haversine_km(42.27, -71.8, lat, lng)
+        if min_score is not None:
+            ranks[scores < min_score] = -np.inf
+        expected = np.argsort(-ranks, kind='stable')[:20]
+
+        rows, _, best_ranks = index.best(42.27, -71.8, 20, km_weight, min_score)
+        assert set(rows.tolist()) == set(expected.tolist())
+        np.testing.assert_allclose(best_ranks, ranks[expected], atol=1e-6)
+
+    def test_k_larger_than_city(self, sites):
+        lat, lng, scores, _ = sites
+        index = SiteIndex(lat[:5], lng[:5], scores[:5])
+        assert len(index.nearest(42.27, -71.8, 10)[0]) == 5
+        assert len(index.best(42.27, -71.8, 10, 1.0)[0]) == 5
+
+    def test_empty(self):
+        index = SiteIndex(np.empty(0), np.empty(0), np.empty(0))
+        assert len(index.nearest(42.27, -71.8, 5)[0]) == 0
+        assert len(index.best(42.27, -71.8, 5, 1.0)[0]) == 0
+
+    def test_built_once_per_table(self, api_db):
+        table = site_store.get('worcester')
+        assert table.spatial_index is table.spatial_index
+
+
+class TestNearestEndpoint:
+    """Test suite for GET /api/sites/nearest."""
+
+    def test_nearest_first(self, api_db):
+        data = client.get("/api/sites/nearest?lat=42.26&lng=-71.80&k=3&city=worcester").json()
+        labels = [feature['properties']['location_label'] for feature in data['features']]
+        distances = [feature['properties']['distance_km'] for feature in data['features']]
+
+        assert data['count'] == 3
+        assert data['rank'] == 'distance'
+        assert labels == ['worcester site 0', 'worcester site 1', 'worcester site 2']
+        assert distances == [0.0, 0.111, 0.222]
+
+    def test_min_score_and_radius(self, api_db):
+        data = client.get("/api/sites/nearest?lat=42.26&lng=-71.80&k=10&min_score=55&max_distance_km=1.8").json()
+        labels = [feature['properties']['location_label'] for feature in data['features']]
+        assert labels == ['worcester site 15', 'worcester site 16']
+
+    def test_combined_rank(self, api_db):
+        # Each step north adds 1 score point and ~0.111 km
+        far = client.get("/api/sites/nearest?lat=42.26&lng=-71.80&k=2&rank=combined&km_weight=1").json()
+        near = client.get("/api/sites/nearest?lat=42.26&lng=-71.80&k=2&rank=combined&km_weight=20").json()
+
+        assert [f['properties']['location_label'] for f in far['features']] == ['worcester site 19', 'worcester site 18']
+        assert [f['properties']['location_label'] for f in near['features']] == ['worcester site 0', 'worcester site 1']
+        assert near['features'][0]['properties']['rank_score'] == 40.0
+
+    def test_merges_cities(self, api_db):
+        with sessionmaker(bind=api_db)() as session:
+            boston = make_site('boston', 0)
+            boston.lat, boston.lng = 42.36, -71.06
+            session.add(boston)
+            session.commit()
+
+        data = client.get("/api/sites/nearest?lat=42.36&lng=-71.06&k=2").json()
+        cities = [feature['properties']['city'] for feature in data['features']]
+        assert cities == ['boston', 'worcester']
+
+    def test_far_cities_not_searched(self, api_db):
+        """The k nearest are all in Worcester, so no other city is loaded."""
+        data = client.get("/api/sites/nearest?lat=42.26&lng=-71.80&k=3").json()
+        assert data['count'] == 3
+        assert list(site_store.status()) == ['worcester']
+
+        client.get("/api/sites/nearest?lat=42.26&lng=-71.80&k=3&rank=combined&km_weight=10")
+        assert list(site_store.status()) == ['worcester']
+
+    def test_unknown_city(self, api_db):
+        assert client.get("/api/sites/nearest?lat=42.26&lng=-71.80&city=atlantis").status_code == 404
+
+    def test_invalid_parameters(self, api_db):
+        assert client.get("/api/sites/nearest?lat=42.26&lng=-71.80&rank=score").status_code == 422
+        assert client.get("/api/sites/nearest?lat=95&lng=-71.80").status_code == 422
+        assert client.get("/api/sites/nearest?lng=-71.80").status_code == 422
@@ -0,0 +1,124 @@
+"""
+Tests for the max-coverage portfolio optimizer and /api/optimize.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.site_optimizer import CoverageProblem, coverage_problem, optimize_portfolio
+from app.services.site_table import COLUMNS, SiteTable
+
+client = TestClient(app)
+
+
+def make_table(lat, lng, kwh=None, scores=None):
+    """SiteTable with the given coordinates (other columns neutral)."""
+    count = len(lat)
+    columns = {
+        name: np.array([None] * count, dtype=object) if dtype is object else np.zeros(count, dtype=dtype)
+        for name, dtype in COLUMNS.items()
+    }
+    columns['id'] = np.arange(1, count + 1)
+    columns['lat'] = np.asarray(lat, dtype=np.float64)
+    columns['lng'] = np.asarray(lng, dtype=np.float64)
+    columns['daily_kwh_estimate'] = np.ones(count) if kwh is None else np.asarray(kwh, dtype=np.float64)
+    columns['score_overall'] = np.full(count, 50.0) if scores is None else np.asarray(scores, dtype=np.float64)
+    return SiteTable('worcester', 1, columns)
+
+
+def plain_greedy(problem, n):
+    """Reference greedy: re-evaluate every candidate at every step."""
+    remaining = problem.weights.copy()
+    picks = []
+    for _ in range(n):
+        gains = problem.matrix @ remaining
+        best = int(np.argmax(gains))
+        if gains[best] <= 0:
+            break
+        picks.append(best)
+        remaining[problem.matrix[best].indices] = 0.0
+    return problem.rows[picks]
+
+
+@pytest.fixture
+def random_table():
+    rng = np.random.default_rng(3)
+    return make_table(rng.uniform(42.2, 42.3, 3000), rng.uniform(-71.9, -71.75, 3000),
+                      kwh=rng.uniform(50, 400, 3000), scores=rng.uniform(0, 100, 3000))
+
+
+class TestCoverageProblem:
+    """Test suite for app/services/site_optimizer.py."""
+
+    @pytest.mark.parametrize("radius_km,min_score", [(0.3, None), (1.0, None), (0.5, 60.0)])
+    def test_lazy_greedy_matches_plain_greedy(self, random_table, radius_km, min_score):
+        problem = CoverageProblem.build(random_table, radius_km, min_score=min_score)
+        result = problem.select(40)
+
+        assert result['rows'].tolist() == plain_greedy(problem, 40).tolist()
+        assert list(result['gains']) == sorted(result['gains'], reverse=True)
+        assert result['covered'] == pytest.approx(result['gains'].sum())
+        if min_score is not None:
+            assert (random_table.columns['score_overall'][result['rows']] >= min_score).all()
+
+    def test_spreads_over_clusters(self):
+        # Two clusters 5 km apart; the three best sites are all in the first
+        lat = [42.26, 42.2601, 42.2602, 42.305, 42.3051]
+        table = make_table(lat, [-71.80] * 5, kwh=[10, 10, 10, 9, 9], scores=[90, 80, 70, 60, 50])
+
+        result = optimize_portfolio(table, 2, radius_km=0.5)
+        assert sorted(result['rows'].tolist()) == [0, 3]
+        assert result['covered'] == result['total'] == 48.0
+
+    def test_stops_when_everything_is_covered(self):
+        table = make_table([42.26, 42.2601, 42.2602], [-71.80] * 3)
+        result = optimize_portfolio(table, 10, radius_km=0.5)
+        assert len(result['rows']) == 1
+        assert result['covered'] == result['total']
+
+    def test_equity_objective(self):
+        table = make_table([42.26, 42.30], [-71.80, -71.80], kwh=[100, 1])
+        table.columns['pop_density_index'][:] = [0.1, 0.9]
+        table.columns['score_equity'][:] = [10.0, 90.0]
+
+        assert optimize_portfolio(table, 1, 0.5, 'demand')['rows'].tolist() == [0]
+        assert optimize_portfolio(table, 1, 0.5, 'equity')['rows'].tolist() == [1]
+
+    def test_problem_cached_per_table(self, random_table):
+        problem = coverage_problem(random_table, 0.5)
+        assert coverage_problem(random_table, 0.5) is problem
+        assert coverage_problem(random_table, 0.6) is not problem
+
+    def test_empty_table(self):
+        result = optimize_portfolio(make_table([], []), 5, 0.5)
+        assert len(result['rows']) == 0
+        assert result['total'] == 0.0
+
+
+class TestOptimizeEndpoint:
+    """Test suite for GET /api/optimize/{city}."""
+
+    def test_portfolio(self, api_db):
+        # The seeded sites lie on a line, ~0.111 km apart
+        data = client.get("/api/optimize/worcester?n=3&radius_km=0.3").json()
+        picks = [feature['properties']['pick'] for feature in data['features']]
+        gains = [feature['properties']['marginal_gain'] for feature in data['features']]
+
+        assert data['count'] == 3
+        assert picks == [1, 2, 3]
+        assert gains == sorted(gains, reverse=True)
+        assert data['total'] == 4000.0
+        assert data['covered'] == pytest.approx(sum(gains))
+        assert 0 < data['coverage'] < 1
+
+    def test_full_coverage(self, api_db):
+        data = client.get("/api/optimize/worcester?n=100&radius_km=5").json()
+        assert data['count'] == 1
+        assert data['coverage'] == 1.0
+
+    def test_unknown_city(self, api_db):
+        assert client.get("/api/optimize/atlantis").status_code == 404
+
+    def test_invalid_objective(self, api_db):
+        assert client.get("/api/optimize/worcester?objective=profit").status_code == 422
@@ -0,0 +1,152 @@
+"""
+Tests for the memory-mapped site snapshots.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models import DatasetVersion
+from app.services.site_snapshot import CURRENT, current_snapshot, open_snapshot, write_snapshot
+from app.services.site_store import SiteStore
+from app.services.site_table import SiteTable
+from tests.conftest import assert_max_queries
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'data'))
+
+
+@pytest.fixture
+def session_factory(api_db):
+    return sessionmaker(bind=api_db)
+
+
+def load_table(session_factory, city='worcester'):
+    with session_factory() as session:
+        return SiteTable.load(session, city)
+
+
+def publish(session_factory, version, city='worcester'):
+    with session_factory() as session:
+        session.query(DatasetVersion).filter(DatasetVersion.city == city).delete()
+        session.add(DatasetVersion(city=city, version=version, site_count=20))
+        session.commit()
+
+
+class TestSnapshotFiles:
+    """Test suite for app/services/site_snapshot.py."""
+
+    def test_round_trip(self, session_factory, tmp_path):
+        table = load_table(session_factory)
+        path = write_snapshot(table, tmp_path)
+        mapped = open_snapshot(path, 'worcester', table.version)
+
+        assert mapped.mapped and not table.mapped
+        assert not mapped.columns['score_overall'].flags.writeable
+        assert mapped.geojson_features(mapped.top(100)) == table.geojson_features(table.top(100))
+        for row in range(len(table)):
+            assert mapped.site_dict(row) == table.site_dict(row)
+        assert mapped.stats == table.stats
+
+    def test_current_pointer_and_pruning(self, session_factory, tmp_path):
+        table = load_table(session_factory)
+        for version in (1, 2, 3):
+            table.version = version
+            write_snapshot(table, tmp_path, keep=2)
+
+        city_dir = tmp_path / 'worcester'
+        assert (city_dir / CURRENT).read_text() == 'v3.arrow'
+        assert sorted(p.name for p in city_dir.glob('v*.arrow')) == ['v2.arrow', 'v3.arrow']
+        assert current_snapshot('worcester', tmp_path) == (3, city_dir / 'v3.arrow')
+        assert current_snapshot('boston', tmp_path) is None
+
+    def test_mapped_table_survives_new_version(self, session_factory, tmp_path):
+        table = load_table(session_factory)
+        table.version = 1
+        old = open_snapshot(write_snapshot(table, tmp_path, keep=1), 'worcester', 1)
+
+        table.version = 2
+        write_snapshot(table, tmp_path, keep=1)
+
+        assert not (tmp_path / 'worcester' / 'v1.arrow').exists()
+        assert old.site_dict(0) == table.site_dict(0)
+
+    def test_empty_city(self, session_factory, tmp_path):
+        table = load_table(session_factory, 'lowell')
+        mapped = open_snapshot(write_snapshot(table, tmp_path), 'lowell', None)
+        assert len(mapped) == 0
+        assert mapped.stats is None
+
+    def test_export_snapshots(self, api_db, tmp_path):
+        from build_scores import export_snapshots
+
+        paths = export_snapshots(api_db, ['worcester'], tmp_path)
+        assert paths == {'worcester': tmp_path / 'worcester' / 'v0.arrow'}
+        assert len(open_snapshot(paths['worcester'], 'worcester', 0)) == 20
+
+    def test_rescoring_publishes_new_version(self, session_factory, tmp_path, monkeypatch):
+        """Running build_scores.py on its own never overwrites a published snapshot."""
+        import build_scores
+
+        monkeypatch.setattr(settings, 'site_snapshot_dir', str(tmp_path))
+        monkeypatch.setattr(build_scores, 'get_session', session_factory)
+        monkeypatch.setattr(sys, 'argv', ['build_scores.py', '--city', 'worcester'])
+        publish(session_factory, 3)
+
+        build_scores.main()
+        assert current_snapshot('worcester') == (4, tmp_path / 'worcester' / 'v4.arrow')
+        build_scores.main()
+        assert current_snapshot('worcester') == (5, tmp_path / 'worcester' / 'v5.arrow')
+
+        with session_factory() as session:
+            assert session.get(DatasetVersion, 'worcester').version == 5
+        assert load_table(session_factory).version == 5
+
+
+class TestStoreSnapshots:
+    """The site store serving mapped snapshots."""
+
+    def test_serves_snapshot_without_queries(self, api_db, session_factory, tmp_path):
+        publish(session_factory, 1)
+        write_snapshot(load_table(session_factory), tmp_path)
+        store = SiteStore(session_factory=session_factory, snapshot_dir=tmp_path)
+
+        with assert_max_queries(api_db, 0):
+            table = store.get('worcester')
+        assert table.mapped
+        assert table.version == 1
+        assert store.status()['worcester']['source'] == 'snapshot'
+
+    def test_skips_outdated_snapshot(self, session_factory, tmp_path, monkeypatch):
+        publish(session_factory, 1)
+        write_snapshot(load_table(session_factory), tmp_path)
+        publish(session_factory, 2)
+
+        store = SiteStore(session_factory=session_factory, snapshot_dir=tmp_path)
+        monkeypatch.setattr(store, 'published_version', lambda city: 2)
+
+        table = store.get('worcester')
+        assert not table.mapped
+        assert table.version == 2
+
+    def test_falls_back_on_unreadable_snapshot(self, session_factory, tmp_path):
+        write_snapshot(load_table(session_factory), tmp_path)
+        (tmp_path / 'worcester' / 'v0.arrow').write_bytes(b'not arrow')
+
+        store = SiteStore(session_factory=session_factory, snapshot_dir=tmp_path)
+        assert store.status() == {}
+        assert len(store.get('worcester')) == 20
+        assert store.status()['worcester']['source'] == 'database'
+
+    def test_switches_to_snapshot_when_written(self, session_factory, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, 'health_check_interval', 0.0)
+        store = SiteStore(session_factory=session_factory, snapshot_dir=tmp_path)
+        table = store.get('worcester')
+        assert not table.mapped
+
+        write_snapshot(table, tmp_path)
+        store._refresh_in_background = lambda city: store.load(city, force=True)
+
+        store.get('worcester')
+        assert store.get('worcester').mapped
@@ -0,0 +1,180 @@
+"""
+Tests for the in-memory columnar site store.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.main import app
+from app.models import DatasetVersion, Site
+from app.services.site_store import SiteStore, site_store
+from app.services.site_table import COLUMNS, SiteTable
+from tests.conftest import assert_max_queries, make_site
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def session_factory(api_db):
+    return sessionmaker(bind=api_db)
+
+
+@pytest.fixture
+def orm_sites(session_factory):
+    """The seeded Worcester sites as ORM objects, best first."""
+    with session_factory() as session:
+        sites = session.query(Site).filter(Site.city == 'worcester').all()
+        session.expunge_all()
+    return sorted(sites, key=lambda site: site.score_overall, reverse=True)
+
+
+def load_table(session_factory, city='worcester'):
+    with session_factory() as session:
+        return SiteTable.load(session, city)
+
+
+class TestSiteTable:
+    """Test suite for app/services/site_table.py."""
+
+    def test_output_matches_orm_serializers(self, session_factory, orm_sites):
+        table = load_table(session_factory)
+
+        assert table.geojson_features(table.top(100)) == [site.to_geojson_feature() for site in orm_sites]
+        for site in orm_sites:
+            assert table.site_dict(table.row(site.id)) == site.to_dict()
+
+    def test_top_with_min_score(self, session_factory):
+        table = load_table(session_factory)
+
+        rows = table.top(100, min_score=50.0)
+        scores = table.columns['score_overall'][rows]
+        assert len(rows) == 10
+        assert (scores >= 50.0).all()
+        assert list(scores) == sorted(scores, reverse=True)
+        assert len(table.top(3, min_score=50.0)) == 3
+        assert len(table.top(100, min_score=99.0)) == 0
+
+    def test_row_lookup(self, session_factory, orm_sites):
+        table = load_table(session_factory)
+        assert table.row(max(site.id for site in orm_sites) + 1) is None
+        assert table.row(-1) is None
+
+    def test_stats_match_python_aggregates(self, session_factory, orm_sites):
+        stats = load_table(session_factory).stats
+        scores = [site.score_overall for site in orm_sites]
+
+        assert stats['score_stats'] == {
+            'min': round(min(scores), 1),
+            'max': round(max(scores), 1),
+            'mean': round(sum(scores) / len(scores), 1),
+        }
+        assert [site['id'] for site in stats['top_sites']] == [site.id for site in orm_sites[:10]]
+
+    def test_from_unsorted_rows(self):
+        rows = [
+            tuple(getattr(make_site('lowell', i, score=float(i)), name) for name in COLUMNS)
+            for i in range(3)
+        ]
+        rows = [(site_id, *row[1:]) for site_id, row in zip([30, 10, 20], rows)]
+        table = SiteTable.from_rows('lowell', 2, rows)
+
+        assert table.ids.tolist() == [10, 20, 30]
+        assert table.row(20) == 1
+        assert table.geojson_features(table.top(1))[0]['properties']['id'] == 20
+
+    def test_empty_city(self, session_factory):
+        table = load_table(session_factory, 'lowell')
+        assert len(table) == 0
+        assert len(table.top(10)) == 0
+        assert table.stats is None
+        assert table.version is None
+
+
+class TestSiteStore:
+    """Test suite for app/services/site_store.py."""
+
+    def test_loads_once(self, session_factory):
+        store = SiteStore(session_factory=session_factory)
+        assert store.get('worcester') is store.get('worcester')
+        assert store.status()['worcester']['sites'] == 20
+
+    def test_find_across_cities(self, session_factory):
+        with session_factory() as session:
+            session.add(make_site('boston', 0))
+            session.commit()
+            boston_id = session.query(Site.id).filter(Site.city == 'boston').scalar()
+
+        store = SiteStore(session_factory=session_factory)
+        table, row = store.find(boston_id)
+        assert table.city == 'boston'
+        assert table.site_dict(row)['id'] == boston_id
+        assert store.find(10_000) is None
+        # Only the site's own city was loaded
+        assert list(store.status()) == ['boston']
+
+    def test_find_searches_loaded_tables_first(self, session_factory, api_db):
+        store = SiteStore(session_factory=session_factory)
+        store.get('worcester')
+
+        with assert_max_queries(api_db, 0):
+            table, row = store.find(5)
+        assert table.site_dict(row)['id'] == 5
+
+    def test_refresh_on_new_version(self, session_factory, monkeypatch):
+        monkeypatch.setattr(settings, 'health_check_interval', 0.0)
+        store = SiteStore(session_factory=session_factory)
+        published = {}
+        monkeypatch.setattr(store, 'published_version', lambda city: published.get(city))
+
+        old = store.get('worcester')
+        assert old.version is None
+
+        with session_factory() as session:
+            session.add(make_site('worcester', 20, score=99.0))
+            session.add(DatasetVersion(city='worcester', version=1, site_count=21))
+            session.commit()
+        published['worcester'] = 1
+
+        # The loaded table keeps serving while the reload runs
+        assert store.get('worcester') is old
+
+        deadline = time.time() + 5
+        while store.get('worcester').version != 1 and time.time() < deadline:
+            time.sleep(0.01)
+
+        new = store.get('worcester')
+        assert new.version == 1
+        assert len(new) == 21
+        assert len(old) == 20
+
+
+class TestStoreEndpoints:
+    """The read endpoints served from the store."""
+
+    def test_sites(self, api_db):
+        data = client.get("/api/sites?city=worcester&limit=5&min_score=45").json()
+        scores = [feature['properties']['score_overall'] for feature in data['features']]
+        assert data['count'] == 5
+        assert scores == sorted(scores, reverse=True)
+        assert min(scores) >= 45
+
+    def test_site_not_found(self, api_db):
+        assert client.get("/api/sites/99999").status_code == 404
+
+    def test_stats(self, api_db):
+        data = client.get("/api/stats/worcester").json()
+        assert data['total_sites'] == 20
+        assert data['score_stats']['max'] == 59.0
+        assert len(data['top_sites']) == 10
+
+    def test_stats_empty_city(self, api_db):
+        data = client.get("/api/stats/lowell").json()
+        assert data == {"city": "lowell", "total_sites": 0, "message": "No sites found for this city"}
+
+    def test_readiness_reports_store(self, api_db):
+        site_store.load('worcester')
+        caches = client.get("/api/health/ready").json()['caches']
+        assert caches['sites']['worcester']['sites'] == 20
@@ -0,0 +1,257 @@
+"""
+Tests for content-hashed stage caching and the pipeline plan / dry run.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import pipeline  # noqa: E402
+from stage_cache import (  # noqa: E402
+    Stage, StageCache, explain_changes, fingerprint_key, stage_fingerprint,
+)
+
+CITY = {'slug': 'testville', 'name': 'Testville', 'bbox': [-71.9, 42.2, -71.7, 42.3]}
+
+
+class ToyPipeline:
+    """
+    Four stages over files in a temporary directory:
+    source (raw file) → left (code file), right → join (params).
+    """
+
+    def __init__(self, root):
+        self.raw = root / 'raw.csv'
+        self.code = root / 'left.py'
+        self.raw.write_text("x\n1\n2\n")
+        self.code.write_text("FACTOR = 2\n")
+        self.params = {'weight': 0.5}
+        self.calls = []
+
+        def source(_, city):
+            self.calls.append('source')
+            return pd.read_csv(self.raw)
+
+        def left(df, city):
+            self.calls.append('left')
+            df['left'] = df['x'] * 2
+            return df
+
+        def right(df, city):
+            self.calls.append('right')
+            df['right'] = df['x'] + 1
+            return df
+
+        def join(df, city):
+            self.calls.append('join')
+            df['total'] = df['left'] + self.params['weight'] * df['right']
+            return df
+
+        self.stages = [
+            Stage(name='source', func=source, raw_inputs=lambda city: [self.raw]),
+            Stage(name='left', func=left, upstream=['source'], outputs=['left'], code=[self.code]),
+            Stage(name='right', func=right, upstream=['source'], outputs=['right']),
+            Stage(name='join', func=join, upstream=['left', 'right'], outputs=['total'],
+                  params=lambda: dict(self.params)),
+        ]
+
+
+@pytest.fixture
+def toy(tmp_path, monkeypatch):
+    toy = ToyPipeline(tmp_path)
+    monkeypatch.setattr(pipeline, 'STAGES', toy.stages)
+    monkeypatch.setattr(pipeline, 'STAGES_BY_NAME', {stage.name: stage for stage in toy.stages})
+    toy.cache = StageCache(CITY['slug'], cache_dir=tmp_path / 'cache')
+    return toy
+
+
+def keys(toy):
+    """Cache key of every toy stage for the current inputs."""
+    return {stage.name: key for stage, key, _, _ in pipeline.plan_pipeline(CITY, toy.cache)}
+
+
+def rerun(toy):
+    """Names of the stages the plan would rerun."""
+    return [stage.name for stage, _, _, reasons in pipeline.plan_pipeline(CITY, toy.cache) if reasons]
+
+
+class TestStageFingerprint:
+    """Test suite for stage_fingerprint and fingerprint_key in data/stage_cache.py."""
+
+    def test_stable_without_changes(self, toy):
+        first = keys(toy)
+        toy.raw.touch()
+        assert keys(toy) == first
+
+    @pytest.mark.parametrize("change,changed", [
+        ('raw', {'source', 'left', 'right', 'join'}),
+        ('code', {'left', 'join'}),
+        ('params', {'join'}),
+    ])
+    def test_inputs_change_keys(self, toy, change, changed):
+        before = keys(toy)
+        if change == 'raw':
+            toy.raw.write_text("x\n1\n3\n")
+        elif change == 'code':
+            toy.code.write_text("FACTOR = 3\n")
+        else:
+            toy.params['weight'] = 0.75
+        after = keys(toy)
+
+        assert {name for name in before if before[name] != after[name]} == changed
+
+    def test_missing_raw_file_is_an_input(self, toy):
+        fingerprint = stage_fingerprint(toy.stages[0], {}, CITY)
+        toy.raw.unlink()
+        missing = stage_fingerprint(toy.stages[0], {}, CITY)
+
+        assert missing['raw'] == {'raw.csv': 'missing'}
+        assert fingerprint_key(missing) != fingerprint_key(fingerprint)
+
+    def test_city_is_an_input(self, toy):
+        fingerprint = stage_fingerprint(toy.stages[0], {}, CITY)
+        other = stage_fingerprint(toy.stages[0], {}, {**CITY, 'bbox': [-71.8, 42.2, -71.7, 42.3]})
+        assert fingerprint_key(other) != fingerprint_key(fingerprint)
+
+
+class TestExplainChanges:
+    """Test suite for explain_changes in data/stage_cache.py."""
+
+    def base(self):
+        return {
+            'city': CITY,
+            'raw': {'raw.csv': 'aaa', 'extra.csv': 'missing'},
+            'upstream': {'source': 'k1'},
+            'code': {'left.py': 'c1'},
+            'params': {'weight': 0.5, 'bias': 1},
+        }
+
+    def test_never_run(self):
+        assert explain_changes(None, self.base()) == ["never run before"]
+
+    def test_unchanged(self):
+        assert explain_changes(self.base(), self.base()) == []
+
+    def test_reasons(self):
+        current = self.base()
+        current['city'] = {**CITY, 'name': 'Other'}
+        current['raw'] = {'raw.csv': 'missing', 'extra.csv': 'bbb'}
+        current['upstream'] = {'source': 'k2'}
+        current['code'] = {'left.py': 'c2', 'helpers.py': 'h1'}
+        current['params'] = {'weight': 0.75, 'bias': 1}
+
+        assert explain_changes(self.base(), current) == [
+            "city registry entry changed",
+            "raw file extra.csv added",
+            "raw file raw.csv removed",
+            "upstream stage source changed",
+            "code helpers.py added",
+            "code left.py changed",
+            "parameters changed: weight",
+        ]
+
+
+class TestPipelineCache:
+    """Test suite for StageCache and plan_pipeline / run_pipeline caching."""
+
+    def test_unchanged_rerun_hits_cache(self, toy):
+        first, _ = pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        assert toy.calls == ['source', 'left', 'right', 'join']
+
+        toy.calls.clear()
+        second, profiles = pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        assert toy.calls == []
+        assert all(profile['cached'] for profile in profiles)
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_change_reruns_stage_and_downstream(self, toy):
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        toy.calls.clear()
+
+        toy.code.write_text("FACTOR = 3\n")
+        plan = pipeline.plan_pipeline(CITY, toy.cache)
+        reasons = {stage.name: reasons for stage, _, _, reasons in plan}
+        assert reasons['left'] == ["code left.py changed"]
+        assert reasons['join'] == ["upstream stage left changed"]
+        assert reasons['source'] == reasons['right'] == []
+
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        assert toy.calls == ['left', 'join']
+        assert rerun(toy) == []
+
+    def test_raw_change_invalidates_everything(self, toy):
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        toy.raw.write_text("x\n5\n")
+        assert rerun(toy) == ['source', 'left', 'right', 'join']
+
+        df, _ = pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        assert df['total'].tolist() == [10 + 0.5 * 6]
+
+    def test_force_and_stop_after(self, toy):
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        plan = pipeline.plan_pipeline(CITY, toy.cache, stop_after='left', force=True)
+        assert [(stage.name, reasons) for stage, _, _, reasons in plan] == [
+            ('source', ["forced"]), ('left', ["forced"]),
+        ]
+
+    def test_old_outputs_are_dropped(self, toy):
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        toy.params['weight'] = 1.0
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+
+        assert len(list(toy.cache.cache_dir.glob('join-*.parquet'))) == 1
+        assert toy.cache.last_fingerprint('join')['params'] == {'weight': 1.0}
+
+    def test_dry_run_writes_nothing(self, toy, tmp_path, monkeypatch, capsys):
+        pipeline.run_pipeline(CITY, write=None, cache=toy.cache)
+        toy.raw.write_text("x\n7\n")
+        before = sorted(path.stat().st_mtime_ns for path in toy.cache.cache_dir.iterdir())
+
+        def fail(*args, **kwargs):
+            raise AssertionError("dry run touched the database or profiles")
+
+        monkeypatch.setattr(pipeline, 'resolve_city', lambda slug: CITY)
+        monkeypatch.setattr(pipeline, 'StageCache', lambda slug: toy.cache)
+        monkeypatch.setattr(pipeline, 'get_engine', fail)
+        monkeypatch.setattr(pipeline, 'write_report', fail)
+        monkeypatch.setattr(sys, 'argv', ['pipeline.py', '--city', 'testville', '--dry-run'])
+        toy.calls.clear()
+        pipeline.main()
+
+        assert toy.calls == []
+        assert sorted(path.stat().st_mtime_ns for path in toy.cache.cache_dir.iterdir()) == before
+        assert "source         rerun  (raw file raw.csv changed)" in capsys.readouterr().out
+
+
+def local_imports(path):
+    """data/ modules a script imports, directly or through other data/ modules."""
+    import ast
+
+    seen, todo = {path}, [path]
+    while todo:
+        tree = ast.parse(todo.pop().read_text())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = pipeline.DATA_DIR / f"{name.split('.')[0]}.py"
+                if module.exists() and module not in seen:
+                    seen.add(module)
+                    todo.append(module)
+    return seen
+
+
+class TestStageCode:
+    """Test suite for the code fingerprints of the pipeline STAGES."""
+
+    @pytest.mark.parametrize("stage", pipeline.STAGES, ids=lambda stage: stage.name)
+    def test_code_covers_local_imports(self, stage):
+        script = pipeline.DATA_DIR / f"{stage.func.__module__}.py"
+        assert local_imports(script) <= set(stage.code)
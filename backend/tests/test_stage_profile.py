@@ -0,0 +1,82 @@
+"""
+Tests for pipeline stage profiling and report comparison.
+"""
+import json
+import os
+import sys
+
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+from stage_profile import (  # noqa: E402
+    build_report, compare_reports, load_report, profile_stage, write_report
+)
+from app.database import instrument_engine  # noqa: E402
+
+
+def stage(name, city='worcester', cached=False, **metrics):
+    profile = {
+        'stage': name, 'city': city, 'cached': cached, 'rows': 1000,
+        'wall_s': 1.0, 'cpu_s': 1.0, 'rows_per_sec': 1000.0,
+        'peak_rss_mb': 100.0, 'db_s': 0.1, 'db_queries': 10,
+    }
+    profile.update(metrics)
+    return profile
+
+
+class TestStageProfile:
+    """Test suite for stage_profile.py."""
+
+    def test_profile_records_metrics(self, tmp_path):
+        engine = instrument_engine(create_engine(f"sqlite:///{tmp_path / 'p.db'}"))
+
+        with profile_stage('traffic', city='worcester') as profile:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+            sum(range(100_000))
+            profile['rows'] = 500
+
+        assert profile['stage'] == 'traffic'
+        assert profile['rows'] == 500
+        assert profile['wall_s'] > 0
+        assert profile['cpu_s'] >= 0
+        assert profile['rows_per_sec'] > 0
+        assert profile['peak_rss_mb'] > 0
+        assert profile['db_queries'] == 2
+        assert profile['db_s'] >= 0
+
+    def test_report_roundtrip(self, tmp_path):
+        report = build_report('pipeline', [stage('parcels')], cities=['worcester'])
+        path = write_report(report, profile_dir=tmp_path)
+
+        assert path.suffix == '.json'
+        assert load_report(path) == json.loads(json.dumps(report))
+
+    def test_compare_flags_regressions(self):
+        before = build_report('pipeline', [stage('parcels'), stage('traffic')])
+        after = build_report('pipeline', [
+            stage('parcels', wall_s=1.1),
+            stage('traffic', wall_s=2.0, rows_per_sec=500.0),
+        ])
+
+        rows = compare_reports(before, after, threshold=0.2)
+        flagged = {(row['stage'], row['metric']) for row in rows if row['regression']}
+
+        assert flagged == {('traffic', 'wall_s'), ('traffic', 'rows_per_sec')}
+
+    def test_faster_throughput_is_not_a_regression(self):
+        before = build_report('pipeline', [stage('scores')])
+        after = build_report('pipeline', [stage('scores', rows_per_sec=5000.0, wall_s=0.2)])
+
+        assert not any(row['regression'] for row in compare_reports(before, after))
+
+    def test_cached_and_unmatched_stages_skipped(self):
+        before = build_report('pipeline', [stage('parcels'), stage('traffic', city='boston')])
+        after = build_report('pipeline', [
+            stage('parcels', cached=True, wall_s=0.01),
+            stage('traffic', city='lowell', wall_s=9.0),
+        ])
+
+        assert compare_reports(before, after) == []
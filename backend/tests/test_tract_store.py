@@ -0,0 +1,112 @@
+"""
+Tests for the filtered census tract extraction.
+"""
+import os
+import sys
+import zipfile
+
+import pytest
+import shapely
+from shapely.geometry import Polygon, mapping, shape
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+import tract_store  # noqa: E402
+from tract_store import extract_tracts, load_tracts, tract_cache_path  # noqa: E402
+
+
+def wavy_square(x0, y0, size=0.01, points=200):
+    """Square whose bottom edge has many tiny wiggles to simplify away."""
+    xs = [x0 + size * i / points for i in range(points + 1)]
+    bottom = [(x, y0 + (1e-6 if i % 2 else 0.0)) for i, x in enumerate(xs)]
+    return Polygon(bottom + [(x0 + size, y0 + size), (x0, y0 + size)])
+
+
+@pytest.fixture
+def tracts_zip(tmp_path):
+    """Statewide-style tract zip with two counties."""
+    import fiona
+
+    schema = {
+        'geometry': 'Polygon',
+        'properties': {'GEOID': 'str', 'COUNTYFP': 'str', 'ALAND': 'int'},
+    }
+    shp_dir = tmp_path / 'shp'
+    shp_dir.mkdir()
+    with fiona.open(shp_dir / 'tl_tract.shp', 'w', driver='ESRI Shapefile',
+                    schema=schema, crs='EPSG:4269') as sink:
+        for i, county in enumerate(['027', '027', '017']):
+            sink.write({
+                'geometry': mapping(wavy_square(-71.8 + i * 0.01, 42.26)),
+                'properties': {'GEOID': f"25{county}00{i}", 'COUNTYFP': county, 'ALAND': 1000 + i},
+            })
+
+    zip_path = tmp_path / 'census_tracts.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for path in shp_dir.iterdir():
+            zf.write(path, path.name)
+    return zip_path
+
+
+class TestTractStore:
+    """Test suite for tract_store.py."""
+
+    def test_extract_filters_county(self, tracts_zip):
+        """Only the requested county's tracts are kept, in EPSG:4326."""
+        gdf = extract_tracts(['027'], 0, zip_path=tracts_zip)
+
+        assert list(gdf['GEOID']) == ['25027000', '25027001']
+        assert set(gdf.columns) == {'GEOID', 'COUNTYFP', 'ALAND', 'geometry'}
+        assert gdf.crs.to_epsg() == 4326
+
+    def test_other_counties_are_not_parsed(self, tracts_zip, monkeypatch):
+        """Geometry is only built for the requested county's features."""
+        parsed = []
+
+        def counting_shape(geometry):
+            parsed.append(geometry)
+            return shape(geometry)
+
+        monkeypatch.setattr(tract_store, 'shape', counting_shape)
+        assert len(extract_tracts(['017'], 0, zip_path=tracts_zip)) == 1
+        assert len(parsed) == 1
+        assert len(extract_tracts([], 0, zip_path=tracts_zip)) == 0
+
+    def test_simplify_drops_vertices(self, tracts_zip):
+        """A tolerance removes the tiny wiggles but keeps the area."""
+        full = extract_tracts(['027'], 0, zip_path=tracts_zip)
+        simple = extract_tracts(['027'], 0.0001, zip_path=tracts_zip)
+
+        full_vertices = shapely.get_num_coordinates(full.geometry.to_numpy())
+        simple_vertices = shapely.get_num_coordinates(simple.geometry.to_numpy())
+        assert (simple_vertices < full_vertices).all()
+        assert shapely.area(simple.geometry.to_numpy()) == pytest.approx(
+            shapely.area(full.geometry.to_numpy()), rel=1e-3
+        )
+
+    def test_load_caches_geoparquet(self, tracts_zip, tmp_path, monkeypatch):
+        """The second load reads the GeoParquet extract, not the zip."""
+        cache_dir = tmp_path / 'cache'
+        first = load_tracts('017', tolerance=0.0001, zip_path=tracts_zip, cache_dir=cache_dir)
+        assert tract_cache_path(['017'], 0.0001, zip_path=tracts_zip, cache_dir=cache_dir).exists()
+
+        import tract_store
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cache miss")
+
+        monkeypatch.setattr(tract_store, 'extract_tracts', fail)
+        second = load_tracts('017', tolerance=0.0001, zip_path=tracts_zip, cache_dir=cache_dir)
+
+        assert list(second['GEOID']) == list(first['GEOID'])
+        assert second.geometry.geom_equals(first.geometry).all()
+
+    def test_cache_key_tracks_tolerance(self, tracts_zip, tmp_path):
+        """A different tolerance gets its own extract."""
+        assert (
+            tract_cache_path(['027'], 0.0001, zip_path=tracts_zip, cache_dir=tmp_path)
+            != tract_cache_path(['027'], 0.001, zip_path=tracts_zip, cache_dir=tmp_path)
+        )
+
+    def test_missing_zip(self, tmp_path):
+        assert load_tracts('027', zip_path=tmp_path / 'missing.zip', cache_dir=tmp_path) is None
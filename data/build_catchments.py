@@ -0,0 +1,383 @@
+"""
+Catchment features: people, renters and POIs around each site.
+
+The demographics stage describes only the spot a site stands on. This
+stage rasterizes population, renters and POIs onto a fine grid
+(CELL_KM cells) over the city and builds a summed-area table (integral
+image) of each layer, so the total inside any axis-aligned box takes
+four lookups. For every site and catchment radius (CATCHMENT_RADII in
+app/models/site.py) it stores the total inside the square of that
+half-width centred on the site; a ring is the difference of two squares.
+
+Layers:
+- population: Census tract density (people per km² of land) over the
+  cells whose centre lies in the tract; without Census tracts, the
+  nearest site's pop_density_index × SYNTHETIC_PEAK_DENSITY
+- renters: population × the tract's (or nearest site's) renters_share
+- pois: OpenStreetMap POIs counted per cell; without POI data, the
+  nearest site's poi_index × SYNTHETIC_PEAK_POIS
+
+catchment_index (0-1) averages the percentile ranks of the site's
+distance-weighted population and POI access (RING_WEIGHTS over the
+rings). ScoringService blends it into the demand score.
+
+Usage:
+    python build_catchments.py --city worcester
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import numpy as np
+import pandas as pd
+import shapely
+from scipy.spatial import cKDTree
+import ingest_demographics
+from app.models.site import CATCHMENT_LAYERS, CATCHMENT_RADII, CATCHMENT_TOTALS
+from app.geo import KM_PER_DEGREE_LAT, KM_PER_DEGREE_LNG, project_km
+from site_frame import DEFAULT_CITY, get_session, load_sites_frame, resolve_city, update_sites_frame
+
+
+# Grid cell size (km)
+CELL_KM = 0.1
+
+# Columns written by this stage
+CATCHMENT_COLUMNS = CATCHMENT_TOTALS + ['catchment_index']
+
+# Weight of the people / POIs in each ring, innermost first
+RING_WEIGHTS = (1.0, 0.5, 0.25)
+
+# Synthetic layers: density at index 1.0, and how far from the nearest
+# site a cell still takes its features
+SYNTHETIC_PEAK_DENSITY = 8000.0  # people per km²
+SYNTHETIC_PEAK_POIS = 150.0      # POIs per km²
+SYNTHETIC_REACH_KM = 0.75
+
+
+def raw_inputs(city):
+    """Raw files this stage reads (used for pipeline caching)."""
+    return ingest_demographics.raw_inputs(city)
+
+
+def summed_area_table(grid):
+    """
+    Summed-area table of a 2-D grid with a leading row and column of zeros.
+
+    table[r, c] is the sum of grid[:r, :c], so any box sum takes four
+    lookups (see box_sums).
+    """
+    table = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1))
+    np.cumsum(np.cumsum(grid, axis=0), axis=1, out=table[1:, 1:])
+    return table
+
+
+def box_sums(table, row0, col0, row1, col1):
+    """
+    Sums of grid[row0:row1, col0:col1] for arrays of boxes.
+
+    Boxes are clipped to the grid, so cells past the edge count as 0.
+    """
+    rows, cols = table.shape[0] - 1, table.shape[1] - 1
+    row0, row1 = np.clip(row0, 0, rows), np.clip(row1, 0, rows)
+    col0, col1 = np.clip(col0, 0, cols), np.clip(col1, 0, cols)
+    return table[row1, col1] - table[row0, col1] - table[row1, col0] + table[row0, col0]
+
+
+def square_sums(table, rows, cols, half_cells):
+    """Sums over the (2 half_cells + 1)² cells centred on each (row, col)."""
+    return box_sums(
+        table, rows - half_cells, cols - half_cells, rows + half_cells + 1, cols + half_cells + 1
+    )
+
+
+class CatchmentGrid:
+    """
+    Square cells over a city in a local projection (km east / north).
+
+    Attributes:
+        origin: (lat, lng) of the projection origin
+        x0, y0: Projected km of the grid's south-west corner
+        shape: (rows, columns); row 0 is the southern edge
+        cell_km: Cell size
+    """
+
+    def __init__(self, origin, x0, y0, shape, cell_km=CELL_KM):
+        self.origin = origin
+        self.x0 = x0
+        self.y0 = y0
+        self.shape = shape
+        self.cell_km = cell_km
+
+    @classmethod
+    def around(cls, lat, lng, bbox, margin_km, cell_km=CELL_KM):
+        """
+        Grid covering the sites and the city's bbox, plus a margin.
+
+        Args:
+            lat, lng: Site coordinates
+            bbox: City bbox [west, south, east, north]
+            margin_km: Extra km on every side (the largest catchment radius)
+            cell_km: Cell size
+        """
+        west, south, east, north = bbox
+        origin = ((south + north) / 2, (west + east) / 2)
+        points = project_km(
+            np.concatenate([lat, [south, north]]), np.concatenate([lng, [west, east]]), *origin
+        )
+        x0, y0 = points.min(axis=0) - margin_km
+        x1, y1 = points.max(axis=0) + margin_km
+        shape = (int(np.ceil((y1 - y0) / cell_km)), int(np.ceil((x1 - x0) / cell_km)))
+        return cls(origin, float(x0), float(y0), shape, cell_km)
+
+    @property
+    def cell_km2(self):
+        return self.cell_km ** 2
+
+    def cells(self, lat, lng):
+        """(row, column) of the cell containing each point (may lie off the grid)."""
+        points = project_km(lat, lng, *self.origin)
+        cols = np.floor((points[:, 0] - self.x0) / self.cell_km).astype(np.int64)
+        rows = np.floor((points[:, 1] - self.y0) / self.cell_km).astype(np.int64)
+        return rows, cols
+
+    def centres(self):
+        """(lat, lng) of every cell centre, in row-major order."""
+        rows, cols = np.indices(self.shape)
+        x = self.x0 + (cols.ravel() + 0.5) * self.cell_km
+        y = self.y0 + (rows.ravel() + 0.5) * self.cell_km
+        lat = self.origin[0] + y / KM_PER_DEGREE_LAT
+        lng = self.origin[1] + x / (KM_PER_DEGREE_LNG * np.cos(np.radians(self.origin[0])))
+        return lat, lng
+
+    def rasterize(self, lat, lng, weights=None):
+        """Number (or summed weights) of the points in each cell; points off the grid are dropped."""
+        rows, cols = self.cells(lat, lng)
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)[inside]
+        counts = np.bincount(
+            rows[inside] * self.shape[1] + cols[inside],
+            weights=weights,
+            minlength=self.shape[0] * self.shape[1],
+        )
+        return counts.reshape(self.shape).astype(np.float64)
+
+
+def tract_cell_values(grid, census_df, tracts_gdf):
+    """
+    People and renter share of each cell from the tract containing its centre.
+
+    Args:
+        grid: CatchmentGrid
+        census_df: DataFrame from the Census ACS API (state, county, tract, ...)
+        tracts_gdf: GeoDataFrame with tract polygons (GEOID, ALAND, geometry)
+
+    Returns:
+        (population, renters_share) grids; cells outside every tract are 0
+    """
+    census = census_df.copy()
+    census['GEOID'] = ingest_demographics.census_geoids(census)
+    tracts = tracts_gdf[['GEOID', 'ALAND']].merge(
+        census[['GEOID', 'total_population', 'renters_share']], on='GEOID', how='left'
+    )
+
+    # People per km² of land (ACS sentinels and water-only tracts → 0)
+    land_km2 = tracts['ALAND'].where(tracts['ALAND'] > 0) / 1e6
+    population = tracts['total_population'].where(tracts['total_population'] >= 0)
+    density = (population / land_km2).fillna(0.0).to_numpy()
+    renters_share = tracts['renters_share'].clip(0, 1).fillna(0.0).to_numpy()
+
+    lat, lng = grid.centres()
+    tree = shapely.STRtree(tracts_gdf.geometry.to_numpy())
+    cell_idx, tract_idx = tree.query(shapely.points(lng, lat), predicate='intersects')
+    # Centres on a shared boundary match two tracts - keep the first
+    cell_idx, first = np.unique(cell_idx, return_index=True)
+    tract_idx = tract_idx[first]
+
+    cell_population = np.zeros(len(lat))
+    cell_renters_share = np.zeros(len(lat))
+    cell_population[cell_idx] = density[tract_idx] * grid.cell_km2
+    cell_renters_share[cell_idx] = renters_share[tract_idx]
+    return cell_population.reshape(grid.shape), cell_renters_share.reshape(grid.shape)
+
+
+def nearest_site_values(grid, sites_df, columns):
+    """
+    Features of the nearest site at each cell centre.
+
+    Cells farther than SYNTHETIC_REACH_KM from every site get 0.
+
+    Returns:
+        Dict of column → grid
+    """
+    lat, lng = grid.centres()
+    tree = cKDTree(project_km(sites_df['lat'].to_numpy(), sites_df['lng'].to_numpy(), *grid.origin))
+    distances, nearest = tree.query(
+        project_km(lat, lng, *grid.origin), distance_upper_bound=SYNTHETIC_REACH_KM
+    )
+    found = np.isfinite(distances)
+
+    values = {}
+    for name in columns:
+        column = np.zeros(len(lat))
+        column[found] = sites_df[name].to_numpy(dtype=np.float64)[nearest[found]]
+        values[name] = column.reshape(grid.shape)
+    return values
+
+
+def catchment_layers(grid, sites_df, census_df=None, tracts_gdf=None, pois_df=None):
+    """
+    Rasterize people, renters and POIs onto the grid.
+
+    Layers without real data are spread from the nearest site's
+    features (see module docstring).
+
+    Args:
+        grid: CatchmentGrid
+        sites_df: DataFrame with site locations and demographic features
+        census_df, tracts_gdf: Census data and tract polygons, or None
+        pois_df: OpenStreetMap POIs (lat, lon), or None
+
+    Returns:
+        Dict of CATCHMENT_LAYERS name → grid of counts per cell
+    """
+    nearest = None
+    if tracts_gdf is None or census_df is None or pois_df is None:
+        nearest = nearest_site_values(grid, sites_df, ['pop_density_index', 'renters_share', 'poi_index'])
+
+    if tracts_gdf is not None and census_df is not None:
+        print("  ✓ Population from census tract densities")
+        population, renters_share = tract_cell_values(grid, census_df, tracts_gdf)
+    else:
+        print("  ℹ No census tracts, spreading site population indexes")
+        population = nearest['pop_density_index'] * SYNTHETIC_PEAK_DENSITY * grid.cell_km2
+        renters_share = nearest['renters_share']
+
+    if pois_df is not None:
+        print(f"  ✓ Counting {len(pois_df)} OpenStreetMap POIs")
+        pois = grid.rasterize(pois_df['lat'].to_numpy(), pois_df['lon'].to_numpy())
+    else:
+        print("  ℹ No POI data, spreading site POI indexes")
+        pois = nearest['poi_index'] * SYNTHETIC_PEAK_POIS * grid.cell_km2
+
+    return {'population': population, 'renters': population * renters_share, 'pois': pois}
+
+
+def access_rank(values):
+    """Percentile rank of each site's access within the city (0 without access)."""
+    ranks = pd.Series(values).rank(pct=True).to_numpy()
+    return np.where(values > 0, ranks, 0.0)
+
+
+def compute_catchments(sites_df, grid, layers):
+    """
+    Catchment totals and index of every site, O(1) per site and radius.
+
+    Args:
+        sites_df: DataFrame with site locations (lat, lng)
+        grid: CatchmentGrid the layers were rasterized on
+        layers: Result of catchment_layers
+
+    Returns:
+        DataFrame of CATCHMENT_COLUMNS aligned with sites_df
+    """
+    rows, cols = grid.cells(sites_df['lat'].to_numpy(), sites_df['lng'].to_numpy())
+    totals = {}
+    access = {}
+
+    for layer in CATCHMENT_LAYERS:
+        table = summed_area_table(layers[layer])
+        inner = np.zeros(len(rows))
+        access[layer] = np.zeros(len(rows))
+        for (radius, km), weight in zip(CATCHMENT_RADII.items(), RING_WEIGHTS):
+            # Float cancellation in the table can leave tiny negatives
+            square = np.maximum(square_sums(table, rows, cols, int(round(km / grid.cell_km))), 0.0)
+            totals[f'catchment_{layer}_{radius}'] = square
+            access[layer] += weight * np.maximum(square - inner, 0.0)
+            inner = square
+
+    catchments = pd.DataFrame(totals, index=sites_df.index)[CATCHMENT_TOTALS].round(1)
+    catchments['catchment_index'] = (
+        0.5 * access_rank(access['population']) + 0.5 * access_rank(access['pois'])
+    ).round(3)
+    return catchments
+
+
+def add_catchment_features(sites_df, city=None):
+    """
+    Add catchment totals and index to a site frame.
+    Uses real Census tracts and OSM POIs if available.
+
+    Args:
+        sites_df: DataFrame with site locations and demographic features
+            (pop_density_index, renters_share, poi_index)
+        city: City registry record (defaults to Worcester)
+
+    Returns:
+        The same DataFrame with CATCHMENT_COLUMNS filled in
+    """
+    city = city or resolve_city(DEFAULT_CITY)
+    if len(sites_df) == 0:
+        for name in CATCHMENT_COLUMNS:
+            sites_df[name] = 0.0
+        return sites_df
+
+    print("Checking for real data sources...")
+    census_df = ingest_demographics.load_real_census_data(city)
+    pois_df = ingest_demographics.load_real_poi_data(city)
+    tracts_gdf = (
+        ingest_demographics.load_tract_boundaries(city['county_fips'])
+        if census_df is not None else None
+    )
+
+    grid = CatchmentGrid.around(
+        sites_df['lat'].to_numpy(), sites_df['lng'].to_numpy(), city['bbox'],
+        margin_km=max(CATCHMENT_RADII.values()),
+    )
+    print(f"Rasterizing onto {grid.shape[0]}×{grid.shape[1]} cells of {grid.cell_km * 1000:.0f} m...")
+    layers = catchment_layers(grid, sites_df, census_df, tracts_gdf, pois_df)
+
+    catchments = compute_catchments(sites_df, grid, layers)
+    for name in CATCHMENT_COLUMNS:
+        sites_df[name] = catchments[name].to_numpy()
+
+    print(
+        f"  ✓ Median 1 km catchment: {sites_df['catchment_population_1km'].median():,.0f} people, "
+        f"{sites_df['catchment_pois_1km'].median():,.0f} POIs"
+    )
+    return sites_df
+
+
+def main():
+    """
+    Compute catchment features for all sites in the database.
+    """
+    parser = argparse.ArgumentParser(description="Add catchment features for a city")
+    parser.add_argument('--city', default=DEFAULT_CITY, help="City slug from the registry")
+    city = resolve_city(parser.parse_args().city)
+
+    print(f"🗺  Building catchments for {city['name']} sites...")
+
+    # Adds the catchment columns to a database created before them
+    session = get_session(create_tables=True)
+    sites_df = load_sites_frame(session, city=city['slug'])
+    print(f"Processing {len(sites_df)} sites...")
+
+    if len(sites_df) == 0:
+        print("⚠️  No sites found. Run ingest_parcels.py first.")
+        return
+
+    sites_df = add_catchment_features(sites_df, city)
+
+    print("Saving to database...")
+    update_sites_frame(session, sites_df, CATCHMENT_COLUMNS, city=city['slug'])
+
+    print(f"✓ Updated {len(sites_df)} sites with catchment features")
+    print("✓ Catchment build complete")
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
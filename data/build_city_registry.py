@@ -0,0 +1,156 @@
+"""
+Generate the city registry from TIGER/Line municipal boundaries.
+
+Massachusetts' 351 cities and towns are the county subdivisions of the
+Census TIGER/Line `COUSUB` layer. This script reads the statewide
+shapefile (`raw/county_subdivisions.zip`) straight out of the zip and
+writes one registry record per municipality: slug, name, county FIPS,
+the boundary's bbox and the Census internal point as center.
+
+Records already in the registry are merged, not replaced: their extra
+fields (traffic corridors) are kept and they stay first, in their
+current order, so the default city does not change. The result is
+validated with the same rules the API applies on import.
+
+Usage:
+    python build_city_registry.py --download   # fetch the zip, then build
+    python build_city_registry.py              # rebuild from raw/
+    python build_city_registry.py --output /tmp/cities.json
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+from shapely.geometry import shape
+
+from app.cities import DEFAULT_REGISTRY_PATH, validate_city
+
+
+COUSUB_URL = "https://www2.census.gov/geo/tiger/TIGER2021/COUSUB/tl_2021_25_cousub.zip"
+COUSUB_ZIP = Path(__file__).parent / "raw" / "county_subdivisions.zip"
+
+# COUSUBFP of the "County subdivisions not defined" water-only features
+UNDEFINED_COUSUB = '00000'
+
+
+def city_slug(name):
+    """Registry slug for a municipality name ("Manchester-by-the-Sea" → "manchester-by-the-sea")."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def read_municipalities(zip_path=COUSUB_ZIP, state='MA'):
+    """
+    One registry record per county subdivision in the TIGER zip.
+
+    Boundaries are in NAD83, which is within a metre of WGS84 here, so
+    coordinates are used as they are. A name that occurs in two
+    counties gets the county FIPS appended to its slug.
+
+    Args:
+        zip_path: TIGER/Line county subdivision zip
+        state: State abbreviation stored in each record
+
+    Returns:
+        List of city records sorted by name
+    """
+    import fiona
+
+    cities = []
+    with fiona.open(f"zip://{Path(zip_path).resolve()}") as source:
+        for feature in source:
+            properties = feature['properties']
+            if properties['COUSUBFP'] == UNDEFINED_COUSUB:
+                continue
+            west, south, east, north = shape(feature['geometry']).bounds
+            cities.append({
+                'slug': city_slug(properties['NAME']),
+                'name': properties['NAME'],
+                'state': state,
+                'county_fips': properties['COUNTYFP'],
+                'bbox': [round(west, 4), round(south, 4), round(east, 4), round(north, 4)],
+                'center': [round(float(properties['INTPTLAT']), 4), round(float(properties['INTPTLON']), 4)],
+            })
+
+    counts = {}
+    for city in cities:
+        counts[city['slug']] = counts.get(city['slug'], 0) + 1
+    for city in cities:
+        if counts[city['slug']] > 1:
+            city['slug'] = f"{city['slug']}-{city['county_fips']}"
+
+    return sorted(cities, key=lambda city: city['name'])
+
+
+def merge_registry(existing, generated):
+    """
+    Merge generated records into an existing registry list.
+
+    Existing cities keep their position and any fields the boundaries
+    do not provide; their bbox and center are refreshed.
+
+    Returns:
+        Merged list of city records
+    """
+    by_slug = {city['slug']: city for city in generated}
+    merged = [{**city, **by_slug.get(city['slug'], {})} for city in existing]
+    known = {city['slug'] for city in existing}
+    merged.extend(city for city in generated if city['slug'] not in known)
+    return merged
+
+
+def build_registry(zip_path=COUSUB_ZIP, registry_path=DEFAULT_REGISTRY_PATH, output_path=None):
+    """
+    Regenerate a registry file from the boundary zip.
+
+    Args:
+        zip_path: TIGER/Line county subdivision zip
+        registry_path: Registry to merge into
+        output_path: Where to write (defaults to registry_path)
+
+    Returns:
+        Number of cities written
+    """
+    with open(registry_path) as f:
+        data = json.load(f)
+
+    data['cities'] = merge_registry(data['cities'], read_municipalities(zip_path))
+    for city in data['cities']:
+        validate_city(city)
+
+    output_path = Path(output_path or registry_path)
+    tmp_path = output_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    tmp_path.replace(output_path)
+    return len(data['cities'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the city registry from municipal boundaries")
+    parser.add_argument('--download', action='store_true', help="Download the TIGER zip first")
+    parser.add_argument('--zip', type=Path, default=COUSUB_ZIP, help="TIGER/Line county subdivision zip")
+    parser.add_argument('--output', type=Path, default=None, help="Output file (default: update the registry)")
+    args = parser.parse_args()
+
+    if args.download:
+        from fetch_engine import FetchEngine
+
+        print("🗺️  Downloading municipal boundaries...")
+        FetchEngine().download(COUSUB_URL, args.zip)
+
+    if not args.zip.exists():
+        print(f"⚠️  {args.zip} not found. Run with --download first.")
+        return
+
+    count = build_registry(zip_path=args.zip, output_path=args.output)
+    print(f"  ✓ Wrote {count} cities to {args.output or DEFAULT_REGISTRY_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,96 +11,129 @@ Scores computed:
 - Grid score (0-100)
 - Overall score (0-100)
 - Daily kWh estimate
+
+After a city is published, `export_snapshots` writes its sites as a
+memory-mapped snapshot for the API (see app/services/site_snapshot.py).
 """
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.database import Base
-from app.models.site import Site
+import argparse
+from sqlalchemy.orm import Session
 from app.services.scoring import ScoringService
-from app.config import settings
+from app.services.site_snapshot import write_snapshot
+from app.services.site_table import SiteTable
+from site_frame import (
+    DEFAULT_CITY, FEATURE_COLUMNS, SCORE_COLUMNS,
+    get_session, load_sites_frame, resolve_city, update_sites_frame
+)
 
 
-def main():
-    """
-    Compute scores for all sites.
+def compute_scores(sites_df, city=None):
     """
-    print("📊 Computing scores for Worcester sites...")
+    Compute all scores for a site frame in one vectorized pass.
     
-    # Connect to database
-    engine = create_engine(settings.database_url)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    Args:
+        sites_df: DataFrame with all FEATURE_COLUMNS populated
+        city: Unused (scoring is city-independent); accepted so all
+            pipeline stages share one signature
     
-    # Get all Worcester sites
-    sites = session.query(Site).filter(Site.city == 'worcester').all()
-    print(f"Processing {len(sites)} sites...")
+    Returns:
+        The same DataFrame with SCORE_COLUMNS filled in (rounded to 0.1)
+    """
+    features = {name: sites_df[name].to_numpy() for name in FEATURE_COLUMNS}
+    scores = ScoringService.compute_all_scores_batch(features)
     
-    if len(sites) == 0:
-        print("⚠️  No sites found. Run previous pipeline steps first.")
-        return
+    for name in SCORE_COLUMNS:
+        sites_df[name] = scores[name].round(1)
     
-    # Check if sites have features
-    sample_site = sites[0]
-    if sample_site.traffic_index == 0 and sample_site.pop_density_index == 0:
-        print("⚠️  Sites missing features. Run ingest_demographics.py and ingest_traffic.py first.")
-        return
+    return sites_df
+
+
+def export_snapshots(engine, city_slugs, directory=None):
+    """
+    Write the published sites of each city as its current snapshot.
     
-    # Compute scores for each site
-    for idx, site in enumerate(sites):
-        # Prepare features dictionary
-        features = {
-            'traffic_index': site.traffic_index,
-            'pop_density_index': site.pop_density_index,
-            'renters_share': site.renters_share,
-            'income_index': site.income_index,
-            'poi_index': site.poi_index,
-            'parking_lot_flag': site.parking_lot_flag,
-            'municipal_parcel_flag': site.municipal_parcel_flag,
-        }
-        
-        # Compute all scores
-        scores = ScoringService.compute_all_scores(features)
-        
-        # Update site
-        site.score_demand = round(scores['score_demand'], 1)
-        site.score_equity = round(scores['score_equity'], 1)
-        site.score_traffic = round(scores['score_traffic'], 1)
-        site.score_grid = round(scores['score_grid'], 1)
-        site.score_overall = round(scores['score_overall'], 1)
-        site.daily_kwh_estimate = round(scores['daily_kwh_estimate'], 1)
-        
-        if (idx + 1) % 100 == 0:
-            print(f"  Processed {idx + 1}/{len(sites)} sites")
+    Reads back the published rows because ids and the dataset version
+    are only assigned when the pipeline publishes.
     
-    # Commit changes
-    print("Saving to database...")
-    session.commit()
+    Args:
+        engine: SQLAlchemy engine of the published database
+        city_slugs: Cities to export
+        directory: Snapshot root (default: SITE_SNAPSHOT_DIR or
+            data/processed/snapshots)
     
-    # Print summary statistics
+    Returns:
+        Mapping of city slug → snapshot path
+    """
+    paths = {}
+    with Session(engine) as session:
+        for slug in city_slugs:
+            table = SiteTable.load(session, slug)
+            paths[slug] = write_snapshot(table, directory)
+            print(f"  📸 [{slug}] Snapshot v{table.version or 0}: {len(table)} sites → {paths[slug]}")
+    return paths
+
+
+def print_score_summary(sites_df):
+    """Print summary statistics and the top 10 sites."""
     print("\n📈 Score Summary Statistics:")
-    print(f"  Total sites: {len(sites)}")
+    print(f"  Total sites: {len(sites_df)}")
     
-    overall_scores = [s.score_overall for s in sites]
-    demands = [s.daily_kwh_estimate for s in sites]
+    overall_scores = sites_df['score_overall']
+    demands = sites_df['daily_kwh_estimate']
     
     print(f"\n  Overall Score:")
-    print(f"    Min:  {min(overall_scores):.1f}")
-    print(f"    Max:  {max(overall_scores):.1f}")
-    print(f"    Mean: {sum(overall_scores) / len(overall_scores):.1f}")
+    print(f"    Min:  {overall_scores.min():.1f}")
+    print(f"    Max:  {overall_scores.max():.1f}")
+    print(f"    Mean: {overall_scores.mean():.1f}")
     
     print(f"\n  Daily kWh Estimate:")
-    print(f"    Total: {sum(demands):,.0f} kWh/day")
-    print(f"    Mean:  {sum(demands) / len(demands):.1f} kWh/day per site")
+    print(f"    Total: {demands.sum():,.0f} kWh/day")
+    print(f"    Mean:  {demands.mean():.1f} kWh/day per site")
     
     # Top 10 sites
-    top_sites = sorted(sites, key=lambda s: s.score_overall, reverse=True)[:10]
+    top_sites = sites_df.nlargest(10, 'score_overall')
     print(f"\n  🏆 Top 10 Sites by Overall Score:")
-    for i, site in enumerate(top_sites, 1):
+    for i, site in enumerate(top_sites.itertuples(), 1):
         print(f"    {i}. {site.location_label}: {site.score_overall:.1f} ({site.daily_kwh_estimate:.0f} kWh/day)")
+
+
+def main():
+    """
+    Compute scores for all sites in the database.
+    """
+    parser = argparse.ArgumentParser(description="Compute scores for a city")
+    parser.add_argument('--city', default=DEFAULT_CITY, help="City slug from the registry")
+    city = resolve_city(parser.parse_args().city)
+    
+    print(f"📊 Computing scores for {city['name']} sites...")
+    
+    # Get all sites for the city
+    session = get_session()
+    sites_df = load_sites_frame(session, city=city['slug'])
+    print(f"Processing {len(sites_df)} sites...")
+    
+    if len(sites_df) == 0:
+        print("⚠️  No sites found. Run previous pipeline steps first.")
+        return
+    
+    # Check if sites have features
+    sample_site = sites_df.iloc[0]
+    if sample_site['traffic_index'] == 0 and sample_site['pop_density_index'] == 0:
+        print("⚠️  Sites missing features. Run ingest_demographics.py and ingest_traffic.py first.")
+        return
+    
+    sites_df = compute_scores(sites_df)
+    
+    # Commit changes
+    print("Saving to database...")
+    version = update_sites_frame(session, sites_df, SCORE_COLUMNS, city=city['slug'])
+    print(f"✓ Published dataset version {version}")
+    export_snapshots(session.get_bind(), [city['slug']])
+    
+    print_score_summary(sites_df)
     
     print("\n✓ Score computation complete")
     
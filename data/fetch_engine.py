@@ -0,0 +1,352 @@
+"""
+HTTP fetch engine for the raw data downloads.
+
+Used by fetch_real_data.py to:
+- run independent requests concurrently while respecting a per-host
+  rate limit (minimum interval + maximum parallel requests per host)
+- split large bounding boxes into tiles that are fetched in parallel
+- cache responses on disk keyed by a hash of the request, and
+  revalidate them with conditional requests (ETag / Last-Modified)
+  when the server supports it
+- resume interrupted file downloads with HTTP Range requests
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "raw" / "http_cache"
+
+# Cached responses younger than this are used without contacting the server
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class HostRateLimiter:
+    """
+    Per-host request limits shared by all worker threads.
+
+    Each host gets a minimum interval between request starts and a cap
+    on requests in flight; unknown hosts use the defaults.
+    """
+
+    def __init__(self, limits=None, default_interval=0.0, default_concurrency=4):
+        self.limits = limits or {}
+        self.default_interval = default_interval
+        self.default_concurrency = default_concurrency
+        self._lock = threading.Lock()
+        self._next_start = {}
+        self._slots = {}
+
+    def _limit(self, host):
+        limit = self.limits.get(host, {})
+        return (
+            limit.get('interval', self.default_interval),
+            limit.get('concurrency', self.default_concurrency),
+        )
+
+    def _host_slots(self, host):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self._limit(host)[1])
+            return self._slots[host]
+
+    def acquire(self, host):
+        """Block until a request to the host may start."""
+        self._host_slots(host).acquire()
+        interval = self._limit(host)[0]
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host):
+        self._host_slots(host).release()
+
+
+class FetchEngine:
+    """
+    Cached, rate-limited HTTP client.
+
+    Args:
+        cache_dir: Directory for cached responses
+        rate_limits: Mapping of host → {'interval': s, 'concurrency': n}
+        max_workers: Threads used by run() and fetch_tiles()
+        max_age: Seconds a cached response is used without revalidation
+        session: Optional requests.Session (for tests)
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, rate_limits=None, max_workers=8,
+                 max_age=DEFAULT_MAX_AGE, session=None):
+        self.cache_dir = Path(cache_dir)
+        self.limiter = HostRateLimiter(rate_limits)
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self.session = session or requests.Session()
+        self.stats = {'network': 0, 'cached': 0, 'revalidated': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _request(self, method, url, **kwargs):
+        """Send one request under the host's rate limit."""
+        host = urlsplit(url).netloc
+        self.limiter.acquire(host)
+        try:
+            self._count('network')
+            return self.session.request(method, url, **kwargs)
+        finally:
+            self.limiter.release(host)
+
+    @staticmethod
+    def cache_key(method, url, params=None, data=None):
+        """Hash identifying a request (method, URL, query and body)."""
+        payload = json.dumps(
+            {'method': method.upper(), 'url': url, 'params': params, 'data': data},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _cache_paths(self, key):
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def fetch_file(self, method, url, params=None, data=None, timeout=90, refresh=False):
+        """
+        Fetch a response into the disk cache and return its path.
+
+        Fresh cached bodies are used directly. Stale ones are
+        revalidated with If-None-Match / If-Modified-Since when the
+        server sent validators, and refetched otherwise. New bodies are
+        streamed to disk, so large responses are never fully in memory.
+
+        Args:
+            method: HTTP method ('GET' or 'POST')
+            url: Request URL
+            params: Query parameters
+            data: Form body (e.g. the Overpass query)
+            timeout: Request timeout in seconds
+            refresh: Revalidate even if the cached body is fresh
+
+        Returns:
+            Path of the cached response body
+
+        Raises:
+            requests.HTTPError: On a non-success status
+        """
+        key = self.cache_key(method, url, params, data)
+        body_path, meta_path = self._cache_paths(key)
+        meta = None
+        if body_path.exists() and meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if not refresh and time.time() - meta['fetched_at'] < self.max_age:
+                self._count('cached')
+                return body_path
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self._request(
+            method, url, params=params, data=data, headers=headers,
+            timeout=timeout, stream=True
+        )
+
+        with response:
+            if response.status_code == 304 and meta is not None:
+                self._count('revalidated')
+                meta['fetched_at'] = time.time()
+                self._write_meta(meta_path, meta)
+                return body_path
+
+            response.raise_for_status()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = body_path.with_name(body_path.name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+            tmp_path.replace(body_path)
+            self._write_meta(meta_path, {
+                'url': url,
+                'fetched_at': time.time(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            })
+
+        return body_path
+
+    def fetch(self, method, url, **kwargs):
+        """fetch_file() and return the body as bytes."""
+        return self.fetch_file(method, url, **kwargs).read_bytes()
+
+    def fetch_json(self, method, url, **kwargs):
+        """fetch() and decode the body as JSON."""
+        return json.loads(self.fetch(method, url, **kwargs))
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        tmp_path.replace(path)
+
+    @staticmethod
+    def _read_meta(path):
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def download(self, url, dest, timeout=120):
+        """
+        Download a file, resuming a partial download if one exists.
+
+        The file is streamed to `<dest>.part`; an interrupted download
+        continues with a Range request guarded by If-Range, so a file
+        that changed on the server restarts from scratch. An existing
+        complete file is revalidated with a conditional request.
+
+        Validators are kept per file: `<dest>.meta.json` describes `dest`
+        and is only written once the part has replaced it, while
+        `<dest>.part.meta.json` describes the part being downloaded.
+        An interrupted download therefore never makes a stale `dest`
+        look current.
+
+        Returns:
+            True if the file was (re)downloaded, False if it was current
+        """
+        dest = Path(dest)
+        part_path = dest.with_name(dest.name + '.part')
+        meta_path = dest.with_name(dest.name + '.meta.json')
+        part_meta_path = dest.with_name(dest.name + '.part.meta.json')
+        meta = self._read_meta(meta_path)
+        part_meta = self._read_meta(part_meta_path)
+        part_validator = part_meta.get('etag') or part_meta.get('last_modified')
+
+        headers = {}
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if offset and part_validator:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = part_validator
+        elif dest.exists():
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self._request('GET', url, headers=headers, timeout=timeout, stream=True)
+        with response:
+            if response.status_code == 304 and dest.exists():
+                return False
+
+            if response.status_code == 416 and 'Range' in headers:
+                # Nothing left past the offset: the part is complete if
+                # its size matches, otherwise it is discarded
+                if response.headers.get('Content-Range') == f"bytes */{offset}":
+                    self._finish_download(part_path, dest, part_meta, part_meta_path, meta_path)
+                    return True
+                part_path.unlink()
+                part_meta_path.unlink(missing_ok=True)
+                return self.download(url, dest, timeout=timeout)
+
+            response.raise_for_status()
+
+            append = response.status_code == 206
+            if not append:
+                part_meta = {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+                self._write_meta(part_meta_path, part_meta)
+
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with open(part_path, 'ab' if append else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+
+        self._finish_download(part_path, dest, part_meta, part_meta_path, meta_path)
+        return True
+
+    def _finish_download(self, part_path, dest, part_meta, part_meta_path, meta_path):
+        """Move a complete part into place, then record its validators for dest."""
+        part_path.replace(dest)
+        self._write_meta(meta_path, part_meta)
+        part_meta_path.unlink(missing_ok=True)
+
+    def run(self, tasks):
+        """
+        Run independent callables concurrently.
+
+        Args:
+            tasks: Mapping of name → zero-argument callable
+
+        Returns:
+            Mapping of name → result, or the raised exception
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {name: pool.submit(task) for name, task in tasks.items()}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = e
+        return results
+
+    def fetch_tiles(self, bbox, fetch_tile, max_span=None):
+        """
+        Fetch a bbox as parallel tiles and concatenate the results.
+
+        Args:
+            bbox: [west, south, east, north]
+            fetch_tile: Callable(tile bbox) → list of items
+            max_span: Maximum tile width/height in degrees
+
+        Returns:
+            List of items from all tiles, in tile order
+        """
+        tiles = split_bbox(bbox, max_span) if max_span else [list(bbox)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(fetch_tile, tiles))
+        return [item for items in results for item in items]
+
+
+def split_bbox(bbox, max_span):
+    """
+    Split [west, south, east, north] into a grid of tiles.
+
+    Tiles share edges, so a feature on a boundary may be returned by
+    two tiles; callers deduplicate by id.
+    """
+    west, south, east, north = bbox
+    cols = max(1, math.ceil((east - west) / max_span))
+    rows = max(1, math.ceil((north - south) / max_span))
+    width = (east - west) / cols
+    height = (north - south) / rows
+
+    return [
+        [
+            west + col * width,
+            south + row * height,
+            east if col == cols - 1 else west + (col + 1) * width,
+            north if row == rows - 1 else south + (row + 1) * height,
+        ]
+        for row in range(rows)
+        for col in range(cols)
+    ]
@@ -1,5 +1,5 @@
 """
-Fetch real open-source datasets for Worcester, MA.
+Fetch real open-source datasets for Massachusetts cities (Worcester by default).
 
 This script downloads publicly available data from various sources:
 - OpenStreetMap via Overpass API (no authentication required)
@@ -7,73 +7,216 @@ This script downloads publicly available data from various sources:
 - OpenStreetMap for POI and parking
 
 All data sources are free and open.
+
+Requests go through fetch_engine.FetchEngine: sources and cities are
+fetched concurrently under per-host rate limits, Overpass bboxes are
+split into tiles, responses are cached on disk (data/raw/http_cache),
+and the TIGER zip download resumes if interrupted. Rerunning the script
+only contacts servers for data that is missing or stale.
 """
-import requests
-import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
 import pandas as pd
-import time
 from pathlib import Path
+from app.cities import list_city_slugs
+from fetch_engine import DEFAULT_MAX_AGE, FetchEngine
+from overpass_stream import iter_elements, iter_row_chunks
+from raw_store import DatasetWriter, write_dataset
+from road_store import way_row
+from site_frame import DEFAULT_CITY, resolve_city
+from stage_profile import build_report, profile_stage, write_report
+from tract_store import TRACTS_ZIP, load_tracts
 
 # Create raw data directory
 RAW_DIR = Path(__file__).parent / "raw"
 RAW_DIR.mkdir(exist_ok=True)
 
-# Worcester bounding box
-WORCESTER_BBOX = {
-    'south': 42.2084,
-    'north': 42.3126,
-    'west': -71.8744,
-    'east': -71.7277
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+# Be nice to public APIs: minimum seconds between requests and maximum
+# parallel requests per host
+RATE_LIMITS = {
+    'overpass-api.de': {'interval': 1.0, 'concurrency': 2},
+    'api.census.gov': {'interval': 0.2, 'concurrency': 4},
+    'www2.census.gov': {'interval': 0.0, 'concurrency': 2},
 }
 
+# Overpass bboxes larger than this (degrees) are fetched as tiles
+OVERPASS_TILE_SIZE = 0.1
+
+
+def overpass_bbox(bbox):
+    """Bbox [west, south, east, north] in Overpass order: south,west,north,east."""
+    west, south, east, north = bbox
+    return f"{south},{west},{north},{east}"
+
+
+def element_bounds(element):
+    """
+    (south, west, north, east) of an Overpass element, or None.
+
+    Uses the `bounds` Overpass adds for `out bb` / `out geom`, else the
+    node position or the way's geometry.
+    """
+    if 'bounds' in element:
+        bounds = element['bounds']
+        return bounds['minlat'], bounds['minlon'], bounds['maxlat'], bounds['maxlon']
+    if 'lat' in element:
+        return element['lat'], element['lon'], element['lat'], element['lon']
+    if element.get('geometry'):
+        lats = [point['lat'] for point in element['geometry']]
+        lons = [point['lon'] for point in element['geometry']]
+        return min(lats), min(lons), max(lats), max(lons)
+    return None
+
+
+def inside_tile(tile, bounds):
+    """
+    Whether bounds lie strictly inside a tile [west, south, east, north].
+
+    Tiles only overlap on their edges, so such an element cannot be
+    returned by any other tile.
+    """
+    if bounds is None:
+        return False
+    west, south, east, north = tile
+    min_lat, min_lon, max_lat, max_lon = bounds
+    return west < min_lon and max_lon < east and south < min_lat and max_lat < north
+
 
-def fetch_osm_buildings():
+def unique_elements(tile_files):
+    """
+    Elements of several tile responses, without cross-tile duplicates.
+
+    Only elements that touch or cross their tile's edge can come back
+    from a neighbouring tile, so only their ids are remembered; the
+    set grows with the length of the tile edges, not with the extract.
+
+    Args:
+        tile_files: List of (tile bbox, response path) in tile order
+    """
+    seen = set()
+    for tile, path in tile_files:
+        with open(path, 'rb') as f:
+            for element in iter_elements(f):
+                if inside_tile(tile, element_bounds(element)):
+                    yield element
+                    continue
+                key = (element['type'], element['id'])
+                if key not in seen:
+                    seen.add(key)
+                    yield element
+
+
+def building_rows(element):
+    """Building center row for an Overpass `out center` element."""
+    if 'center' not in element:
+        return []
+    tags = element.get('tags', {})
+    return [{
+        'id': element['id'],
+        'lat': element['center']['lat'],
+        'lon': element['center']['lon'],
+        'building_type': tags.get('building', 'unknown'),
+        'amenity': tags.get('amenity', None),
+        'name': tags.get('name', None)
+    }]
+
+
+def poi_rows(element):
+    """POI row for an Overpass node."""
+    if element['type'] != 'node':
+        return []
+    tags = element.get('tags', {})
+    return [{
+        'id': element['id'],
+        'lat': element['lat'],
+        'lon': element['lon'],
+        'type': tags.get('shop') or tags.get('amenity') or tags.get('office', 'unknown'),
+        'name': tags.get('name', None)
+    }]
+
+
+def road_rows(element):
+    """One row per `out geom` way, its vertices stored as a WKB linestring."""
+    if element['type'] != 'way' or len(element.get('geometry', [])) < 2:
+        return []
+    tags = element.get('tags', {})
+    geometry = element['geometry']
+    return [way_row(
+        element['id'],
+        tags.get('highway', 'unknown'),
+        tags.get('name', None),
+        [point['lon'] for point in geometry],
+        [point['lat'] for point in geometry],
+    )]
+
+
+def fetch_overpass_dataset(engine, city, name, selectors, out, element_rows):
+    """
+    Run an Overpass query over a city's bbox and stream it to Parquet.
+
+    Tiles are downloaded in parallel into the response cache, then each
+    response is parsed incrementally (overpass_stream.py) and written in
+    fixed-size chunks, so memory does not grow with the extract size.
+    Elements returned by two neighbouring tiles are dropped by
+    unique_elements, which only tracks elements on tile edges.
+
+    Args:
+        engine: FetchEngine
+        city: City registry record
+        name: raw_store dataset name
+        selectors: Overpass selectors without bbox, e.g. 'way["building"]'
+        out: Output mode ('center bb', 'geom' or '')
+        element_rows: Callable(element) → list of row dictionaries
+
+    Returns:
+        Tuple of (rows written, Parquet path)
+    """
+    def fetch_tile(tile):
+        bbox = overpass_bbox(tile)
+        union = "\n".join(f"  {selector}({bbox});" for selector in selectors)
+        out_statement = f"out {out};" if out else "out;"
+        query = f"[out:json][timeout:60];\n(\n{union}\n);\n{out_statement}"
+        return [(tile, engine.fetch_file('POST', OVERPASS_URL, data={'data': query}, timeout=90))]
+
+    tile_files = engine.fetch_tiles(city['bbox'], fetch_tile, max_span=OVERPASS_TILE_SIZE)
+
+    with DatasetWriter(name, city) as writer:
+        for chunk in iter_row_chunks(unique_elements(tile_files), element_rows):
+            writer.write(chunk)
+    return writer.rows, writer.path
+
+
+def fetch_osm_buildings(city, engine):
     """
     Fetch building footprints from OpenStreetMap.
     These will be our candidate sites (building centroids).
+    
+    Returns:
+        Number of buildings saved, or None on failure
     """
     print("📦 Fetching building data from OpenStreetMap...")
     
-    # Overpass API query for buildings in Worcester
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    
     # Query for buildings (commercial, retail, public, parking)
-    query = f"""
-    [out:json][timeout:60];
-    (
-      way["building"="commercial"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-      way["building"="retail"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-      way["building"="public"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-      way["amenity"="parking"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-    );
-    out center;
-    """
+    selectors = [
+        'way["building"="commercial"]',
+        'way["building"="retail"]',
+        'way["building"="public"]',
+        'way["amenity"="parking"]',
+    ]
     
     try:
-        response = requests.post(overpass_url, data={'data': query}, timeout=90)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract building centers
-        buildings = []
-        for element in data.get('elements', []):
-            if 'center' in element:
-                buildings.append({
-                    'id': element['id'],
-                    'lat': element['center']['lat'],
-                    'lon': element['center']['lon'],
-                    'building_type': element.get('tags', {}).get('building', 'unknown'),
-                    'amenity': element.get('tags', {}).get('amenity', None),
-                    'name': element.get('tags', {}).get('name', None)
-                })
-        
-        df = pd.DataFrame(buildings)
-        output_file = RAW_DIR / "worcester_buildings_osm.csv"
-        df.to_csv(output_file, index=False)
+        count, output_file = fetch_overpass_dataset(
+            engine, city, 'buildings', selectors, out='center bb', element_rows=building_rows
+        )
         
-        print(f"  ✓ Fetched {len(buildings)} buildings")
+        print(f"  ✓ Fetched {count} buildings")
         print(f"  ✓ Saved to {output_file}")
-        return df
+        return count
         
     except Exception as e:
         print(f"  ⚠ Error fetching buildings: {e}")
@@ -81,119 +224,72 @@ def fetch_osm_buildings():
         return None
 
 
-def fetch_osm_pois():
+def fetch_osm_pois(city, engine):
     """
     Fetch Points of Interest from OpenStreetMap.
     Used for POI density calculation.
+    
+    Returns:
+        Number of POIs saved, or None on failure
     """
     print("\n🏪 Fetching POI data from OpenStreetMap...")
     
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    
     # Query for various POI types
-    query = f"""
-    [out:json][timeout:60];
-    (
-      node["shop"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-      node["amenity"~"restaurant|cafe|fast_food|school|hospital|library"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-      node["office"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-    );
-    out;
-    """
+    selectors = [
+        'node["shop"]',
+        'node["amenity"~"restaurant|cafe|fast_food|school|hospital|library"]',
+        'node["office"]',
+    ]
     
     try:
-        response = requests.post(overpass_url, data={'data': query}, timeout=90)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract POIs
-        pois = []
-        for element in data.get('elements', []):
-            if element['type'] == 'node':
-                pois.append({
-                    'id': element['id'],
-                    'lat': element['lat'],
-                    'lon': element['lon'],
-                    'type': element.get('tags', {}).get('shop') or 
-                           element.get('tags', {}).get('amenity') or
-                           element.get('tags', {}).get('office', 'unknown'),
-                    'name': element.get('tags', {}).get('name', None)
-                })
+        count, output_file = fetch_overpass_dataset(
+            engine, city, 'pois', selectors, out='', element_rows=poi_rows
+        )
         
-        df = pd.DataFrame(pois)
-        output_file = RAW_DIR / "worcester_pois_osm.csv"
-        df.to_csv(output_file, index=False)
-        
-        print(f"  ✓ Fetched {len(pois)} POIs")
+        print(f"  ✓ Fetched {count} POIs")
         print(f"  ✓ Saved to {output_file}")
-        return df
+        return count
         
     except Exception as e:
         print(f"  ⚠ Error fetching POIs: {e}")
         return None
 
 
-def fetch_osm_roads():
+def fetch_osm_roads(city, engine):
     """
     Fetch road network from OpenStreetMap.
     Used for traffic estimation based on road classification.
+    
+    Returns:
+        Number of roads (ways) saved, or None on failure
     """
     print("\n🛣️  Fetching road network from OpenStreetMap...")
     
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    
     # Query for major roads
-    query = f"""
-    [out:json][timeout:60];
-    (
-      way["highway"~"motorway|trunk|primary|secondary"]({WORCESTER_BBOX['south']},{WORCESTER_BBOX['west']},{WORCESTER_BBOX['north']},{WORCESTER_BBOX['east']});
-    );
-    out geom;
-    """
+    selectors = ['way["highway"~"motorway|trunk|primary|secondary"]']
     
     try:
-        response = requests.post(overpass_url, data={'data': query}, timeout=90)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract roads with their classifications
-        roads = []
-        for element in data.get('elements', []):
-            if element['type'] == 'way' and 'geometry' in element:
-                road_type = element.get('tags', {}).get('highway', 'unknown')
-                name = element.get('tags', {}).get('name', None)
-                
-                # Get road segments
-                for point in element['geometry']:
-                    roads.append({
-                        'way_id': element['id'],
-                        'lat': point['lat'],
-                        'lon': point['lon'],
-                        'highway_type': road_type,
-                        'name': name
-                    })
-        
-        df = pd.DataFrame(roads)
-        output_file = RAW_DIR / "worcester_roads_osm.csv"
-        df.to_csv(output_file, index=False)
+        count, output_file = fetch_overpass_dataset(
+            engine, city, 'roads', selectors, out='geom', element_rows=road_rows
+        )
         
-        print(f"  ✓ Fetched {len(roads)} road segments")
+        print(f"  ✓ Fetched {count} roads")
         print(f"  ✓ Saved to {output_file}")
-        return df
+        return count
         
     except Exception as e:
         print(f"  ⚠ Error fetching roads: {e}")
         return None
 
 
-def fetch_census_data():
+def fetch_census_data(city, engine):
     """
-    Fetch Census data for Worcester County, MA.
+    Fetch Census data for the county containing a city.
     Using the public Census API (no key required for basic queries).
     """
     print("\n👥 Fetching demographic data from US Census Bureau...")
     
-    # Worcester County FIPS: 25027 (MA = 25, Worcester County = 027)
+    # County FIPS from the city registry (e.g. Worcester County = 027)
     # Using 2021 5-year ACS estimates (most recent stable data)
     
     try:
@@ -209,13 +305,10 @@ def fetch_census_data():
         params = {
             'get': 'B01003_001E,B19013_001E,B25003_003E,B25003_001E,NAME',
             'for': 'tract:*',
-            'in': 'state:25 county:027'  # Massachusetts, Worcester County
+            'in': f"state:25 county:{city['county_fips']}"  # Massachusetts, city's county
         }
         
-        response = requests.get(census_url, params=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = engine.fetch_json('GET', census_url, params=params, timeout=30)
         
         # Convert to DataFrame
         headers = data[0]
@@ -240,8 +333,7 @@ def fetch_census_data():
         df['total_population'] = pd.to_numeric(df['total_population'], errors='coerce')
         df['median_household_income'] = pd.to_numeric(df['median_household_income'], errors='coerce')
         
-        output_file = RAW_DIR / "worcester_census_tracts.csv"
-        df.to_csv(output_file, index=False)
+        output_file = write_dataset(df, 'census', city)
         
         print(f"  ✓ Fetched data for {len(df)} census tracts")
         print(f"  ✓ Saved to {output_file}")
@@ -253,30 +345,34 @@ def fetch_census_data():
         return None
 
 
-def fetch_census_tract_boundaries():
+def fetch_census_tract_boundaries(engine, county_fips=()):
     """
     Fetch census tract boundary coordinates.
     Using Census TIGER/Line shapefiles via their API.
+    
+    The download resumes where an interrupted one stopped and is
+    skipped when the server reports the file unchanged. The tracts of
+    each county in `county_fips` are then extracted and cached as
+    GeoParquet (see tract_store.py) for the demographics stage.
     """
     print("\n🗺️  Fetching census tract boundaries...")
     
     try:
-        # Worcester County census tracts from TIGER/Line
-        # Using a simplified version for faster download
+        # Statewide Massachusetts census tracts from TIGER/Line
+        # (ingest_demographics.py filters to each city's county)
         url = "https://www2.census.gov/geo/tiger/TIGER2021/TRACT/tl_2021_25_tract.zip"
         
         print(f"  ℹ Downloading tract boundaries (this may take a moment)...")
-        response = requests.get(url, timeout=120, stream=True)
-        response.raise_for_status()
-        
-        zip_file = RAW_DIR / "census_tracts.zip"
-        with open(zip_file, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        print(f"  ✓ Downloaded tract boundaries")
+        zip_file = TRACTS_ZIP
+        if engine.download(url, zip_file, timeout=120):
+            print(f"  ✓ Downloaded tract boundaries")
+        else:
+            print(f"  ✓ Tract boundaries unchanged on server")
         print(f"  ✓ Saved to {zip_file}")
-        print(f"  ℹ Note: Extract this file and filter for Worcester County (COUNTYFP=027)")
+        
+        for county in sorted(set(county_fips)):
+            tracts = load_tracts(county, zip_path=zip_file)
+            print(f"  ✓ Extracted {len(tracts)} tracts for county {county}")
         
         return True
         
@@ -286,10 +382,54 @@ def fetch_census_tract_boundaries():
         return None
 
 
+def fetch_city(city, engine):
+    """
+    Fetch all per-city datasets for one city concurrently.
+    
+    The sources are independent; the engine's per-host rate limits
+    keep the public APIs from being flooded.
+    
+    Returns:
+        Dictionary of dataset name → row count (Census: DataFrame),
+        or None on failure
+    """
+    print(f"\n🏙  {city['name']}")
+    return engine.run({
+        'buildings': lambda: fetch_osm_buildings(city, engine),
+        'pois': lambda: fetch_osm_pois(city, engine),
+        'roads': lambda: fetch_osm_roads(city, engine),
+        'census': lambda: fetch_census_data(city, engine),
+    })
+
+
 def main():
     """
     Run all data fetching operations.
     """
+    parser = argparse.ArgumentParser(description="Fetch raw data for registered cities")
+    parser.add_argument(
+        '--city',
+        action='append',
+        help="City slug from the registry (repeatable, default: worcester)"
+    )
+    parser.add_argument('--all-cities', action='store_true', help="Fetch every registered city")
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help="Revalidate cached responses even if they are fresh"
+    )
+    parser.add_argument(
+        '--max-age',
+        type=float,
+        default=DEFAULT_MAX_AGE / 3600,
+        help="Hours a cached response is reused without contacting the server"
+    )
+    parser.add_argument('--no-profile', action='store_true', help="Do not write a profile report")
+    args = parser.parse_args()
+    
+    slugs = list_city_slugs() if args.all_cities else (args.city or [DEFAULT_CITY])
+    cities = [resolve_city(slug) for slug in slugs]
+    
     print("=" * 60)
     print("MA EV ChargeMap - Real Data Fetcher")
     print("=" * 60)
@@ -298,58 +438,65 @@ def main():
     print("  - US Census Bureau (demographics)")
     print("\nThis may take a few minutes...\n")
     
-    results = {}
+    max_age = 0 if args.refresh else args.max_age * 3600
+    engine = FetchEngine(rate_limits=RATE_LIMITS, max_age=max_age)
     
-    # Fetch OSM data (building locations for candidate sites)
-    results['buildings'] = fetch_osm_buildings()
-    time.sleep(2)  # Be nice to Overpass API
-    
-    # Fetch POIs
-    results['pois'] = fetch_osm_pois()
-    time.sleep(2)
-    
-    # Fetch roads
-    results['roads'] = fetch_osm_roads()
-    time.sleep(2)
-    
-    # Fetch Census data
-    results['census'] = fetch_census_data()
-    
-    # Optionally fetch tract boundaries
-    results['boundaries'] = fetch_census_tract_boundaries()
+    # Cities and the statewide tract boundaries are fetched concurrently
+    tasks = {city['slug']: (lambda city=city: fetch_city(city, engine)) for city in cities}
+    counties = [city['county_fips'] for city in cities]
+    tasks['__boundaries__'] = lambda: fetch_census_tract_boundaries(engine, counties)
+    with profile_stage('fetch') as profile:
+        all_results = engine.run(tasks)
+        boundaries = all_results.pop('__boundaries__')
+        profile['rows'] = sum(
+            (len(count) if isinstance(count, pd.DataFrame) else count)
+            for results in all_results.values()
+            for count in results.values()
+            if isinstance(count, (int, pd.DataFrame))
+        )
     
     print("\n" + "=" * 60)
     print("Data Fetching Complete!")
     print("=" * 60)
     
-    print("\n📊 Summary:")
-    if results['buildings'] is not None:
-        print(f"  ✓ Buildings: {len(results['buildings'])} locations")
-    else:
-        print(f"  ⚠ Buildings: Failed (will use grid)")
-    
-    if results['pois'] is not None:
-        print(f"  ✓ POIs: {len(results['pois'])} points")
-    else:
-        print(f"  ⚠ POIs: Failed (will use synthetic)")
-    
-    if results['roads'] is not None:
-        print(f"  ✓ Roads: {len(results['roads'])} segments")
-    else:
-        print(f"  ⚠ Roads: Failed (will use synthetic)")
+    for slug, results in all_results.items():
+        print(f"\n📊 Summary ({slug}):")
+        if results['buildings'] is not None:
+            print(f"  ✓ Buildings: {results['buildings']:,} locations")
+        else:
+            print(f"  ⚠ Buildings: Failed (will use grid)")
+        
+        if results['pois'] is not None:
+            print(f"  ✓ POIs: {results['pois']:,} points")
+        else:
+            print(f"  ⚠ POIs: Failed (will use synthetic)")
+        
+        if results['roads'] is not None:
+            print(f"  ✓ Roads: {results['roads']:,} ways")
+        else:
+            print(f"  ⚠ Roads: Failed (will use synthetic)")
+        
+        if results['census'] is not None:
+            print(f"  ✓ Census: {len(results['census'])} tracts")
+        else:
+            print(f"  ⚠ Census: Failed (will use synthetic)")
     
-    if results['census'] is not None:
-        print(f"  ✓ Census: {len(results['census'])} tracts")
-    else:
-        print(f"  ⚠ Census: Failed (will use synthetic)")
+    if boundaries is None:
+        print(f"\n  ⚠ Tract boundaries: Failed (Census features stay synthetic)")
     
+    print(f"\n🌐 Requests: {engine.stats['network']} sent, "
+          f"{engine.stats['cached']} served from cache, "
+          f"{engine.stats['revalidated']} revalidated unchanged")
     print(f"\n📁 All data saved to: {RAW_DIR}")
+    if not args.no_profile:
+        report = build_report('fetch', [profile], cities=slugs, requests=engine.stats)
+        print(f"📝 Profile report: {write_report(report)}")
     print("\nNext steps:")
     print("  1. Run the data pipeline: cd ../data && ./run_pipeline.sh")
     print("  2. The pipeline will automatically use real data if available")
     print("  3. Falls back to synthetic data if downloads failed")
     
-    return results
+    return all_results
 
 
 if __name__ == "__main__":
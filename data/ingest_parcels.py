@@ -1,5 +1,5 @@
 """
-Parcel data ingestion for Worcester, MA.
+Parcel data ingestion for Massachusetts cities (Worcester by default).
 
 This script loads candidate EV charging site locations from:
 1. REAL DATA: OpenStreetMap buildings (if available)
@@ -16,26 +16,22 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import argparse
 import numpy as np
 import pandas as pd
-from pathlib import Path
-from app.database import Base
-from app.models.site import Site
-from app.config import settings
+from raw_store import dataset_files, read_dataset
+from site_frame import (
+    DEFAULT_CITY, SITE_COLUMNS, get_session, replace_city_sites, resolve_city
+)
 
 
-# Worcester bounding box
-WORCESTER_BBOX = {
-    'lat_min': 42.2084,
-    'lat_max': 42.3126,
-    'lng_min': -71.8744,
-    'lng_max': -71.7277
-}
+# Building columns used to place candidate sites
+BUILDING_COLUMNS = ['id', 'lat', 'lon', 'amenity', 'name']
 
-# Path to real data
-RAW_DATA_DIR = Path(__file__).parent / "raw"
+
+def raw_inputs(city):
+    """Raw files this stage reads (used for pipeline caching)."""
+    return dataset_files('buildings', city)
 
 
 def generate_grid_points(bbox, grid_size=0.005):
@@ -43,14 +39,15 @@ def generate_grid_points(bbox, grid_size=0.005):
     Generate a regular grid of candidate locations.
     
     Args:
-        bbox: Dictionary with lat/lng bounds
+        bbox: Bounding box [west, south, east, north]
         grid_size: Spacing between grid points (degrees)
     
     Returns:
         List of (lat, lng) tuples
     """
-    lats = np.arange(bbox['lat_min'], bbox['lat_max'], grid_size)
-    lngs = np.arange(bbox['lng_min'], bbox['lng_max'], grid_size)
+    west, south, east, north = bbox
+    lats = np.arange(south, north, grid_size)
+    lngs = np.arange(west, east, grid_size)
     
     points = []
     for lat in lats:
@@ -60,48 +57,47 @@ def generate_grid_points(bbox, grid_size=0.005):
     return points
 
 
-def generate_location_labels(lat, lng):
+def generate_location_labels(lat, lng, city):
     """
     Generate a simple location label from coordinates.
     
     In production, would reverse geocode to actual addresses.
     """
     # Simple quadrant-based naming
-    center_lat = (WORCESTER_BBOX['lat_min'] + WORCESTER_BBOX['lat_max']) / 2
-    center_lng = (WORCESTER_BBOX['lng_min'] + WORCESTER_BBOX['lng_max']) / 2
+    west, south, east, north = city['bbox']
+    center_lat = (south + north) / 2
+    center_lng = (west + east) / 2
     
     ns = "North" if lat > center_lat else "South"
     ew = "East" if lng > center_lng else "West"
     
-    return f"Worcester {ns}-{ew} (Grid)"
+    return f"{city['name']} {ns}-{ew} (Grid)"
 
 
-def load_real_buildings():
+def load_real_buildings(city):
     """
     Load real building data from OpenStreetMap if available.
     Returns DataFrame or None if not available.
     """
-    osm_file = RAW_DATA_DIR / "worcester_buildings_osm.csv"
-    
-    if not osm_file.exists():
-        return None
-    
     try:
-        df = pd.read_csv(osm_file)
+        df = read_dataset('buildings', city, columns=BUILDING_COLUMNS)
+        if df is None:
+            return None
         print(f"  ✓ Loaded {len(df)} real buildings from OpenStreetMap")
         
         # Filter to bounds (in case we got extras)
+        west, south, east, north = city['bbox']
         df = df[
-            (df['lat'] >= WORCESTER_BBOX['lat_min']) &
-            (df['lat'] <= WORCESTER_BBOX['lat_max']) &
-            (df['lon'] >= WORCESTER_BBOX['lng_min']) &
-            (df['lon'] <= WORCESTER_BBOX['lng_max'])
+            (df['lat'] >= south) &
+            (df['lat'] <= north) &
+            (df['lon'] >= west) &
+            (df['lon'] <= east)
         ]
         
         # Check for parking amenities
         df['is_parking'] = df['amenity'] == 'parking'
         
-        print(f"  ✓ {len(df)} buildings within Worcester bounds")
+        print(f"  ✓ {len(df)} buildings within {city['name']} bounds")
         print(f"  ℹ {df['is_parking'].sum()} parking facilities identified")
         
         return df
@@ -111,66 +107,51 @@ def load_real_buildings():
         return None
 
 
-def main():
-    """
-    Generate candidate sites and store in database.
-    Uses real OpenStreetMap data if available, otherwise generates grid.
+def build_sites_frame(sites_df=None, city=None):
     """
-    print("🗺️  Loading Worcester candidate sites...")
+    Build the candidate site frame for a city.
     
-    # Create database engine
-    engine = create_engine(settings.database_url)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    Uses real OpenStreetMap buildings if available, otherwise a grid.
+    Feature and score columns are initialized to zero for later stages.
     
-    # Clear existing sites for Worcester
-    print("Clearing existing Worcester sites...")
-    session.query(Site).filter(Site.city == 'worcester').delete()
-    session.commit()
+    Args:
+        sites_df: Ignored (parcels is the first pipeline stage)
+        city: City registry record (defaults to Worcester)
+    
+    Returns:
+        DataFrame with one row per candidate site and all Site columns
+    """
+    city = city or resolve_city(DEFAULT_CITY)
     
     # Try to load real building data
     print("Checking for real OpenStreetMap data...")
-    buildings_df = load_real_buildings()
-    
-    sites = []
+    buildings_df = load_real_buildings(city)
     
     if buildings_df is not None and len(buildings_df) > 0:
         # Use real building locations
         print(f"Using {len(buildings_df)} real building locations from OSM")
         
-        for idx, row in buildings_df.iterrows():
-            # Determine if parking lot
-            parking_flag = 1 if row.get('is_parking', False) else 0
-            
-            # Use building name or generate label
-            location_label = row.get('name') or generate_location_labels(row['lat'], row['lon'])
-            
-            site = Site(
-                city='worcester',
-                lat=row['lat'],
-                lng=row['lon'],
-                location_label=location_label,
-                parcel_id=f"OSM-{int(row['id'])}",
-                parking_lot_flag=parking_flag,
-                # Initialize other fields with zeros
-                traffic_index=0.0,
-                pop_density_index=0.0,
-                renters_share=0.0,
-                income_index=0.0,
-                poi_index=0.0,
-                municipal_parcel_flag=0,
-                score_demand=0.0,
-                score_equity=0.0,
-                score_traffic=0.0,
-                score_grid=0.0,
-                score_overall=0.0,
-                daily_kwh_estimate=0.0,
-            )
-            sites.append(site)
+        # Stored as float32; round away the widening noise (~0.1 m)
+        lats = np.round(buildings_df['lat'].to_numpy(dtype=np.float64), 6)
+        lngs = np.round(buildings_df['lon'].to_numpy(dtype=np.float64), 6)
+        
+        # Use building name or generate label
+        names = buildings_df.get('name', pd.Series(None, index=buildings_df.index, dtype=object))
+        labels = [
+            name if isinstance(name, str) and name else generate_location_labels(lat, lng, city)
+            for name, lat, lng in zip(names, lats, lngs)
+        ]
+        
+        sites_df = pd.DataFrame({
+            'lat': lats,
+            'lng': lngs,
+            'location_label': labels,
+            'parcel_id': [f"OSM-{int(osm_id)}" for osm_id in buildings_df['id']],
+            'parking_lot_flag': buildings_df['is_parking'].astype(int).to_numpy(),
+        })
         
-        print(f"  ✓ Prepared {len(sites)} real building sites")
-        print(f"  ✓ {sum(s.parking_lot_flag for s in sites)} identified as parking facilities")
+        print(f"  ✓ Prepared {len(sites_df)} real building sites")
+        print(f"  ✓ {int(sites_df['parking_lot_flag'].sum())} identified as parking facilities")
     
     else:
         # Fallback to grid-based approach
@@ -178,40 +159,52 @@ def main():
         print("  ℹ Run 'python fetch_real_data.py' to download OSM data")
         print("Generating grid points...")
         
-        points = generate_grid_points(WORCESTER_BBOX, grid_size=0.008)
+        points = generate_grid_points(city['bbox'], grid_size=0.008)
         print(f"Generated {len(points)} candidate locations")
         
-        for idx, (lat, lng) in enumerate(points, start=1):
-            location_label = generate_location_labels(lat, lng)
-            
-            site = Site(
-                city='worcester',
-                lat=lat,
-                lng=lng,
-                location_label=location_label,
-                parcel_id=f"WORC-GRID-{idx:04d}",
-                traffic_index=0.0,
-                pop_density_index=0.0,
-                renters_share=0.0,
-                income_index=0.0,
-                poi_index=0.0,
-                parking_lot_flag=0,
-                municipal_parcel_flag=0,
-                score_demand=0.0,
-                score_equity=0.0,
-                score_traffic=0.0,
-                score_grid=0.0,
-                score_overall=0.0,
-                daily_kwh_estimate=0.0,
-            )
-            sites.append(site)
-    
-    # Bulk insert
-    print("Inserting sites into database...")
-    session.bulk_save_objects(sites)
-    session.commit()
-    
-    print(f"✓ Inserted {len(sites)} sites")
+        sites_df = pd.DataFrame(points, columns=['lat', 'lng'])
+        sites_df['location_label'] = [
+            generate_location_labels(lat, lng, city) for lat, lng in points
+        ]
+        prefix = city['slug'][:4].upper()
+        sites_df['parcel_id'] = [
+            f"{prefix}-GRID-{idx:04d}" for idx in range(1, len(points) + 1)
+        ]
+        sites_df['parking_lot_flag'] = 0
+    
+    sites_df['city'] = city['slug']
+    
+    # Initialize other fields with zeros; catchment_index stays NaN
+    # (NULL, "not computed") until build_catchments.py fills it
+    for column in SITE_COLUMNS:
+        if column not in sites_df:
+            sites_df[column] = np.nan if column == 'catchment_index' else 0.0
+    
+    return sites_df[SITE_COLUMNS].astype({
+        'parking_lot_flag': int,
+        'municipal_parcel_flag': int,
+    })
+
+
+def main():
+    """
+    Generate candidate sites and store in database.
+    Uses real OpenStreetMap data if available, otherwise generates grid.
+    """
+    parser = argparse.ArgumentParser(description="Load candidate sites for a city")
+    parser.add_argument('--city', default=DEFAULT_CITY, help="City slug from the registry")
+    city = resolve_city(parser.parse_args().city)
+    
+    print(f"🗺️  Loading {city['name']} candidate sites...")
+    
+    sites_df = build_sites_frame(city=city)
+    
+    # Replace existing sites for the city (single transaction)
+    print(f"Replacing existing {city['name']} sites...")
+    session = get_session(create_tables=True)
+    inserted = replace_city_sites(session, sites_df, city=city['slug'])
+    
+    print(f"✓ Inserted {inserted} sites")
     print("✓ Parcel ingestion complete")
     
     session.close()
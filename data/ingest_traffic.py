@@ -1,7 +1,10 @@
 """
-Traffic data ingestion for Worcester, MA.
+Traffic data ingestion for Massachusetts cities (Worcester by default).
 
-This script generates synthetic traffic indexes for each candidate site.
+This script estimates a traffic index for each candidate site. When an
+OpenStreetMap road network has been fetched, traffic comes from the
+distance to the nearest major road of each class (road_store.py);
+otherwise it is synthesized from the city's registry corridors.
 In production, would load from MassDOT traffic count data.
 
 Data sources (for reference):
@@ -14,23 +17,29 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import argparse
 import numpy as np
-from app.database import Base
-from app.models.site import Site
-from app.config import settings
+import road_store
+from site_frame import (
+    DEFAULT_CITY, get_session, load_sites_frame, resolve_city, synthetic_rng, update_sites_frame
+)
 
 
-# Worcester center and major corridors
-WORCESTER_CENTER = {'lat': 42.2626, 'lng': -71.8023}
+# Traffic weight of each OSM road class (links count as their class)
+ROAD_CLASS_WEIGHTS = {
+    'motorway': 1.0,
+    'trunk': 0.9,
+    'primary': 0.75,
+    'secondary': 0.5,
+}
 
-# Major road corridors (simplified)
-MAJOR_CORRIDORS = [
-    {'name': 'I-290', 'lat': 42.255, 'lng': -71.810, 'influence': 0.02},
-    {'name': 'Route 9', 'lat': 42.278, 'lng': -71.800, 'influence': 0.015},
-    {'name': 'Main St', 'lat': 42.263, 'lng': -71.800, 'influence': 0.01},
-]
+# Distance (meters) at which a road no longer adds traffic
+ROAD_INFLUENCE_M = 800.0
+
+
+def raw_inputs(city):
+    """Raw files this stage reads (used for pipeline caching)."""
+    return road_store.raw_inputs(city)
 
 
 def distance_to_point(lat1, lng1, lat2, lng2):
@@ -38,77 +47,124 @@ def distance_to_point(lat1, lng1, lat2, lng2):
     return np.sqrt((lat1 - lat2)**2 + (lng1 - lng2)**2)
 
 
-def generate_traffic_index(lat, lng, seed=42):
+def compute_road_traffic(sites_df, roads):
+    """
+    Traffic from proximity to real roads, weighted by road class.
+    
+    Args:
+        sites_df: DataFrame with site locations (lat, lng)
+        roads: road_store.RoadNetwork
+    
+    Returns:
+        Array of road traffic values (0-1), one per site
+    """
+    lats = sites_df['lat'].to_numpy()
+    lngs = sites_df['lng'].to_numpy()
+    road_traffic = np.zeros(len(sites_df))
+    
+    present = set(roads.highway_types)
+    for road_class, weight in ROAD_CLASS_WEIGHTS.items():
+        types = {t for t in present if t.split('_')[0] == road_class}
+        if not types:
+            continue
+        distances, _ = roads.nearest(lats, lngs, highway_types=types)
+        proximity = np.clip(1.0 - distances / ROAD_INFLUENCE_M, 0, 1)
+        road_traffic = np.maximum(road_traffic, weight * proximity)
+    
+    return road_traffic
+
+
+def generate_traffic_index(lat, lng, city, rng, road_traffic=None):
     """
-    Generate traffic index based on proximity to corridors and downtown.
+    Generate traffic indexes (arrays of site coordinates) based on
+    proximity to corridors and downtown.
     
     Traffic is highest:
-    - Near major road corridors
+    - Near major roads (real OSM roads when `road_traffic` is given,
+      otherwise the city's `corridors` in the registry)
     - Near downtown center
     - With some randomness
     """
-    np.random.seed(seed + int(lat * 1000))
-    
     # Base traffic from downtown proximity
-    dist_to_center = distance_to_point(lat, lng, WORCESTER_CENTER['lat'], WORCESTER_CENTER['lng'])
-    center_traffic = max(0, 1.0 - dist_to_center * 8)
+    center_lat, center_lng = city['center']
+    dist_to_center = distance_to_point(lat, lng, center_lat, center_lng)
+    center_traffic = np.maximum(0, 1.0 - dist_to_center * 8)
     
     # Traffic from major corridors
-    corridor_traffic = 0
-    for corridor in MAJOR_CORRIDORS:
-        dist = distance_to_point(lat, lng, corridor['lat'], corridor['lng'])
-        corridor_traffic += max(0, 1.0 - dist / corridor['influence'])
-    
-    corridor_traffic = min(corridor_traffic, 1.0)
+    if road_traffic is not None:
+        corridor_traffic = road_traffic
+    else:
+        corridor_traffic = np.zeros(np.shape(lat))
+        for corridor in city.get('corridors', []):
+            dist = distance_to_point(lat, lng, corridor['lat'], corridor['lng'])
+            corridor_traffic += np.maximum(0, 1.0 - dist / corridor['influence'])
+        
+        corridor_traffic = np.minimum(corridor_traffic, 1.0)
     
     # Combine (corridors weighted more heavily)
     base_traffic = 0.3 * center_traffic + 0.7 * corridor_traffic
     
     # Add noise
-    noise = np.random.uniform(-0.15, 0.15)
-    traffic = np.clip(base_traffic + noise, 0, 1)
+    noise = rng.uniform(-0.15, 0.15, size=np.shape(lat))
+    return np.clip(base_traffic + noise, 0, 1)
+
+
+def add_traffic_features(sites_df, city=None):
+    """
+    Add traffic_index to a site frame.
+    
+    Args:
+        sites_df: DataFrame with site locations (lat, lng)
+        city: City registry record (defaults to Worcester)
+    
+    Returns:
+        The same DataFrame with traffic_index filled in
+    """
+    city = city or resolve_city(DEFAULT_CITY)
+    
+    roads = road_store.load_road_network(city)
+    if roads is not None:
+        print(f"  ✓ Using {len(roads)} real roads ({roads.segment_count} segments) from OpenStreetMap")
+        road_traffic = compute_road_traffic(sites_df, roads)
+    else:
+        print("  ℹ No road network found, using registry corridors")
+        road_traffic = None
+    
+    # Seeded from the sites' coordinates for reproducibility
+    traffic = generate_traffic_index(
+        sites_df['lat'].to_numpy(), sites_df['lng'].to_numpy(), city, synthetic_rng(sites_df), road_traffic
+    )
+    sites_df['traffic_index'] = np.round(traffic, 3)
     
-    return traffic
+    return sites_df
 
 
 def main():
     """
-    Generate traffic features for all sites.
+    Generate traffic features for all sites in the database.
     """
-    print("🚗 Generating traffic features for Worcester sites...")
+    parser = argparse.ArgumentParser(description="Add traffic features for a city")
+    parser.add_argument('--city', default=DEFAULT_CITY, help="City slug from the registry")
+    city = resolve_city(parser.parse_args().city)
     
-    # Connect to database
-    engine = create_engine(settings.database_url)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    print(f"🚗 Generating traffic features for {city['name']} sites...")
     
-    # Get all Worcester sites
-    sites = session.query(Site).filter(Site.city == 'worcester').all()
-    print(f"Processing {len(sites)} sites...")
+    # Get all sites for the city
+    session = get_session()
+    sites_df = load_sites_frame(session, city=city['slug'])
+    print(f"Processing {len(sites_df)} sites...")
     
-    if len(sites) == 0:
+    if len(sites_df) == 0:
         print("⚠️  No sites found. Run ingest_parcels.py first.")
         return
     
-    # Generate traffic index for each site
-    for idx, site in enumerate(sites):
-        # Use site ID as seed for reproducibility
-        seed = site.id
-        
-        # Generate traffic index
-        traffic = generate_traffic_index(site.lat, site.lng, seed)
-        
-        # Update site
-        site.traffic_index = round(traffic, 3)
-        
-        if (idx + 1) % 100 == 0:
-            print(f"  Processed {idx + 1}/{len(sites)} sites")
+    sites_df = add_traffic_features(sites_df, city)
     
     # Commit changes
     print("Saving to database...")
-    session.commit()
+    update_sites_frame(session, sites_df, ['traffic_index'], city=city['slug'])
     
-    print(f"✓ Updated {len(sites)} sites with traffic features")
+    print(f"✓ Updated {len(sites_df)} sites with traffic features")
     print("✓ Traffic ingestion complete")
     
     session.close()
@@ -0,0 +1,95 @@
+"""
+Choose a portfolio of charger sites for a city.
+
+Picks N published sites that together cover the most demand within a
+service radius, using the same optimizer as GET /api/optimize/{city}
+(app/services/site_optimizer.py). Neighbouring sites only count for the
+demand they add, so the portfolio spreads over the city instead of
+clustering like the top-N list.
+
+Usage:
+    python optimize_sites.py --city worcester -n 50 --radius-km 0.8
+    python optimize_sites.py -n 500 --objective equity --output portfolio.csv
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import time
+
+import pandas as pd
+from app.services.site_optimizer import OBJECTIVES, optimize_portfolio
+from app.services.site_table import SiteTable
+from site_frame import DEFAULT_CITY, get_session, resolve_city
+
+
+def portfolio_frame(table, portfolio):
+    """
+    One row per chosen site, in pick order.
+
+    Args:
+        table: SiteTable (read from the database) the portfolio was chosen from
+        portfolio: Result of optimize_portfolio
+
+    Returns:
+        DataFrame with pick, id, location, scores and marginal gain
+    """
+    frame = pd.DataFrame({
+        name: table.columns[name][portfolio['rows']]
+        for name in ('id', 'lat', 'lng', 'location_label', 'score_overall', 'daily_kwh_estimate')
+    })
+    frame.insert(0, 'pick', range(1, len(frame) + 1))
+    frame['marginal_gain'] = portfolio['gains']
+    frame['covered_share'] = portfolio['gains'].cumsum() / portfolio['total'] if portfolio['total'] else 0.0
+    return frame
+
+
+def main():
+    """
+    Optimize and print (or save) a city's site portfolio.
+    """
+    parser = argparse.ArgumentParser(description="Choose N sites maximizing covered demand")
+    parser.add_argument('--city', default=DEFAULT_CITY, help="City slug from the registry")
+    parser.add_argument('-n', '--sites', type=int, default=10, help="Number of sites to choose")
+    parser.add_argument('--radius-km', type=float, default=0.8, help="Service radius of a site")
+    parser.add_argument('--objective', choices=sorted(OBJECTIVES), default='demand',
+                        help="Demand to cover: daily kWh or equity-weighted population")
+    parser.add_argument('--min-score', type=float, help="Minimum overall score of chosen sites")
+    parser.add_argument('--output', help="Write the portfolio to this CSV file")
+    args = parser.parse_args()
+    city = resolve_city(args.city)
+
+    session = get_session()
+    table = SiteTable.load(session, city['slug'])
+    session.close()
+
+    if not len(table):
+        print(f"⚠️  No sites found for {city['name']}. Run the pipeline first.")
+        return
+
+    print(f"🎯 Choosing {args.sites} of {len(table):,} {city['name']} sites "
+          f"({args.objective}, {args.radius_km} km radius)...")
+    start = time.perf_counter()
+    portfolio = optimize_portfolio(table, args.sites, args.radius_km, args.objective, args.min_score)
+    elapsed = time.perf_counter() - start
+
+    frame = portfolio_frame(table, portfolio)
+    share = portfolio['covered'] / portfolio['total'] if portfolio['total'] else 0.0
+    print(f"  Chose {len(frame)} sites in {elapsed:.2f}s, covering {share:.1%} of the city's demand")
+
+    if args.output:
+        frame.to_csv(args.output, index=False)
+        print(f"  💾 Saved to {args.output}")
+    else:
+        for site in frame.head(20).itertuples():
+            print(f"    {site.pick}. {site.location_label}: +{site.marginal_gain:.1f} "
+                  f"(score {site.score_overall:.1f}, {site.covered_share:.1%} covered)")
+        if len(frame) > 20:
+            print(f"    ... {len(frame) - 20} more (use --output to save all)")
+
+    print("\n✓ Portfolio optimization complete")
+
+
+if __name__ == "__main__":
+    main()
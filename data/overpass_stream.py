@@ -0,0 +1,150 @@
+"""
+Streaming parser for Overpass API JSON responses.
+
+An Overpass response is one JSON object whose "elements" array holds
+every node/way/relation. `json.load` (or `response.json()`) keeps the
+whole document plus a Python dict per element in memory, which does
+not scale to state-wide extracts.
+
+`iter_elements` reads the response incrementally and decodes one
+element at a time, so memory is bounded by the read size plus the
+largest single element (e.g. one `out geom` way with its coordinates).
+`iter_row_chunks` turns the elements into fixed-size DataFrame chunks
+for raw_store.DatasetWriter.
+"""
+import codecs
+import json
+
+import pandas as pd
+
+
+# Bytes read from the stream at a time
+READ_SIZE = 64 * 1024
+
+# Rows per DataFrame chunk handed to the columnar writer
+DEFAULT_CHUNK_SIZE = 10_000
+
+# A single JSON value larger than this is treated as a malformed document
+MAX_VALUE_SIZE = 64 * 1024 * 1024
+
+NUMBER_CHARS = '0123456789.eE+-'
+
+
+class _StreamReader:
+    """Text buffer over a binary stream that decodes one JSON value at a time."""
+
+    def __init__(self, stream, read_size):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.max_buffer = 0
+
+    def _fill(self):
+        """Drop consumed text and append the next block of the stream."""
+        data = self.stream.read(self.read_size)
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + self.utf8.decode(data, final=self.eof)
+        self.pos = 0
+        self.max_buffer = max(self.max_buffer, len(self.buffer))
+
+    def peek(self):
+        """Next non-whitespace character ('' at end of stream)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos] if self.pos < len(self.buffer) else ''
+            self._fill()
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed Overpass JSON: expected {chars!r}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or len(self.buffer) - self.pos > MAX_VALUE_SIZE:
+                    raise
+                self._fill()
+                continue
+            # A number cut at a block boundary decodes as a shorter number
+            # ("0" of "0.6"), so only accept it once a delimiter follows
+            truncated = end == len(self.buffer) or (
+                isinstance(value, (int, float)) and self.buffer[end] in NUMBER_CHARS
+            )
+            if truncated and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_elements(stream, read_size=READ_SIZE):
+    """
+    Yield the elements of an Overpass JSON response one at a time.
+
+    Args:
+        stream: Binary file-like object (open file or raw HTTP response)
+        read_size: Bytes to read per block
+
+    Yields:
+        Element dictionaries, in document order
+    """
+    reader = _StreamReader(stream, read_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(':')
+
+        if key == 'elements':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            reader.value()
+
+        if reader.expect(',}') == '}':
+            return
+
+
+def iter_row_chunks(elements, element_rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Convert elements to rows and group them into DataFrame chunks.
+
+    Args:
+        elements: Iterable of Overpass elements
+        element_rows: Callable(element) → list of row dictionaries
+        chunk_size: Rows per chunk (the last chunk may be smaller)
+
+    Yields:
+        DataFrames of at most chunk_size rows
+    """
+    rows = []
+    for element in elements:
+        rows.extend(element_rows(element))
+        while len(rows) >= chunk_size:
+            yield pd.DataFrame(rows[:chunk_size])
+            rows = rows[chunk_size:]
+    if rows:
+        yield pd.DataFrame(rows)
@@ -0,0 +1,562 @@
+"""
+Single-process pipeline runner for MA EV ChargeMap.
+
+Runs every pipeline stage in one process on an in-memory site frame
+and writes the result to the database once at the end, instead of
+having each script re-read and re-commit the whole sites table.
+
+Stages:
+1. parcels       - candidate site locations (ingest_parcels.py)
+2. demographics  - Census / POI features (ingest_demographics.py)
+3. traffic       - traffic index (ingest_traffic.py)
+4. catchment     - people / POIs around each site (build_catchments.py)
+5. scores        - final scores (build_scores.py)
+
+Each stage script can still be run on its own for debugging; it then
+loads the current sites from the database and saves only its columns.
+
+Stage outputs are cached as Parquet keyed by a hash of their inputs
+(see stage_cache.py), so only stages whose raw files, upstream outputs,
+code or scoring constants changed are re-executed.
+
+Cities come from the city registry (backend/config/cities.json).
+Independent cities run concurrently in a process pool, and a shared
+semaphore caps how many workers hold a database connection at the
+same time.
+
+Results are published through a shadow table (see publish.py): the new
+sites are loaded and indexed in `sites_staging`, then swapped in for
+`sites` in one transaction that also bumps each city's dataset version,
+so the API keeps serving the previous, fully indexed data until then.
+Each published city is then exported as a memory-mapped snapshot
+(`processed/snapshots/`, see build_scores.export_snapshots) that the
+API workers map instead of reading the database.
+
+Every stage is profiled (wall/CPU time, rows/sec, peak RSS, DB time;
+see stage_profile.py) and each run writes a JSON report to
+`processed/profiles/`; compare two runs with
+`python stage_profile.py compare --latest`.
+
+Usage:
+    python pipeline.py                      # Worcester, write once
+    python pipeline.py --city boston        # another registered city
+    python pipeline.py --all-cities -j 8    # every city, 8 processes
+    python pipeline.py --stop-after traffic # run parcels → traffic only
+    python pipeline.py --no-write           # compute but skip database write
+    python pipeline.py --in-place           # delete + insert into the live table
+    python pipeline.py --dry-run            # show which stages would rerun
+    python pipeline.py --force              # ignore the cache
+    python pipeline.py --no-profile         # skip the profile report
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+import ingest_parcels
+import ingest_demographics
+import ingest_traffic
+import build_catchments
+import build_scores
+import publish
+from app.cities import list_city_slugs
+from app.config import settings
+from app.services.scoring import ScoringService
+from site_frame import (
+    DEFAULT_CITY, SCORE_COLUMNS, get_engine, replace_city_sites, resolve_city
+)
+from stage_cache import (
+    Stage, StageCache, explain_changes, fingerprint_key, stage_fingerprint
+)
+from stage_profile import build_report, print_report, profile_stage, write_report
+
+
+DATA_DIR = Path(__file__).parent
+BACKEND_DIR = DATA_DIR.parent / "backend"
+
+# Default cap on concurrent database connections across all workers
+DEFAULT_MAX_DB_CONNECTIONS = 4
+
+# How results reach the database:
+#   swap     - build a shadow table and swap it in (default)
+#   in-place - delete + insert the city's rows in the live table
+#   staging  - only load into an existing shadow table (pool workers)
+WRITE_MODES = ('swap', 'in-place', 'staging')
+
+# Set in each pool worker by _init_worker; None when running inline
+_db_slots = None
+
+
+def scoring_constants():
+    """ScoringService weights and multipliers (inputs of the scores stage)."""
+    return {
+        name: getattr(ScoringService, name)
+        for name in dir(ScoringService)
+        if name.isupper()
+    }
+
+
+def tract_params():
+    """Tract extraction settings (inputs of the demographics stage)."""
+    return {'tract_simplify_tolerance': settings.tract_simplify_tolerance}
+
+
+# Pipeline DAG in topological order:
+# parcels → (demographics → catchment, traffic) → scores
+STAGES = [
+    Stage(
+        name='parcels',
+        func=ingest_parcels.build_sites_frame,
+        raw_inputs=ingest_parcels.raw_inputs,
+        code=[
+            DATA_DIR / 'ingest_parcels.py', DATA_DIR / 'raw_store.py', DATA_DIR / 'site_frame.py',
+            BACKEND_DIR / 'app' / 'models' / 'site.py',
+        ],
+    ),
+    Stage(
+        name='demographics',
+        func=ingest_demographics.add_demographic_features,
+        upstream=['parcels'],
+        outputs=ingest_demographics.DEMOGRAPHIC_COLUMNS,
+        raw_inputs=ingest_demographics.raw_inputs,
+        code=[
+            DATA_DIR / 'ingest_demographics.py', DATA_DIR / 'tract_store.py', DATA_DIR / 'raw_store.py',
+            DATA_DIR / 'site_frame.py',
+        ],
+        params=tract_params,
+    ),
+    Stage(
+        name='traffic',
+        func=ingest_traffic.add_traffic_features,
+        upstream=['parcels'],
+        outputs=['traffic_index'],
+        raw_inputs=ingest_traffic.raw_inputs,
+        code=[
+            DATA_DIR / 'ingest_traffic.py', DATA_DIR / 'road_store.py', DATA_DIR / 'raw_store.py',
+            DATA_DIR / 'site_frame.py',
+        ],
+    ),
+    Stage(
+        name='catchment',
+        func=build_catchments.add_catchment_features,
+        upstream=['demographics'],
+        outputs=build_catchments.CATCHMENT_COLUMNS,
+        raw_inputs=build_catchments.raw_inputs,
+        code=[
+            DATA_DIR / 'build_catchments.py', DATA_DIR / 'ingest_demographics.py',
+            DATA_DIR / 'tract_store.py', DATA_DIR / 'raw_store.py', DATA_DIR / 'site_frame.py',
+            BACKEND_DIR / 'app' / 'geo.py',
+        ],
+        params=tract_params,
+    ),
+    Stage(
+        name='scores',
+        func=build_scores.compute_scores,
+        upstream=['demographics', 'traffic', 'catchment'],
+        outputs=SCORE_COLUMNS,
+        code=[
+            DATA_DIR / 'build_scores.py', DATA_DIR / 'site_frame.py',
+            BACKEND_DIR / 'app' / 'services' / 'scoring.py',
+        ],
+        params=scoring_constants,
+    ),
+]
+
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def stage_input(stage, outputs):
+    """
+    Assemble a stage's input frame from its upstream outputs.
+
+    The first upstream provides the base frame; later upstreams
+    contribute only the columns they declare as outputs.
+    """
+    if not stage.upstream:
+        return None
+
+    sites_df = outputs[stage.upstream[0]].copy()
+    for name in stage.upstream[1:]:
+        for column in STAGES_BY_NAME[name].outputs:
+            sites_df[column] = outputs[name][column].to_numpy()
+    return sites_df
+
+
+def plan_pipeline(city, cache, stop_after=None, force=False):
+    """
+    Decide which stages need to run for a city.
+
+    Returns:
+        List of (stage, cache key, fingerprint, reasons) in run order.
+        An empty reasons list means the cached output can be reused.
+    """
+    keys = {}
+    plan = []
+
+    for stage in STAGES:
+        fingerprint = stage_fingerprint(stage, keys, city)
+        key = fingerprint_key(fingerprint)
+        keys[stage.name] = key
+
+        if force:
+            reasons = ["forced"]
+        elif cache.has_output(stage.name, key):
+            reasons = []
+        else:
+            reasons = explain_changes(cache.last_fingerprint(stage.name), fingerprint)
+            reasons = reasons or ["cached output missing"]
+
+        plan.append((stage, key, fingerprint, reasons))
+
+        if stage.name == stop_after:
+            break
+
+    return plan
+
+
+def print_plan(city, plan):
+    """Print which stages would rerun and why."""
+    print(f"\n🧭 Pipeline plan for {city['name']}:")
+    for stage, key, _, reasons in plan:
+        if reasons:
+            print(f"  ▶ {stage.name:<14} rerun  ({'; '.join(reasons)})")
+        else:
+            print(f"  ✓ {stage.name:<14} cached ({key})")
+
+
+def write_sites(sites_df, city, write):
+    """
+    Write a city's final frame to the database in the given write mode.
+
+    Returns:
+        Number of sites written
+    """
+    engine = get_engine(create_tables=True)
+    try:
+        if write == 'staging':
+            return publish.load_staging_sites(engine, sites_df, city['slug'])
+        if write == 'in-place':
+            with Session(engine) as session:
+                inserted = replace_city_sites(session, sites_df, city=city['slug'])
+        else:
+            versions = publish.publish_cities(engine, {city['slug']: sites_df})
+            print(f"  ✓ [{city['slug']}] Published dataset version {versions[city['slug']]}")
+            inserted = len(sites_df)
+        build_scores.export_snapshots(engine, [city['slug']])
+        return inserted
+    finally:
+        engine.dispose()
+
+
+def run_pipeline(city=None, stop_after=None, write='swap', force=False, cache=None):
+    """
+    Run pipeline stages for one city in memory and write the result once.
+
+    Stages whose inputs are unchanged are loaded from the Parquet cache
+    instead of being recomputed.
+
+    Args:
+        city: City registry record (defaults to Worcester)
+        stop_after: Optional stage name to stop after
+        write: One of WRITE_MODES, or None to skip the database write
+        force: Ignore the cache and rerun every stage
+        cache: StageCache to use (defaults to data/processed/cache/<city>)
+
+    Returns:
+        Tuple of (final site frame, list of stage profiles)
+    """
+    city = city or resolve_city(DEFAULT_CITY)
+    cache = cache or StageCache(city['slug'])
+    plan = plan_pipeline(city, cache, stop_after=stop_after, force=force)
+    print_plan(city, plan)
+
+    outputs = {}
+    profiles = []
+
+    for idx, (stage, key, fingerprint, reasons) in enumerate(plan, start=1):
+        with profile_stage(stage.name, city=city['slug'], cached=not reasons) as profile:
+            if reasons:
+                print(f"\n[{city['slug']}] Step {idx}/{len(plan)}: {stage.name}")
+                print("-" * 40)
+                sites_df = stage.func(stage_input(stage, outputs), city)
+                cache.save_output(stage.name, key, fingerprint, sites_df)
+            else:
+                sites_df = cache.load_output(stage.name, key)
+            profile['rows'] = len(sites_df)
+
+        outputs[stage.name] = sites_df
+        profiles.append(profile)
+
+        label = stage.name if reasons else f"{stage.name} (cached)"
+        print(
+            f"  ⏱  [{city['slug']}] {label}: {profile['wall_s']:.2f}s "
+            f"({len(sites_df)} sites, {profile['peak_rss_mb']:.0f} MB peak)"
+        )
+
+    sites_df = outputs[plan[-1][0].name]
+
+    if write:
+        with profile_stage('write', city=city['slug']) as profile:
+            # Wait for a free database slot when running in the pool
+            with _db_slots if _db_slots is not None else nullcontext():
+                inserted = write_sites(sites_df, city, write)
+            profile['rows'] = inserted
+        profiles.append(profile)
+        print(f"  ✓ [{city['slug']}] Inserted {inserted} sites in {profile['wall_s']:.2f}s")
+
+    return sites_df, profiles
+
+
+def _init_worker(db_slots):
+    """Process pool initializer: share the database connection semaphore."""
+    global _db_slots
+    _db_slots = db_slots
+
+
+def _run_city_worker(slug, stop_after, write, force):
+    """Run one city inside a pool worker; returns a picklable summary."""
+    start = time.perf_counter()
+    try:
+        sites_df, profiles = run_pipeline(
+            resolve_city(slug), stop_after=stop_after, write=write, force=force
+        )
+        return {
+            'city': slug,
+            'ok': True,
+            'sites': len(sites_df),
+            'profiles': profiles,
+            'seconds': time.perf_counter() - start,
+        }
+    except Exception:
+        return {
+            'city': slug,
+            'ok': False,
+            'error': traceback.format_exc(),
+            'seconds': time.perf_counter() - start,
+        }
+
+
+def run_cities(slugs, workers=None, max_db_connections=DEFAULT_MAX_DB_CONNECTIONS,
+               stop_after=None, write='swap', force=False, profiles=None):
+    """
+    Run the pipeline for many cities concurrently in a process pool.
+
+    Each city is independent: it has its own stage cache, so one failing
+    city does not affect others. With the default 'swap' write mode the
+    workers load their cities into one shared shadow table, which is
+    swapped in once all workers are done; failed cities keep the rows
+    they had before, which were copied into the shadow table.
+
+    Args:
+        slugs: City slugs to process
+        workers: Number of worker processes (defaults to CPU count)
+        max_db_connections: Cap on workers holding a database connection
+        stop_after, write, force: As for run_pipeline
+        profiles: Optional list that receives the shadow table publish profile
+
+    Returns:
+        List of per-city result dictionaries (in completion order)
+    """
+    workers = min(workers or os.cpu_count() or 1, len(slugs))
+    db_slots = multiprocessing.Semaphore(max_db_connections)
+    results = []
+
+    engine = get_engine(create_tables=True) if write == 'swap' else None
+    if engine is not None:
+        publish.create_staging_table(engine)
+    worker_write = 'staging' if write == 'swap' else write
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(db_slots,),
+        ) as pool:
+            futures = [
+                pool.submit(_run_city_worker, slug, stop_after, worker_write, force)
+                for slug in slugs
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                status = "✓" if result['ok'] else "⚠"
+                print(
+                    f"{status} [{len(results)}/{len(slugs)}] {result['city']} "
+                    f"finished in {result['seconds']:.1f}s"
+                )
+
+        if engine is not None:
+            with profile_stage('publish') as profile:
+                publish_staged_cities(engine, results)
+                profile['rows'] = sum(r['sites'] for r in results if r['ok'])
+            if profiles is not None:
+                profiles.append(profile)
+    except Exception:
+        if engine is not None:
+            publish.drop_staging_table(engine)
+        raise
+    finally:
+        if engine is not None:
+            engine.dispose()
+
+    return results
+
+
+def publish_staged_cities(engine, results):
+    """Index the shared shadow table and swap it in after a pool run."""
+    succeeded = {r['city']: r['sites'] for r in results if r['ok']}
+    if not succeeded:
+        publish.drop_staging_table(engine)
+        print("⚠ No city succeeded, sites table left unchanged")
+        return
+
+    start = time.perf_counter()
+    publish.build_staging_indexes(engine)
+    versions = publish.swap_staging_table(engine, succeeded)
+    print(f"✓ Swapped in new sites table in {time.perf_counter() - start:.1f}s")
+    for slug in sorted(versions):
+        print(f"  {slug}: dataset version {versions[slug]}")
+    build_scores.export_snapshots(engine, sorted(versions))
+
+
+def print_city_summary(results, elapsed):
+    """Print outcome of a multi-city run."""
+    succeeded = [r for r in results if r['ok']]
+    failed = [r for r in results if not r['ok']]
+
+    print("\n🏙  City summary:")
+    print(f"  Cities processed: {len(succeeded)}/{len(results)}")
+    print(f"  Sites written:    {sum(r['sites'] for r in succeeded):,}")
+    print(f"  Wall time:        {elapsed:.1f}s")
+
+    for result in failed:
+        print(f"\n⚠ {result['city']} failed:\n{result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the MA EV ChargeMap data pipeline")
+    parser.add_argument(
+        '--city',
+        action='append',
+        help="City slug from the registry (repeatable, default: worcester)"
+    )
+    parser.add_argument(
+        '--all-cities',
+        action='store_true',
+        help="Process every city in the registry"
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=None,
+        help="Worker processes for multi-city runs (default: CPU count)"
+    )
+    parser.add_argument(
+        '--max-db-connections',
+        type=int,
+        default=DEFAULT_MAX_DB_CONNECTIONS,
+        help="Maximum workers writing to the database at once"
+    )
+    parser.add_argument(
+        '--stop-after',
+        choices=[stage.name for stage in STAGES],
+        help="Stop after this stage (useful for debugging)"
+    )
+    parser.add_argument(
+        '--no-write',
+        action='store_true',
+        help="Compute everything in memory but do not touch the database"
+    )
+    parser.add_argument(
+        '--in-place',
+        action='store_true',
+        help="Delete and re-insert rows in the live table instead of swapping in a shadow table"
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help="Ignore cached stage outputs and rerun everything"
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help="Print which stages would rerun and why, then exit"
+    )
+    parser.add_argument(
+        '--no-profile',
+        action='store_true',
+        help="Do not write a stage profile report"
+    )
+    args = parser.parse_args()
+
+    slugs = list_city_slugs() if args.all_cities else (args.city or [DEFAULT_CITY])
+    cities = [resolve_city(slug) for slug in slugs]
+
+    print("=" * 40)
+    print("MA EV ChargeMap - Data Pipeline")
+    print("=" * 40)
+
+    write = None if args.no_write else ('in-place' if args.in_place else 'swap')
+
+    if args.dry_run:
+        for city in cities:
+            cache = StageCache(city['slug'])
+            print_plan(city, plan_pipeline(city, cache, stop_after=args.stop_after, force=args.force))
+        return
+
+    start = time.perf_counter()
+    if len(cities) == 1:
+        sites_df, profiles = run_pipeline(
+            cities[0],
+            stop_after=args.stop_after,
+            write=write,
+            force=args.force
+        )
+        failed = False
+
+        if args.stop_after in (None, 'scores'):
+            build_scores.print_score_summary(sites_df)
+    else:
+        profiles = []
+        results = run_cities(
+            [city['slug'] for city in cities],
+            workers=args.workers,
+            max_db_connections=args.max_db_connections,
+            stop_after=args.stop_after,
+            write=write,
+            force=args.force,
+            profiles=profiles
+        )
+        print_city_summary(results, time.perf_counter() - start)
+        profiles = [p for r in results if r['ok'] for p in r['profiles']] + profiles
+        failed = any(not result['ok'] for result in results)
+
+    report = build_report(
+        'pipeline',
+        profiles,
+        cities=slugs,
+        write=write,
+        workers=args.workers,
+        wall_s=round(time.perf_counter() - start, 4),
+    )
+    print_report(report)
+    if not args.no_profile:
+        print(f"\n📝 Profile report: {write_report(report)}")
+
+    if failed:
+        sys.exit(1)
+
+    print("\n✓ Pipeline complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Shadow-table publishing for the sites table.
+
+Instead of deleting and re-inserting a city's rows in the live `sites`
+table (which leaves readers contending with a large write and cold
+indexes), the pipeline builds the next version of the table on the side
+and swaps it in:
+
+1. `sites_staging` is created as a copy of the live rows, indexed only
+   on `city` so that replacing one city's rows is an index lookup
+   rather than a scan of the whole state.
+2. Each rebuilt city's rows are replaced in `sites_staging` (possibly
+   from several workers at once). Cities that are not rebuilt, or whose
+   rebuild failed, keep their current rows and ids.
+3. The primary key and indexes are built and statistics gathered on
+   the staging table while readers keep using `sites`.
+4. In one short transaction the staging table is renamed to `sites`,
+   the old table dropped and each rebuilt city's dataset version bumped.
+
+On PostgreSQL the swap is transactional DDL: readers see either the old
+or the new table, never a half-written one, and only wait for the brief
+ACCESS EXCLUSIVE lock taken by the renames. The staging table shares
+the `sites` id sequence, so ids stay unique across swaps.
+
+SQLite (local development) follows the same steps; because it cannot
+rename indexes, canonical indexes are rebuilt inside the swap.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import time
+
+from sqlalchemy import Index, MetaData, insert, text
+from sqlalchemy.exc import OperationalError
+from app.models.site import Site
+from site_frame import SITE_COLUMNS, bump_dataset_version, site_records
+
+
+LIVE_TABLE = Site.__tablename__
+STAGING_TABLE = f"{LIVE_TABLE}_staging"
+OLD_TABLE = f"{LIVE_TABLE}_old"
+
+# How long the swap may wait for readers to release the table (PostgreSQL)
+SWAP_LOCK_TIMEOUT = '5s'
+SWAP_ATTEMPTS = 3
+
+
+def staging_table():
+    """
+    Table object for `sites_staging` with the same columns as `sites`.
+
+    Indexes are left off: they are created by create_staging_table
+    (city) and build_staging_indexes (the rest).
+    """
+    table = Site.__table__.to_metadata(MetaData(), name=STAGING_TABLE)
+    table.indexes.clear()
+    return table
+
+
+def staging_index_name(index):
+    return f"{index.name}_staging"
+
+
+def city_index():
+    """The canonical index on `city` alone, built before the load."""
+    return next(
+        index for index in Site.__table__.indexes
+        if [column.name for column in index.columns] == ['city']
+    )
+
+
+def create_staging_index(conn, table, index):
+    Index(
+        staging_index_name(index),
+        *[table.c[column.name] for column in index.columns]
+    ).create(conn)
+
+
+def is_postgres(engine):
+    return engine.dialect.name == 'postgresql'
+
+
+def drop_staging_table(engine):
+    """Remove a leftover staging table (e.g. from a failed run)."""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+
+
+def create_staging_table(engine):
+    """
+    Create the staging table as a copy of the live rows.
+
+    Copying every row (rather than only the cities kept as they are)
+    keeps the rows of cities whose rebuild fails, and makes SQLite hand
+    out new ids above all live ids. The city index is built right after
+    the copy so each load_staging_sites delete is an index lookup; the
+    other indexes wait for build_staging_indexes.
+
+    Returns:
+        Number of rows copied from the live table
+    """
+    drop_staging_table(engine)
+
+    with engine.begin() as conn:
+        if is_postgres(engine):
+            # Shares the id sequence via the copied DEFAULT nextval(...)
+            conn.execute(text(
+                f"CREATE TABLE {STAGING_TABLE} (LIKE {LIVE_TABLE} INCLUDING DEFAULTS)"
+            ))
+        else:
+            staging_table().create(conn)
+
+        columns = ', '.join(['id'] + SITE_COLUMNS)
+        result = conn.execute(text(
+            f"INSERT INTO {STAGING_TABLE} ({columns}) "
+            f"SELECT {columns} FROM {LIVE_TABLE}"
+        ))
+        create_staging_index(conn, staging_table(), city_index())
+
+    return result.rowcount
+
+
+def load_staging_sites(engine, sites_df, city):
+    """
+    Replace a city's rows in the staging table with its rebuilt frame.
+
+    Returns:
+        Number of rows inserted
+    """
+    table = staging_table()
+    records = site_records(sites_df)
+
+    with engine.begin() as conn:
+        conn.execute(table.delete().where(table.c.city == city))
+        if records:
+            conn.execute(insert(table), records)
+    return len(records)
+
+
+def build_staging_indexes(engine):
+    """Add the primary key and remaining indexes to the loaded staging table."""
+    table = staging_table()
+    loaded = city_index()
+
+    with engine.begin() as conn:
+        if is_postgres(engine):
+            conn.execute(text(
+                f"ALTER TABLE {STAGING_TABLE} "
+                f"ADD CONSTRAINT {STAGING_TABLE}_pkey PRIMARY KEY (id)"
+            ))
+        for index in Site.__table__.indexes:
+            if index is not loaded:
+                create_staging_index(conn, table, index)
+        conn.execute(text(f"ANALYZE {STAGING_TABLE}"))
+
+
+def _swap(conn, postgres, city_counts):
+    """Statements of the swap transaction (see swap_staging_table)."""
+    if postgres:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+
+    # Versions first: the first DML opens the SQLite transaction, so the
+    # DDL below is part of it and the swap commits or rolls back as one
+    versions = {
+        slug: bump_dataset_version(conn, slug, count)
+        for slug, count in city_counts.items()
+    }
+
+    if postgres:
+        sequence = conn.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': LIVE_TABLE}
+        ).scalar()
+        if sequence:
+            # Otherwise dropping the old table would drop the sequence too
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {STAGING_TABLE}.id"))
+
+    conn.execute(text(f"ALTER TABLE {LIVE_TABLE} RENAME TO {OLD_TABLE}"))
+    conn.execute(text(f"ALTER TABLE {STAGING_TABLE} RENAME TO {LIVE_TABLE}"))
+    conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+
+    for index in Site.__table__.indexes:
+        if postgres:
+            conn.execute(text(
+                f"ALTER INDEX {staging_index_name(index)} RENAME TO {index.name}"
+            ))
+        else:
+            conn.execute(text(f"DROP INDEX {staging_index_name(index)}"))
+            index.create(conn)
+
+    if postgres:
+        conn.execute(text(
+            f"ALTER INDEX {STAGING_TABLE}_pkey RENAME TO {LIVE_TABLE}_pkey"
+        ))
+
+    return versions
+
+
+def swap_staging_table(engine, city_counts):
+    """
+    Atomically replace `sites` with the indexed staging table.
+
+    Retries when readers hold the table longer than SWAP_LOCK_TIMEOUT.
+
+    Args:
+        engine: SQLAlchemy engine
+        city_counts: Mapping of rebuilt city slug → published site count
+
+    Returns:
+        Mapping of city slug → new dataset version
+    """
+    postgres = is_postgres(engine)
+
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            with engine.begin() as conn:
+                return _swap(conn, postgres, city_counts)
+        except OperationalError:
+            if attempt == SWAP_ATTEMPTS:
+                raise
+            print(f"  ⚠ Swap waited too long for readers, retrying ({attempt}/{SWAP_ATTEMPTS})")
+            time.sleep(attempt)
+
+
+def publish_cities(engine, city_frames):
+    """
+    Build and swap in a new sites table with the given cities replaced.
+
+    Args:
+        engine: SQLAlchemy engine
+        city_frames: Mapping of city slug → final site frame
+
+    Returns:
+        Mapping of city slug → new dataset version
+    """
+    create_staging_table(engine)
+    try:
+        counts = {
+            slug: load_staging_sites(engine, sites_df, slug)
+            for slug, sites_df in city_frames.items()
+        }
+        build_staging_indexes(engine)
+        return swap_staging_table(engine, counts)
+    except Exception:
+        drop_staging_table(engine)
+        raise
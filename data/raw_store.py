@@ -0,0 +1,273 @@
+"""
+Typed Parquet storage for fetched raw datasets.
+
+fetch_real_data.py writes each dataset (OSM buildings, POIs, roads and
+Census tracts) as Parquet with explicit compact dtypes: float32
+coordinates, categorical tag columns and int64 OSM ids. Ingest scripts
+read back only the columns they need, memory-mapping the file instead
+of reparsing text.
+
+Large Overpass extracts are written chunk by chunk with DatasetWriter
+(one Parquet row group per chunk), so a dataset never has to be fully
+in memory.
+
+CSV files from earlier fetches are still read (with the same dtypes
+applied) when no Parquet file exists, and can be converted with:
+
+    python raw_store.py --all-cities
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.cities import list_city_slugs
+from site_frame import DEFAULT_CITY, resolve_city
+
+
+RAW_DIR = Path(__file__).parent / "raw"
+
+
+@dataclass
+class RawDataset:
+    """A fetched dataset: file name stem and column dtypes."""
+    name: str
+    stem: str
+    dtypes: Dict[str, str]
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in [
+        RawDataset('buildings', 'buildings_osm', {
+            'id': 'int64',
+            'lat': 'float32',
+            'lon': 'float32',
+            'building_type': 'category',
+            'amenity': 'category',
+            'name': 'string',
+        }),
+        RawDataset('pois', 'pois_osm', {
+            'id': 'int64',
+            'lat': 'float32',
+            'lon': 'float32',
+            'type': 'category',
+            'name': 'string',
+        }),
+        # One row per way; the linestring is WKB (see road_store.py)
+        RawDataset('roads', 'road_ways_osm', {
+            'way_id': 'int64',
+            'highway_type': 'category',
+            'name': 'string',
+            'geometry': 'binary',
+        }),
+        RawDataset('census', 'census_tracts', {
+            'total_population': 'float32',
+            'median_household_income': 'float32',
+            'renter_occupied': 'float32',
+            'total_occupied': 'float32',
+            'renters_share': 'float32',
+            'tract_name': 'string',
+            # FIPS codes keep their leading zeros
+            'state': 'string',
+            'county': 'string',
+            'tract': 'string',
+        }),
+    ]
+}
+
+
+# Arrow types of the dataset dtypes (categoricals are dictionary-encoded)
+ARROW_TYPES = {
+    'int64': pa.int64(),
+    'float32': pa.float32(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'string': pa.string(),
+    'binary': pa.binary(),
+}
+
+
+def arrow_schema(name):
+    """Fixed Arrow schema for a dataset (used by DatasetWriter)."""
+    return pa.schema([
+        (column, ARROW_TYPES[dtype])
+        for column, dtype in DATASETS[name].dtypes.items()
+    ])
+
+
+def parquet_path(name, city):
+    return RAW_DIR / f"{city['slug']}_{DATASETS[name].stem}.parquet"
+
+
+def csv_path(name, city):
+    return RAW_DIR / f"{city['slug']}_{DATASETS[name].stem}.csv"
+
+
+def dataset_files(name, city):
+    """Files a dataset may be read from (used for pipeline caching)."""
+    return [parquet_path(name, city), csv_path(name, city)]
+
+
+def apply_dtypes(df, name):
+    """Cast the known columns of a dataset frame to their compact dtypes."""
+    dtypes = {
+        column: dtype
+        for column, dtype in DATASETS[name].dtypes.items()
+        if column in df.columns and dtype != 'binary'
+    }
+    return df.astype(dtypes)
+
+
+def write_dataset(df, name, city):
+    """
+    Store a fetched dataset as typed Parquet (written atomically).
+
+    Returns:
+        Path of the Parquet file
+    """
+    path = parquet_path(name, city)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix('.parquet.tmp')
+    apply_dtypes(df, name).to_parquet(tmp_path, index=False)
+    tmp_path.replace(path)
+    return path
+
+
+class DatasetWriter:
+    """
+    Write a dataset to Parquet incrementally, one chunk at a time.
+
+    Chunks are DataFrames with (a subset of) the dataset's columns;
+    missing columns are written as nulls. The file replaces the previous
+    one only when the writer exits without an error.
+
+    Usage:
+        with DatasetWriter('roads', city) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, name, city):
+        self.name = name
+        self.path = parquet_path(name, city)
+        self.tmp_path = self.path.with_suffix('.parquet.tmp')
+        self.schema = arrow_schema(name)
+        self.rows = 0
+        self._writer = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        return self
+
+    def write(self, chunk):
+        """Append a DataFrame chunk as a row group."""
+        chunk = chunk.reindex(columns=self.schema.names)
+        # Numeric casts here; Arrow dictionary-encodes the string tags
+        numeric = {
+            column: dtype
+            for column, dtype in DATASETS[self.name].dtypes.items()
+            if dtype in ('int64', 'float32')
+        }
+        table = pa.Table.from_pandas(
+            chunk.astype(numeric), schema=self.schema, preserve_index=False
+        )
+        self._writer.write_table(table)
+        self.rows += len(chunk)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._writer.close()
+        if exc_type is None:
+            self.tmp_path.replace(self.path)
+        else:
+            self.tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def read_dataset(name, city, columns=None, memory_map=True):
+    """
+    Load a fetched dataset, preferring Parquet over legacy CSV.
+
+    Args:
+        name: Dataset name (key of DATASETS)
+        city: City registry record
+        columns: Columns to load (default: all)
+        memory_map: Memory-map the Parquet file instead of reading it
+
+    Returns:
+        DataFrame with compact dtypes, or None if the dataset was never fetched
+    """
+    path = parquet_path(name, city)
+    if path.exists():
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [column for column in columns if column in available]
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+        return table.to_pandas()
+
+    if csv_path(name, city).exists():
+        return read_dataset_csv(name, city, columns=columns)
+
+    return None
+
+
+def import_csv(name, city):
+    """
+    Convert a legacy CSV dataset to Parquet.
+
+    Returns:
+        Path of the Parquet file, or None if there is no CSV
+    """
+    if not csv_path(name, city).exists():
+        return None
+    return write_dataset(read_dataset_csv(name, city), name, city)
+
+
+def read_dataset_csv(name, city, columns=None):
+    """Read a legacy CSV dataset with the dataset's dtypes applied."""
+    usecols = (lambda column: column in columns) if columns is not None else None
+    # Read string columns as text so FIPS leading zeros survive
+    dtype = {
+        column: 'string'
+        for column, kind in DATASETS[name].dtypes.items()
+        if kind == 'string'
+    }
+    df = pd.read_csv(csv_path(name, city), usecols=usecols, dtype=dtype)
+    return apply_dtypes(df, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert raw CSV datasets to typed Parquet")
+    parser.add_argument(
+        '--city',
+        action='append',
+        help="City slug from the registry (repeatable, default: worcester)"
+    )
+    parser.add_argument('--all-cities', action='store_true', help="Convert every registered city")
+    args = parser.parse_args()
+
+    slugs = list_city_slugs() if args.all_cities else (args.city or [DEFAULT_CITY])
+
+    for slug in slugs:
+        city = resolve_city(slug)
+        for name in DATASETS:
+            csv_file = csv_path(name, city)
+            path = import_csv(name, city)
+            if path is not None:
+                print(
+                    f"  ✓ {csv_file.name} → {path.name} "
+                    f"({csv_file.stat().st_size / 1024:.0f} KB → {path.stat().st_size / 1024:.0f} KB)"
+                )
+
+
+if __name__ == "__main__":
+    main()
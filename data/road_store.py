@@ -0,0 +1,251 @@
+"""
+Compact road network storage and nearest-segment queries.
+
+Roads are stored one row per OSM way (raw_store dataset 'roads'):
+way_id, highway_type, name and the way's linestring as WKB. In memory a
+RoadNetwork keeps all vertices in one coordinate array with per-way
+offsets (way i owns vertices offsets[i]:offsets[i + 1]), so connectivity
+is preserved and attributes are not repeated per vertex.
+
+Each consecutive vertex pair is a segment. Segments are indexed in an
+STRtree in a local metric projection, so ingest stages can ask for the
+distance (in meters) from many sites to the nearest road segment in
+one bulk query.
+
+Older fetches stored one row per vertex (`<city>_roads_osm.*`); those
+files are still read and can be converted with:
+
+    python road_store.py --all-cities
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from app.cities import list_city_slugs
+from raw_store import RAW_DIR, dataset_files, read_dataset, write_dataset
+from site_frame import DEFAULT_CITY, resolve_city
+
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = 111_320.0
+
+
+def legacy_vertex_files(city):
+    """Per-vertex road files written by older versions of fetch_real_data.py."""
+    return [
+        RAW_DIR / f"{city['slug']}_roads_osm.parquet",
+        RAW_DIR / f"{city['slug']}_roads_osm.csv",
+    ]
+
+
+def raw_inputs(city):
+    """Files road data may be read from (used for pipeline caching)."""
+    return dataset_files('roads', city) + legacy_vertex_files(city)
+
+
+def way_row(way_id, highway_type, name, lons, lats):
+    """One road row with the way's vertices encoded as a WKB linestring."""
+    return {
+        'way_id': way_id,
+        'highway_type': highway_type,
+        'name': name,
+        'geometry': shapely.to_wkb(shapely.linestrings(lons, lats)),
+    }
+
+
+def vertices_to_ways(vertices_df):
+    """
+    Collapse per-vertex rows (way_id, lat, lon, highway_type, name)
+    into one row per way. Ways with fewer than two vertices are dropped.
+    """
+    counts = vertices_df['way_id'].map(vertices_df['way_id'].value_counts())
+    vertices_df = vertices_df[counts.to_numpy() >= 2].reset_index(drop=True)
+
+    # Vertices are grouped by way in fetch order; a stable sort keeps it
+    codes, way_ids = pd.factorize(vertices_df['way_id'])
+    order = np.argsort(codes, kind='stable')
+    coords = vertices_df[['lon', 'lat']].to_numpy(dtype=np.float64)[order]
+    lines = shapely.linestrings(coords, indices=codes[order])
+
+    first = vertices_df.groupby(codes, sort=True).first()
+    names = first['name'].to_numpy() if 'name' in first else [None] * len(first)
+    return pd.DataFrame({
+        'way_id': np.asarray(way_ids, dtype=np.int64),
+        'highway_type': first['highway_type'].astype(str).to_numpy(),
+        'name': names,
+        'geometry': shapely.to_wkb(lines),
+    })
+
+
+def load_road_ways(city):
+    """
+    Load a city's roads as one row per way.
+
+    Returns:
+        DataFrame (way_id, highway_type, name, geometry WKB) or None
+    """
+    ways_df = read_dataset('roads', city)
+    if ways_df is not None:
+        return ways_df
+
+    parquet_file, csv_file = legacy_vertex_files(city)
+    if parquet_file.exists():
+        return vertices_to_ways(pd.read_parquet(parquet_file))
+    if csv_file.exists():
+        return vertices_to_ways(pd.read_csv(csv_file))
+    return None
+
+
+class RoadNetwork:
+    """
+    Roads as offset-indexed coordinate arrays with a segment index.
+
+    Attributes:
+        way_ids, highway_types, names: One entry per way
+        coords: (n_vertices, 2) array of lon, lat
+        offsets: (n_ways + 1,) vertex offsets per way
+    """
+
+    def __init__(self, way_ids, highway_types, names, coords, offsets):
+        self.way_ids = np.asarray(way_ids)
+        self.highway_types = np.asarray(highway_types, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+        # Local equirectangular projection (meters) around the network
+        self.ref_lat = float(self.coords[:, 1].mean()) if len(self.coords) else 0.0
+        self._trees = {}
+
+    @classmethod
+    def from_ways(cls, ways_df):
+        """Build a network from road rows with WKB geometry."""
+        lines = shapely.from_wkb(ways_df['geometry'].to_numpy())
+        coords, way_index = shapely.get_coordinates(lines, return_index=True)
+        counts = np.bincount(way_index, minlength=len(lines))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls(
+            ways_df['way_id'].to_numpy(),
+            ways_df['highway_type'].astype(str).to_numpy(),
+            ways_df['name'].to_numpy() if 'name' in ways_df else [None] * len(ways_df),
+            coords,
+            offsets,
+        )
+
+    def __len__(self):
+        return len(self.way_ids)
+
+    @property
+    def segment_count(self):
+        return int(np.maximum(np.diff(self.offsets) - 1, 0).sum())
+
+    def project(self, lat, lng):
+        """Lat/lng (degrees) → local x/y (meters)."""
+        scale = METERS_PER_DEGREE * np.cos(np.radians(self.ref_lat))
+        return np.asarray(lng) * scale, np.asarray(lat) * METERS_PER_DEGREE
+
+    def segments(self, way_mask=None):
+        """
+        Segment endpoints of the selected ways.
+
+        Returns:
+            Tuple of (start vertex indices, owning way indices)
+        """
+        counts = np.diff(self.offsets)
+        way_index = np.repeat(np.arange(len(self)), counts)
+        starts = np.arange(len(self.coords))
+        # A vertex starts a segment unless it is the last vertex of its way
+        is_start = np.ones(len(self.coords), dtype=bool)
+        is_start[self.offsets[1:][counts > 0] - 1] = False
+        if way_mask is not None:
+            is_start &= way_mask[way_index]
+        return starts[is_start], way_index[is_start]
+
+    def _tree(self, highway_types):
+        """STRtree over projected segments, cached per class filter."""
+        key = tuple(sorted(highway_types)) if highway_types is not None else None
+        if key not in self._trees:
+            way_mask = None
+            if highway_types is not None:
+                way_mask = np.isin(self.highway_types, list(highway_types))
+            starts, ways = self.segments(way_mask)
+            x, y = self.project(self.coords[:, 1], self.coords[:, 0])
+            lines = shapely.linestrings(
+                np.stack([
+                    np.stack([x[starts], y[starts]], axis=1),
+                    np.stack([x[starts + 1], y[starts + 1]], axis=1),
+                ], axis=1)
+            ) if len(starts) else np.array([], dtype=object)
+            self._trees[key] = (shapely.STRtree(lines), ways)
+        return self._trees[key]
+
+    def nearest(self, lat, lng, highway_types=None):
+        """
+        Nearest road segment for each point.
+
+        Args:
+            lat, lng: Arrays of point coordinates (degrees)
+            highway_types: Optional collection of classes to consider
+
+        Returns:
+            Tuple of (distance in meters, index of the way owning the
+            nearest segment). Distance is inf and way -1 when no road
+            matches the filter.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lng = np.atleast_1d(np.asarray(lng, dtype=np.float64))
+        distances = np.full(len(lat), np.inf)
+        way_index = np.full(len(lat), -1, dtype=np.int64)
+
+        tree, segment_ways = self._tree(highway_types)
+        if len(segment_ways) == 0 or len(lat) == 0:
+            return distances, way_index
+
+        x, y = self.project(lat, lng)
+        (point_idx, segment_idx), dist = tree.query_nearest(
+            shapely.points(x, y), return_distance=True, all_matches=False
+        )
+        distances[point_idx] = dist
+        way_index[point_idx] = segment_ways[segment_idx]
+        return distances, way_index
+
+
+def load_road_network(city):
+    """RoadNetwork for a city, or None if roads were never fetched."""
+    ways_df = load_road_ways(city)
+    if ways_df is None or len(ways_df) == 0:
+        return None
+    return RoadNetwork.from_ways(ways_df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert per-vertex road files to one row per way")
+    parser.add_argument(
+        '--city',
+        action='append',
+        help="City slug from the registry (repeatable, default: worcester)"
+    )
+    parser.add_argument('--all-cities', action='store_true', help="Convert every registered city")
+    args = parser.parse_args()
+
+    slugs = list_city_slugs() if args.all_cities else (args.city or [DEFAULT_CITY])
+
+    for slug in slugs:
+        city = resolve_city(slug)
+        if read_dataset('roads', city, columns=['way_id']) is not None:
+            continue
+        if not any(path.exists() for path in legacy_vertex_files(city)):
+            continue
+        ways_df = load_road_ways(city)
+        path = write_dataset(ways_df, 'roads', city)
+        print(f"  ✓ {slug}: {len(ways_df)} ways → {path.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,11 @@
 # 1. Load candidate site locations (OSM buildings or grid)
 # 2. Add demographic features (Census + OSM POIs or synthetic)
 # 3. Add traffic features (OSM roads or synthetic)
-# 4. Compute final scores
+# 4. Add catchment features (people and POIs around each site)
+# 5. Compute final scores
+#
+# Steps 1-5 run in memory inside pipeline.py and are written to the
+# database once at the end. Each step script can still be run alone.
 
 set -e  # Exit on error
 
@@ -34,7 +38,8 @@ source ../backend/venv/bin/activate
 # Check for real data
 echo ""
 echo "Checking for real data sources..."
-if [ -f "raw/worcester_buildings_osm.csv" ]; then
+# fetch_real_data.py writes Parquet; CSV files from older fetches still work
+if [ -f "raw/worcester_buildings_osm.parquet" ] || [ -f "raw/worcester_buildings_osm.csv" ]; then
     echo "  ✓ Found real OSM building data"
     USE_REAL=true
 else
@@ -57,24 +62,9 @@ if [ "$USE_REAL" = false ]; then
 fi
 
 echo ""
-echo "Step 1/4: Loading candidate site locations..."
-echo "----------------------------------------"
-python ingest_parcels.py
-
-echo ""
-echo "Step 2/4: Adding demographic features..."
-echo "----------------------------------------"
-python ingest_demographics.py
-
-echo ""
-echo "Step 3/4: Adding traffic features..."
-echo "----------------------------------------"
-python ingest_traffic.py
-
-echo ""
-echo "Step 4/4: Computing final scores..."
+echo "Running pipeline stages (single process, one database write)..."
 echo "----------------------------------------"
-python build_scores.py
+python pipeline.py
 
 echo ""
 echo "=========================================="
@@ -0,0 +1,228 @@
+"""
+Columnar site table shared by the pipeline stages.
+
+Each stage works on a pandas DataFrame with one row per candidate site
+and one column per `Site` field. This module moves that frame in and
+out of the database so the stages can run either standalone (load →
+transform → save) or chained in memory by `pipeline.py`, which only
+touches the database once at the end.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.cities import get_city, list_city_slugs
+from app.database import Base, add_missing_columns, instrument_engine
+from app.models.site import Site
+from app.models.dataset_version import DatasetVersion
+from app.config import settings
+
+
+# City processed when no --city is given
+DEFAULT_CITY = 'worcester'
+
+
+# All Site columns except the database-assigned primary key
+SITE_COLUMNS = [
+    column.name for column in Site.__table__.columns if column.name != 'id'
+]
+
+FEATURE_COLUMNS = [
+    'traffic_index',
+    'pop_density_index',
+    'renters_share',
+    'income_index',
+    'poi_index',
+    'parking_lot_flag',
+    'municipal_parcel_flag',
+    'catchment_index',
+]
+
+SCORE_COLUMNS = [
+    'score_demand',
+    'score_equity',
+    'score_traffic',
+    'score_grid',
+    'score_overall',
+    'daily_kwh_estimate',
+]
+
+
+def resolve_city(slug):
+    """
+    Look up a city in the registry.
+
+    Raises:
+        ValueError: If the slug is not registered
+    """
+    city = get_city(slug)
+    if city is None:
+        raise ValueError(
+            f"Unknown city '{slug}'. Registered cities: {', '.join(list_city_slugs())}"
+        )
+    return city
+
+
+def get_engine(create_tables=False):
+    """
+    Create an engine for the configured database.
+
+    Pipeline scripts are short-lived and may run many at once, so the
+    engine holds no idle pooled connections (NullPool). Queries are
+    counted and timed like the API's (stage profiles report DB time).
+    With create_tables, missing tables are created and existing ones
+    get any model columns they lack (app.database.add_missing_columns).
+    """
+    engine = instrument_engine(create_engine(settings.database_url, poolclass=NullPool))
+    if create_tables:
+        Base.metadata.create_all(engine)
+        add_missing_columns(engine)
+    return engine
+
+
+def get_session(create_tables=False):
+    """Open a session against the configured database."""
+    Session = sessionmaker(bind=get_engine(create_tables=create_tables))
+    return Session()
+
+
+def bump_dataset_version(connection, city, site_count):
+    """
+    Increment a city's dataset version inside the caller's transaction.
+
+    Args:
+        connection: Connection or Session with an open transaction
+        city: City slug
+        site_count: Number of sites now published for the city
+
+    Returns:
+        The new version number
+    """
+    current = connection.execute(
+        select(DatasetVersion.version).where(DatasetVersion.city == city)
+    ).scalar()
+    values = {
+        'version': (current or 0) + 1,
+        'site_count': site_count,
+        'published_at': datetime.utcnow(),
+    }
+
+    if current is None:
+        connection.execute(insert(DatasetVersion).values(city=city, **values))
+    else:
+        connection.execute(
+            update(DatasetVersion).where(DatasetVersion.city == city).values(**values)
+        )
+    return values['version']
+
+
+def site_records(sites_df, columns=SITE_COLUMNS):
+    """
+    Rows of the frame as insert/update mappings.
+
+    NaN (a feature a stage has not computed, e.g. catchment_index before
+    build_catchments.py) is written as NULL.
+    """
+    frame = sites_df[list(columns)]
+    if frame.isna().to_numpy().any():
+        frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def site_seeds(sites_df):
+    """
+    Per-site random seeds for the synthetic feature generators.
+
+    Derived from the coordinates rounded to 1e-6° (~0.1 m), which a
+    site keeps whether a stage reads it from the database (standalone
+    runs) or from the in-memory pipeline frame, so both paths generate
+    the same features. Database ids are not used: frames in the
+    pipeline have none yet.
+    """
+    lat = np.round((sites_df['lat'].to_numpy(dtype=np.float64) + 90.0) * 1e6).astype(np.int64)
+    lng = np.round((sites_df['lng'].to_numpy(dtype=np.float64) + 180.0) * 1e6).astype(np.int64)
+    return lat * 360_000_001 + lng
+
+
+def synthetic_rng(sites_df):
+    """
+    One random generator for a frame's synthetic features.
+
+    Seeded from a hash of all site seeds (hashing is far cheaper than
+    feeding millions of seeds to SeedSequence), so the same sites in
+    the same order always draw the same values. Database frames are
+    read in id order, which is the order the pipeline inserted them in.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(site_seeds(sites_df), dtype='<i8').tobytes()).digest()
+    return np.random.default_rng(int.from_bytes(digest, 'little'))
+
+
+def load_sites_frame(session, city=DEFAULT_CITY):
+    """
+    Read all sites for a city into a DataFrame (one query).
+
+    Returns:
+        DataFrame with an `id` column plus all SITE_COLUMNS
+    """
+    columns = [Site.__table__.c.id] + [Site.__table__.c[name] for name in SITE_COLUMNS]
+    result = session.execute(
+        select(*columns).where(Site.city == city).order_by(Site.id)
+    )
+    return pd.DataFrame(result.fetchall(), columns=['id'] + SITE_COLUMNS)
+
+
+def update_sites_frame(session, sites_df, columns, city=DEFAULT_CITY):
+    """
+    Write selected columns of an already-inserted frame back by id.
+
+    Used when a single stage is run on its own for debugging. The
+    city's dataset version is bumped in the same transaction, so API
+    workers reload the changed rows and a snapshot exported afterwards
+    gets a new version instead of overwriting the published one.
+
+    Returns:
+        The city's new dataset version
+    """
+    records = site_records(sites_df, ['id'] + list(columns))
+
+    try:
+        session.bulk_update_mappings(Site, records)
+        version = bump_dataset_version(session, city, len(records))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return version
+
+
+def replace_city_sites(session, sites_df, city=DEFAULT_CITY):
+    """
+    Replace every site of a city with the rows of the frame.
+
+    Delete and insert run in a single transaction together with the
+    dataset version bump, so the table is only written once per run.
+    Readers may briefly contend with the delete; see publish.py for the
+    shadow-table build used by the pipeline.
+    """
+    records = site_records(sites_df)
+
+    try:
+        session.query(Site).filter(Site.city == city).delete()
+        if records:
+            session.execute(insert(Site), records)
+        bump_dataset_version(session, city, len(records))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return len(records)
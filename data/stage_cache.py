@@ -0,0 +1,161 @@
+"""
+Content-hashed caching for pipeline stages.
+
+Every stage declares what its output depends on:
+- the city it runs for (its registry entry: bbox, center, ...)
+- raw files it reads (hashed by content; a missing file is an input too,
+  since stages fall back to synthetic data)
+- upstream stages (their cache keys)
+- code (hash of the source files that implement it)
+- parameters (e.g. ScoringService weights)
+
+These are combined into a fingerprint whose hash is the cache key. A
+stage's output frame is cached as Parquet under that key, so a rerun
+only executes stages whose inputs actually changed. The fingerprint of
+the last run is kept next to the cache to explain *why* a stage reruns.
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+CACHE_DIR = Path(__file__).parent / "processed" / "cache"
+
+# Read files in 1 MB chunks so large raw extracts are never fully in memory
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class Stage:
+    """A pipeline stage and everything its output depends on."""
+    name: str
+    func: Callable
+    upstream: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    raw_inputs: Optional[Callable[[Dict], List[Path]]] = None
+    code: List[Path] = field(default_factory=list)
+    params: Optional[Callable[[], Dict]] = None
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, or 'missing' if it does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_fingerprint(stage, upstream_keys, city):
+    """
+    Collect the hashes of everything a stage depends on.
+
+    Args:
+        stage: Stage definition
+        upstream_keys: Mapping of upstream stage name → cache key
+        city: City registry record the stage runs for
+
+    Returns:
+        JSON-serializable fingerprint dictionary
+    """
+    params = stage.params() if stage.params is not None else {}
+    raw_inputs = stage.raw_inputs(city) if stage.raw_inputs is not None else []
+    return {
+        'city': city,
+        'raw': {Path(path).name: file_digest(path) for path in raw_inputs},
+        'upstream': {name: upstream_keys[name] for name in stage.upstream},
+        'code': {Path(path).name: file_digest(path) for path in stage.code},
+        'params': params,
+    }
+
+
+def fingerprint_key(fingerprint):
+    """Stable hash of a fingerprint (the stage's cache key)."""
+    payload = json.dumps(fingerprint, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def explain_changes(previous, current):
+    """
+    Describe which inputs differ between two fingerprints.
+
+    Returns:
+        List of human-readable reasons (empty if nothing changed)
+    """
+    if previous is None:
+        return ["never run before"]
+
+    reasons = []
+    if previous.get('city') != current.get('city'):
+        reasons.append("city registry entry changed")
+
+    for kind, label in (('raw', 'raw file'), ('upstream', 'upstream stage'), ('code', 'code')):
+        before = previous.get(kind, {})
+        after = current.get(kind, {})
+        for name in sorted(set(before) | set(after)):
+            if before.get(name) != after.get(name):
+                if after.get(name) == "missing":
+                    reasons.append(f"{label} {name} removed")
+                elif before.get(name) in (None, "missing"):
+                    reasons.append(f"{label} {name} added")
+                else:
+                    reasons.append(f"{label} {name} changed")
+
+    if previous.get('params') != current.get('params'):
+        changed = sorted(
+            name for name in set(previous.get('params', {})) | set(current.get('params', {}))
+            if previous.get('params', {}).get(name) != current.get('params', {}).get(name)
+        )
+        reasons.append(f"parameters changed: {', '.join(changed)}")
+
+    return reasons
+
+
+class StageCache:
+    """Parquet outputs and last-run fingerprints for one city's stages."""
+
+    def __init__(self, city_slug, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir) / city_slug
+
+    def output_path(self, stage_name, key):
+        return self.cache_dir / f"{stage_name}-{key}.parquet"
+
+    def manifest_path(self, stage_name):
+        return self.cache_dir / f"{stage_name}.json"
+
+    def has_output(self, stage_name, key):
+        return self.output_path(stage_name, key).exists()
+
+    def load_output(self, stage_name, key):
+        return pd.read_parquet(self.output_path(stage_name, key))
+
+    def last_fingerprint(self, stage_name):
+        path = self.manifest_path(stage_name)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)['fingerprint']
+
+    def save_output(self, stage_name, key, fingerprint, sites_df):
+        """Store a stage output and drop outputs of older runs."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        path = self.output_path(stage_name, key)
+        tmp_path = path.with_suffix('.parquet.tmp')
+        sites_df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
+
+        for old in self.cache_dir.glob(f"{stage_name}-*.parquet"):
+            if old != path:
+                old.unlink()
+
+        with open(self.manifest_path(stage_name), 'w') as f:
+            json.dump({'key': key, 'fingerprint': fingerprint}, f, indent=2, sort_keys=True)
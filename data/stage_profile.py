@@ -0,0 +1,249 @@
+"""
+Per-stage profiling for the data pipeline.
+
+`profile_stage` wraps one stage (fetch, parcels, demographics, traffic,
+scores, write) and records:
+- wall time and CPU time (user + system, all threads of the process)
+- rows processed and rows/sec
+- peak RSS during the stage (the kernel's high-water mark is reset
+  before the stage on Linux; elsewhere it is the process peak so far)
+- time spent in, and number of, database queries
+
+pipeline.py and fetch_real_data.py write one JSON report per run to
+`processed/profiles/`. Two reports can be compared to spot regressions
+between data refreshes:
+
+    python stage_profile.py compare processed/profiles/A.json processed/profiles/B.json
+    python stage_profile.py compare --latest         # last two reports
+    python stage_profile.py show processed/profiles/A.json
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import json
+import platform
+import resource
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.database import track_queries
+
+
+PROFILE_DIR = Path(__file__).parent / "processed" / "profiles"
+
+REPORT_VERSION = 1
+
+# Relative change above which compare flags a metric
+DEFAULT_THRESHOLD = 0.2
+
+# Metrics compared between reports (higher is worse, except rows/sec)
+COMPARED_METRICS = ['wall_s', 'cpu_s', 'rows_per_sec', 'peak_rss_mb', 'db_s', 'db_queries']
+HIGHER_IS_BETTER = {'rows_per_sec'}
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, in MB."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@contextmanager
+def profile_stage(name, city=None, cached=False):
+    """
+    Profile the block as one pipeline stage.
+
+    The caller sets `profile['rows']` inside the block; everything else
+    is filled in when the block exits.
+
+    Usage:
+        with profile_stage('traffic', city='worcester') as profile:
+            df = add_traffic_features(df)
+            profile['rows'] = len(df)
+    """
+    profile = {'stage': name, 'city': city, 'cached': cached, 'rows': 0}
+    _reset_peak_rss()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    with track_queries() as stats:
+        yield profile
+
+    wall = time.perf_counter() - wall_start
+    profile.update({
+        'wall_s': round(wall, 4),
+        'cpu_s': round(time.process_time() - cpu_start, 4),
+        'rows_per_sec': round(profile['rows'] / wall, 1) if wall > 0 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'db_s': round(stats.duration, 4),
+        'db_queries': stats.count,
+    })
+
+
+def build_report(command, stages, **extra):
+    """Assemble a run report from stage profiles."""
+    return {
+        'version': REPORT_VERSION,
+        'command': command,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'stages': stages,
+        **extra,
+    }
+
+
+def write_report(report, profile_dir=PROFILE_DIR):
+    """
+    Write a run report as JSON.
+
+    Returns:
+        Path of the report file
+    """
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    path = profile_dir / f"{stamp}-{report['command']}.json"
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def latest_reports(count=2, profile_dir=PROFILE_DIR):
+    """Most recent report files, oldest first."""
+    return sorted(Path(profile_dir).glob('*.json'))[-count:]
+
+
+def _stage_key(profile):
+    return (profile.get('city') or '', profile['stage'])
+
+
+def compare_reports(before, after, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare matching stages of two reports.
+
+    Stages are matched by (city, stage). A metric regresses when it
+    gets worse by more than `threshold` (relative); cached stages are
+    only compared with cached stages.
+
+    Returns:
+        List of dicts (city, stage, metric, before, after, change,
+        regression), one per metric of every matched stage
+    """
+    before_stages = {_stage_key(p): p for p in before['stages']}
+    rows = []
+    for profile in after['stages']:
+        previous = before_stages.get(_stage_key(profile))
+        if previous is None or previous.get('cached') != profile.get('cached'):
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), profile.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float('inf'))
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            rows.append({
+                'city': profile.get('city'),
+                'stage': profile['stage'],
+                'metric': metric,
+                'before': old,
+                'after': new,
+                'change': change,
+                'regression': worse > threshold,
+            })
+    return rows
+
+
+def print_report(report):
+    print(f"\n📈 {report['command']} run at {report['created_at']}")
+    print(f"  {'city':<14} {'stage':<14} {'wall':>8} {'cpu':>8} {'rows':>9} {'rows/s':>10} {'rss MB':>8} {'db':>7}")
+    for p in report['stages']:
+        stage = f"{p['stage']}{' *' if p.get('cached') else ''}"
+        rate = f"{p['rows_per_sec']:,.0f}" if p.get('rows_per_sec') is not None else '-'
+        print(
+            f"  {p.get('city') or '-':<14} {stage:<14} {p['wall_s']:>7.2f}s {p['cpu_s']:>7.2f}s "
+            f"{p['rows']:>9,} {rate:>10} {p['peak_rss_mb']:>8.0f} {p['db_s']:>6.2f}s"
+        )
+    print("  (* loaded from cache)")
+
+
+def print_comparison(rows, threshold):
+    regressions = [row for row in rows if row['regression']]
+    print(f"\n🔍 Compared {len({(r['city'], r['stage']) for r in rows})} stages (threshold {threshold:.0%})")
+    for row in rows:
+        if not row['regression'] and abs(row['change']) <= threshold:
+            continue
+        marker = "⚠" if row['regression'] else "✓"
+        print(
+            f"  {marker} {row['city'] or '-'}/{row['stage']} {row['metric']}: "
+            f"{row['before']:g} → {row['after']:g} ({row['change']:+.0%})"
+        )
+    if not regressions:
+        print("  ✓ No regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and compare pipeline profile reports")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show = subparsers.add_parser('show', help="Print a report")
+    show.add_argument('report', nargs='?', help="Report file (default: latest)")
+
+    compare = subparsers.add_parser('compare', help="Compare two reports")
+    compare.add_argument('before', nargs='?', help="Baseline report")
+    compare.add_argument('after', nargs='?', help="New report")
+    compare.add_argument('--latest', action='store_true', help="Compare the two most recent reports")
+    compare.add_argument(
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative change counted as a regression (default: 0.2)"
+    )
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        paths = [args.report] if args.report else latest_reports(1)
+        if not paths:
+            print(f"⚠️  No reports in {PROFILE_DIR}")
+            sys.exit(1)
+        print_report(load_report(paths[0]))
+        return
+
+    paths = latest_reports(2) if args.latest else [args.before, args.after]
+    if len(paths) != 2 or None in paths:
+        parser.error("compare needs two reports (or --latest)")
+    print(f"Before: {paths[0]}\nAfter:  {paths[1]}")
+    rows = compare_reports(load_report(paths[0]), load_report(paths[1]), args.threshold)
+    if print_comparison(rows, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
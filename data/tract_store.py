@@ -0,0 +1,155 @@
+"""
+Filtered extraction of TIGER/Line census tract boundaries.
+
+The statewide tract shapefile (`raw/census_tracts.zip`, ~25 MB for
+Massachusetts) is read straight out of the zip with an OGR attribute
+filter on the county, so features (and their geometries) are only
+built for tracts in the requested counties. Their polygons are
+simplified to a configurable tolerance, and the result is cached as
+GeoParquet (WKB geometry) under `processed/tracts/`.
+
+Later loads read the small GeoParquet file in milliseconds instead of
+parsing the whole state shapefile. The cache key includes the counties,
+the tolerance and the zip's size and modification time, so a new
+download or a different tolerance triggers a fresh extract.
+
+Usage:
+    python tract_store.py                  # Worcester's county
+    python tract_store.py --all-cities     # every registered county
+    python tract_store.py --tolerance 0    # keep full-resolution polygons
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import hashlib
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import shapely
+from shapely.geometry import shape
+
+from app.cities import list_city_slugs
+from app.config import settings
+from site_frame import DEFAULT_CITY, resolve_city
+
+
+TRACTS_ZIP = Path(__file__).parent / "raw" / "census_tracts.zip"
+TRACT_CACHE_DIR = Path(__file__).parent / "processed" / "tracts"
+
+# Columns kept from the TIGER attribute table
+TRACT_COLUMNS = ['GEOID', 'COUNTYFP', 'ALAND']
+
+
+def tract_cache_path(county_fips, tolerance, zip_path=TRACTS_ZIP, cache_dir=TRACT_CACHE_DIR):
+    """GeoParquet cache file for a set of counties, tolerance and zip version."""
+    stat = Path(zip_path).stat()
+    key = f"{','.join(sorted(county_fips))}|{tolerance}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    return Path(cache_dir) / f"tracts-{digest}.parquet"
+
+
+def extract_tracts(county_fips, tolerance, zip_path=TRACTS_ZIP):
+    """
+    Stream the tract shapefile out of the zip, keeping some counties.
+
+    The COUNTYFP filter is an OGR `where` clause, evaluated before
+    fiona builds a feature, so other counties' geometries are skipped.
+
+    Args:
+        county_fips: Iterable of 3-digit county FIPS codes
+        tolerance: Simplification tolerance in degrees (0 disables)
+        zip_path: TIGER/Line tract zip
+
+    Returns:
+        GeoDataFrame (GEOID, COUNTYFP, ALAND, geometry) in EPSG:4326
+    """
+    import fiona
+
+    wanted = sorted({str(county) for county in county_fips if str(county).isdigit()})
+    where = f"COUNTYFP IN ({', '.join(repr(county) for county in wanted)})" if wanted else "0 = 1"
+    records = []
+    geometries = []
+
+    with fiona.open(f"zip://{Path(zip_path).resolve()}") as source:
+        crs = source.crs
+        for feature in source.filter(where=where):
+            properties = feature['properties']
+            records.append({column: properties[column] for column in TRACT_COLUMNS})
+            geometries.append(shape(feature['geometry']))
+
+    geometry = shapely.simplify(geometries, tolerance, preserve_topology=True) if tolerance else geometries
+    gdf = gpd.GeoDataFrame(records, columns=TRACT_COLUMNS, geometry=list(geometry), crs=crs)
+    return gdf.to_crs(epsg=4326)
+
+
+def load_tracts(county_fips, tolerance=None, zip_path=TRACTS_ZIP, cache_dir=TRACT_CACHE_DIR):
+    """
+    Tract polygons for some counties, from the cache or a fresh extract.
+
+    Args:
+        county_fips: 3-digit county FIPS code or list of codes
+        tolerance: Simplification tolerance in degrees
+                   (defaults to settings.tract_simplify_tolerance)
+        zip_path: TIGER/Line tract zip
+        cache_dir: Directory for GeoParquet extracts
+
+    Returns:
+        GeoDataFrame (GEOID, COUNTYFP, ALAND, geometry), or None if the
+        zip has not been downloaded
+    """
+    if not Path(zip_path).exists():
+        return None
+
+    if isinstance(county_fips, str):
+        county_fips = [county_fips]
+    if tolerance is None:
+        tolerance = settings.tract_simplify_tolerance
+
+    path = tract_cache_path(county_fips, tolerance, zip_path=zip_path, cache_dir=cache_dir)
+    if path.exists():
+        return gpd.read_parquet(path)
+
+    gdf = extract_tracts(county_fips, tolerance, zip_path=zip_path)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.parquet.tmp')
+    gdf.to_parquet(tmp_path, index=False)
+    tmp_path.replace(path)
+    return gdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and cache census tract boundaries")
+    parser.add_argument(
+        '--city',
+        action='append',
+        help="City slug from the registry (repeatable, default: worcester)"
+    )
+    parser.add_argument('--all-cities', action='store_true', help="Extract every registered county")
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=None,
+        help="Simplification tolerance in degrees (default: TRACT_SIMPLIFY_TOLERANCE setting)"
+    )
+    args = parser.parse_args()
+
+    slugs = list_city_slugs() if args.all_cities else (args.city or [DEFAULT_CITY])
+    counties = sorted({resolve_city(slug)['county_fips'] for slug in slugs})
+
+    if not TRACTS_ZIP.exists():
+        print(f"⚠️  {TRACTS_ZIP} not found. Run fetch_real_data.py first.")
+        return
+
+    # One extract per county, matching how ingest_demographics loads them
+    for county in counties:
+        start = time.perf_counter()
+        gdf = load_tracts(county, tolerance=args.tolerance)
+        print(f"  ✓ County {county}: {len(gdf)} tracts in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()